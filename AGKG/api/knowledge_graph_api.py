@@ -1,4 +1,4 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, Response, stream_with_context
 from AGKG.services.knowledge_graph_service import KnowledgeGraphService
 import logging
 
@@ -49,6 +49,7 @@ def search_entity():
     
     Query Parameters:
         q: 搜索关键词
+        depth: 可选，子图深度（正整数），默认为1，超过上限时按1处理
         
     Returns:
         JSON对象，包含匹配的节点和连接
@@ -57,9 +58,13 @@ def search_entity():
         query = request.args.get('q', '')
         if not query:
             return jsonify({'error': '搜索关键词不能为空', 'nodes': [], 'links': []}), 400
+        depth = request.args.get('depth', '1').strip()
+        if not depth.isdigit() or int(depth) < 1:
+            return jsonify({'error': '子图深度必须为正整数', 'nodes': [], 'links': []}), 400
+        depth = int(depth)
             
         # 使用服务搜索实体
-        results = graph_service.search_entity(query)
+        results = graph_service.search_entity(query, depth)
         
         # 检查是否有错误信息
         if 'error' in results:
@@ -132,6 +137,70 @@ def get_statistics():
         # 返回空数据
         return jsonify({'error': str(e), 'total_nodes': 0, 'total_relations': 0, 'entities': [], 'relations': []})
 
+@knowledge_graph_api.route('/api/knowledge_graph/statistics/stream', methods=['GET'])
+def stream_statistics():
+    """
+    以Server-Sent Events推送知识图谱统计信息
+    
+    事件:
+        snapshot: 连接建立时的全量统计
+        delta: 计数变化时只包含变化部分的增量
+    
+    Returns:
+        text/event-stream 长连接
+    """
+    return Response(stream_with_context(graph_service.stream_statistics()),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@knowledge_graph_api.route('/api/knowledge_graph/statistics/analytics', methods=['GET'])
+def get_analytics():
+    """
+    获取知识图谱扩展分析结果
+    
+    Returns:
+        JSON对象，包含连接度分布、枢纽实体、各类别平均连接度和不同邻居数
+    """
+    try:
+        return jsonify(graph_service.get_analytics())
+    except Exception as e:
+        logger.error(f"获取分析结果失败: {str(e)}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@knowledge_graph_api.route('/api/knowledge_graph/statistics/refresh', methods=['POST'])
+def refresh_statistics():
+    """
+    立即重建统计快照
+    
+    Returns:
+        JSON对象，包含刷新结果及最新快照
+    """
+    try:
+        result = graph_service.refresh_statistics()
+        if result.get('status') == 'error':
+            return jsonify(result), 409
+        return jsonify(result)
+    except Exception as e:
+        logger.error(f"刷新统计信息失败: {str(e)}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@knowledge_graph_api.route('/api/knowledge_graph/replica/refresh', methods=['POST'])
+def refresh_replica():
+    """
+    按需刷新进程内图副本
+    
+    Returns:
+        JSON对象，包含副本当前状态
+    """
+    try:
+        result = graph_service.refresh_replica()
+        if result.get('status') == 'error':
+            return jsonify(result), 400
+        return jsonify(result)
+    except Exception as e:
+        logger.error(f"刷新图副本失败: {str(e)}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
 def init_app(app):
     """注册API蓝图到应用"""
     app.register_blueprint(knowledge_graph_api) 
\ No newline at end of file
@@ -0,0 +1,30 @@
+from flask import Blueprint, jsonify, request, Response
+from AGKG.utils.metrics import registry
+import logging
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 创建蓝图
+metrics_api = Blueprint('metrics_api', __name__)
+
+
+@metrics_api.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """
+    获取进程内运行指标（连接池、查询耗时等）
+
+    Query Parameters:
+        format: 可选，prometheus 时以Prometheus文本格式返回，默认JSON
+
+    Returns:
+        JSON对象或Prometheus文本
+    """
+    try:
+        if request.args.get('format') == 'prometheus':
+            return Response(registry.render_text(), mimetype='text/plain; version=0.0.4')
+        return jsonify({"status": "success", "data": registry.snapshot()})
+    except Exception as e:
+        logger.error(f"获取运行指标时出错: {str(e)}")
+        return jsonify({"status": "error", "message": f"获取运行指标失败: {str(e)}"}), 500
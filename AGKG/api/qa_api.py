@@ -1,9 +1,10 @@
 import json
 import logging
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 import traceback
 from ..services.qa_service import QAService
 from ..services.record_history_service import RecordHistoryService
+from ..utils.sse import format_event
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -12,6 +13,34 @@ logger = logging.getLogger('qa_api')
 qa_api = Blueprint('qa_api', __name__)
 qa_service = QAService()
 
+def _save_history(question, result, user_id):
+    """记录搜索历史（仅当提供了用户ID时），失败不影响主流程"""
+    if not user_id:
+        logger.warning("未提供user_id，跳过搜索记录保存")
+        return
+    try:
+        logger.info(f"准备保存搜索记录，user_id: {user_id}, 类型: {type(user_id)}")
+        answer = result.get('answer', '')
+        rewritten_query = result.get('rewritten_query')  # 从result中获取重写后的查询
+
+        # 存储搜索记录
+        record_id = RecordHistoryService().insert_record(
+            search_query=question,
+            answer=answer,
+            user_id=user_id,
+            is_satisfied=None,  # 用户满意度需要后续更新
+            rewritten_query=rewritten_query
+        )
+
+        if record_id:
+            logger.info(f"搜索记录已保存，ID: {record_id}")
+        else:
+            logger.error("搜索记录保存失败，insert_record返回None")
+    except Exception as e:
+        logger.error(f"保存搜索记录时发生错误: {str(e)}")
+        logger.error(traceback.format_exc())
+        # 不影响主流程，错误只记录不抛出
+
 @qa_api.route('/qa', methods=['POST'])
 def question_answering():
     """问答API入口，处理用户问题并返回答案"""
@@ -37,33 +66,10 @@ def question_answering():
         if result.get('status') == 'error':
             return jsonify(result), 400
         
-        # 记录搜索历史（仅当提供了用户ID时）
-        if user_id:
-            try:
-                logger.info(f"准备保存搜索记录，user_id: {user_id}, 类型: {type(user_id)}")
-                answer = result.get('answer', '')
-                rewritten_query = result.get('rewritten_query')  # 从result中获取重写后的查询
-                
-                # 存储搜索记录
-                record_id = RecordHistoryService().insert_record(
-                    search_query=question,
-                    answer=answer,
-                    user_id=user_id,
-                    is_satisfied=None,  # 用户满意度需要后续更新
-                    rewritten_query=rewritten_query
-                )
-                
-                if record_id:
-                    logger.info(f"搜索记录已保存，ID: {record_id}")
-                else:
-                    logger.error("搜索记录保存失败，insert_record返回None")
-            except Exception as e:
-                logger.error(f"保存搜索记录时发生错误: {str(e)}")
-                logger.error(traceback.format_exc())
-                # 不影响主流程，错误只记录不抛出
-        else:
-            logger.warning("未提供user_id，跳过搜索记录保存")
-        
+        # 记录搜索历史（仅当提供了用户ID时），解析超时的partial结果没有答案，不记录
+        if result.get('status') == 'success':
+            _save_history(question, result, user_id)
+
         return jsonify(result)
         
     except Exception as e:
@@ -72,4 +78,37 @@ def question_answering():
         return jsonify({
             'status': 'error',
             'message': f'处理请求时发生错误: {str(e)}'
-        }), 500 
\ No newline at end of file
+        }), 500 
+
+@qa_api.route('/qa/stream', methods=['POST'])
+def stream_question_answering():
+    """
+    流式问答API，以Server-Sent Events依次推送各阶段结果
+
+    事件:
+        analysis: 问题解析结果，可立即展示问题类型、核心实体和三元组
+        kg_results: 知识图谱查询结果
+        answer_delta: 答案文本增量
+        done: 完整结果（与 /qa 返回值相同，含 degraded_stages），此后保存搜索记录
+        error: 处理失败
+    """
+    data = request.json
+    if not data or 'question' not in data:
+        return jsonify({
+            'status': 'error',
+            'message': '请提供问题内容'
+        }), 400
+
+    question = data['question']
+    user_id = data.get('user_id')
+    logger.info(f"收到流式问题: {question}, 用户ID: {user_id}")
+
+    def generate():
+        for event, payload in qa_service.process_question_stream(question, user_id):
+            yield format_event(event, payload)
+            if event == 'done' and payload.get('status') == 'success':
+                _save_history(question, payload, user_id)
+
+    return Response(stream_with_context(generate()),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
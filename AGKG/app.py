@@ -1,3 +1,4 @@
+import click
 from flask import Flask, jsonify, request
 import os
 import logging
@@ -5,6 +6,7 @@ from AGKG.api.qa_api import qa_api
 from AGKG.api.knowledge_graph_api import knowledge_graph_api
 from AGKG.api.user_api import user_api
 from AGKG.api.recommendation_api import recommendation_api
+from AGKG.api.metrics_api import metrics_api
 from AGKG.router import main_routes
 
 # 配置日志
@@ -21,10 +23,31 @@ def create_app():
     app.register_blueprint(knowledge_graph_api)
     app.register_blueprint(user_api)
     app.register_blueprint(recommendation_api)
+    app.register_blueprint(metrics_api)
 
     # 前端WEB
     app.register_blueprint(main_routes)
 
+    @app.cli.command('backfill-name-key')
+    def backfill_name_key():
+        """
+        为知识图谱节点补写名称查找键（name_key）并创建索引。
+
+        每次导入或写入新节点后都需重新执行：只要有一个节点缺少 name_key，
+        全部精确名称查找都会退回按名称比较。
+        """
+        from AGKG.core.client_manager import get_client_manager
+        updated = get_client_manager().get_neo4j_client().backfill_name_keys()
+        logger.info(f"名称查找键补写完成，共更新 {updated} 个节点")
+
+    @app.cli.command('compile-graph-snapshot')
+    @click.argument('path')
+    def compile_graph_snapshot(path):
+        """将Neo4j知识图谱导出为mmap快照文件（供 KG_SNAPSHOT_PATH 使用）"""
+        from AGKG.client.graph_snapshot import compile_snapshot
+        from AGKG.core.client_manager import get_client_manager
+        compile_snapshot(get_client_manager().get_neo4j_client(), path)
+
     @app.errorhandler(404)
     def page_not_found(e):
         logger.warning(f"404错误: {request.path}")
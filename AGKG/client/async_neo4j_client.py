@@ -0,0 +1,367 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Any, Optional
+
+from neo4j import AsyncGraphDatabase, READ_ACCESS, unit_of_work
+from neo4j.exceptions import ServiceUnavailable, ClientError
+from dotenv import load_dotenv
+
+from AGKG.client.cypher_builder import (is_valid_relation, build_head_relation_query, build_triplet_query,
+                                        compile_dependency_chain, compile_subgraph_query,
+                                        build_entity_triplets_query, build_entity_neighbors_query,
+                                        LABELS_QUERY, RELATIONSHIP_TYPES_QUERY, compile_count_store_query,
+                                        NODE_NEIGHBORS_QUERY, FULLTEXT_SEARCH_QUERY, SCAN_SEARCH_QUERY)
+from AGKG.client.neo4j_client import (FULLTEXT_INDEX_NAME, normalize_name_key, pool_config_from_env,
+                                      escape_lucene, triplet_rows, entity_rows, triplet_batch_rows,
+                                      triplet_batch_query, group_triplet_batch, dependency_chain_request,
+                                      split_dependency_chain, count_store_keys, shape_count_statistics,
+                                      collect_neighborhood, clamp_subgraph_request, subgraph_params,
+                                      shape_subgraph)
+from AGKG.utils.deadline import Deadline, DeadlineExceeded
+from AGKG.utils.metrics import counter, histogram
+
+# 加载环境变量
+load_dotenv()
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('async_neo4j_client')
+
+# 创建异步Neo4j客户端的单例实例
+_async_neo4j_client_instance = None
+
+# 异步驱动的查询指标，连接池与同步驱动相互独立，分开统计
+ASYNC_QUERY_SECONDS = histogram("neo4j_async_query_seconds", "异步读事务耗时（含连接获取与重试）")
+ASYNC_QUERY_ERRORS = counter("neo4j_async_query_errors_total", "异步读事务失败次数")
+
+
+class AsyncNeo4jClient:
+    """
+    基于 neo4j.AsyncGraphDatabase 的异步客户端，公开的查询接口与 Neo4jClient 一致（均为协程），
+    可在异步处理函数中直接await，也可通过 asyncio.gather 并发查询。
+
+    异步驱动绑定在创建它的事件循环上，因此按事件循环分别创建驱动。
+    查询语句与结果整形与同步客户端共用；name_key 与全文索引的可用状态由同步客户端维护，
+    需要重新校验时放到线程中执行，不阻塞事件循环
+    """
+
+    def __new__(cls, neo4j_client=None):
+        global _async_neo4j_client_instance
+        if _async_neo4j_client_instance is None:
+            _async_neo4j_client_instance = super(AsyncNeo4jClient, cls).__new__(cls)
+            _async_neo4j_client_instance._initialized = False
+        return _async_neo4j_client_instance
+
+    def __init__(self, neo4j_client=None):
+        if self._initialized:
+            return
+
+        self.url = os.getenv("NEO4J_URI", "bolt://localhost:7687")
+        self.username = os.getenv("NEO4J_USER", "neo4j")
+        self.password = os.getenv("NEO4J_PASSWORD", "123456")
+        # 同步客户端：索引的创建与校验由它完成
+        self.neo4j_client = neo4j_client
+        self._drivers = {}
+        self._lock = threading.Lock()
+        # 与同步客户端共用的进程内图副本（GraphReplica），由ClientManager挂载
+        self.replica = None
+        self._initialized = True
+
+    def _get_driver(self):
+        """获取当前事件循环对应的驱动，不存在时创建"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            driver = self._drivers.get(loop)
+            if driver is None:
+                if not self.url or not self.username or not self.password:
+                    logger.error("未提供连接信息")
+                    return None
+                # 已关闭的事件循环上的驱动无法再关闭，直接注销
+                for closed in [closed for closed in self._drivers if closed.is_closed()]:
+                    del self._drivers[closed]
+                driver = AsyncGraphDatabase.driver(self.url, auth=(self.username, self.password),
+                                                   **pool_config_from_env())
+                self._drivers[loop] = driver
+        return driver
+
+    async def close(self):
+        """关闭当前事件循环对应的驱动"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            driver = self._drivers.pop(loop, None)
+        if driver is not None:
+            try:
+                await driver.close()
+                logger.info("异步Neo4j连接已关闭")
+            except Exception as e:
+                logger.error(f"关闭异步Neo4j连接时发生错误: {str(e)}")
+
+    async def _read(self, query: str, params: Optional[Dict[str, Any]] = None, single: bool = False,
+                    deadline: Optional[Deadline] = None):
+        """
+        在托管读事务中执行查询，语义与 Neo4jClient._read 一致
+
+        Raises:
+            DeadlineExceeded: 执行前截止时间已到
+        """
+        driver = self._get_driver()
+        if driver is None:
+            raise ServiceUnavailable("数据库未连接")
+
+        async def work(tx):
+            result = await tx.run(query, **(params or {}))
+            return await result.single() if single else [record async for record in result]
+
+        timeout = deadline.remaining() if deadline is not None else None
+        if timeout is not None:
+            # 事务超时为0表示永不超时，到期的请求不再发起查询
+            if timeout <= 0:
+                raise DeadlineExceeded(f"超过请求时间预算 {deadline.budget} 秒")
+            work = unit_of_work(timeout=timeout)(work)
+
+        started = time.perf_counter()
+        try:
+            async with driver.session(default_access_mode=READ_ACCESS) as session:
+                # 5.x驱动为execute_read，4.x驱动为read_transaction
+                execute_read = getattr(session, "execute_read", None) or session.read_transaction
+                return await execute_read(work)
+        except Exception:
+            ASYNC_QUERY_ERRORS.inc()
+            raise
+        finally:
+            ASYNC_QUERY_SECONDS.observe(time.perf_counter() - started)
+
+    async def _use_name_key(self) -> bool:
+        """精确名称查找是否走 name_key 索引，校验到期时在线程中由同步客户端重新校验"""
+        if self.neo4j_client is None:
+            return False
+        if self.neo4j_client.name_key_check_due():
+            await asyncio.to_thread(self.neo4j_client.check_name_keys)
+        return self.neo4j_client.name_key_ready
+
+    async def query_by_entity_name(self, entity_name: str) -> List[Dict[str, str]]:
+        """根据实体名称查询相关的所有三元组"""
+        try:
+            return triplet_rows(await self._read(build_entity_triplets_query(await self._use_name_key()),
+                                                 {"name_key": normalize_name_key(entity_name)}))
+        except Exception as e:
+            logger.error(f"查询实体 {entity_name} 时发生错误: {str(e)}")
+            return []
+
+    async def query_by_head_relation(self, head: str, relation: str,
+                                     head_label: Optional[str] = None) -> List[Dict[str, str]]:
+        """根据头实体和关系查询尾实体，head_label为可选的头实体标签提示"""
+        if not is_valid_relation(relation):
+            logger.warning(f"关系 {relation} 不在意图标签枚举中，跳过查询")
+            return []
+        try:
+            query = build_head_relation_query(relation, head_label, await self._use_name_key())
+            return triplet_rows(await self._read(query, {"head_key": normalize_name_key(head)}))
+        except Exception as e:
+            logger.error(f"查询头实体 {head} 和关系 {relation} 时发生错误: {str(e)}")
+            return []
+
+    async def query_triplet(self, head: str, relation: str, tail: str,
+                            head_label: Optional[str] = None) -> List[Dict[str, str]]:
+        """查询特定的三元组是否存在，head_label为可选的头实体标签提示"""
+        if not is_valid_relation(relation):
+            logger.warning(f"关系 {relation} 不在意图标签枚举中，跳过查询")
+            return []
+        try:
+            query = build_triplet_query(relation, head_label, await self._use_name_key())
+            return triplet_rows(await self._read(query, {"head_key": normalize_name_key(head),
+                                                         "tail_key": normalize_name_key(tail)}))
+        except Exception as e:
+            logger.error(f"查询三元组 ({head}, {relation}, {tail}) 时发生错误: {str(e)}")
+            return []
+
+    async def query_kg_triplets(self, triplets: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        """根据知识图谱三元组列表查询数据库信息，语义与 Neo4jClient.query_kg_triplets 一致"""
+        results = []
+        processed_triplets = {}  # 用于存储已处理的Q值结果
+
+        for triplet in triplets:
+            head = triplet.get("head", "")
+            relation = triplet.get("relation", "")
+            tail = triplet.get("tail", "")
+
+            # 处理包含Q值的三元组
+            if head.startswith('Q'):
+                if head in processed_triplets:
+                    head = processed_triplets[head]
+                else:
+                    continue  # 跳过未知的Q值头实体
+
+            # 如果尾实体是Q值，直接查询头实体和关系
+            if tail.startswith('Q'):
+                query_result = await self.query_by_head_relation(head, relation)
+                if query_result:
+                    processed_triplets[tail] = [item["tail"] for item in query_result]
+                    results.append({"triplet": triplet, "result": query_result})
+            elif head and relation and tail:
+                results.append({"triplet": triplet, "result": await self.query_triplet(head, relation, tail)})
+            elif head and relation:
+                results.append({"triplet": triplet, "result": await self.query_by_head_relation(head, relation)})
+            elif head:
+                results.append({"triplet": triplet, "result": await self.query_by_entity_name(head)})
+
+        return results
+
+    async def query_kg_triplets_batch(self, triplets: List[Dict[str, str]],
+                                      deadline: Optional[Deadline] = None) -> List[Optional[Dict[str, Any]]]:
+        """批量查询同一跳内互不依赖的三元组，返回值与 Neo4jClient.query_kg_triplets_batch 一致"""
+        if not triplets:
+            return []
+
+        rows = triplet_batch_rows(triplets)
+        records = []
+        if rows:
+            try:
+                records = await self._read(triplet_batch_query(rows, await self._use_name_key()), {"rows": rows},
+                                           deadline=deadline)
+            except Exception as e:
+                logger.error(f"批量查询{len(rows)}个三元组时发生错误: {str(e)}")
+        return group_triplet_batch(triplets, rows, records)
+
+    async def query_dependency_chain(self, triplets: List[Dict[str, str]], hop_limit: int = 10,
+                                     deadline: Optional[Deadline] = None):
+        """一次往返查询线性Qn依赖链，返回 (kg_results, q_values)"""
+        if not triplets:
+            return [], {}
+
+        triplets, relations, bound_tail, params = dependency_chain_request(triplets, hop_limit)
+        if not triplets:
+            return [], {}
+
+        try:
+            query = compile_dependency_chain(relations, bound_tail, await self._use_name_key())
+            record = await self._read(query, params, single=True, deadline=deadline)
+        except Exception as e:
+            logger.error(f"查询依赖链 {triplets} 时发生错误: {str(e)}")
+            return [], {}
+        if record is None:
+            return [], {}
+        return split_dependency_chain(triplets, record)
+
+    async def get_count_statistics(self) -> Optional[Dict[str, Any]]:
+        """从计数存储读取节点/关系总数以及各标签、各关系类型的数量，出错时返回None"""
+        try:
+            # 标签与关系类型互不依赖，并发读取
+            labels, relation_types = await asyncio.gather(self._read(LABELS_QUERY, single=True),
+                                                          self._read(RELATIONSHIP_TYPES_QUERY, single=True))
+            labels, relation_types = count_store_keys(labels["labels"], relation_types["types"])
+            record = await self._read(compile_count_store_query(labels, relation_types), single=True)
+        except Exception as e:
+            logger.error(f"获取计数统计时出错: {e}")
+            return None
+
+        return shape_count_statistics(labels, relation_types, record)
+
+    async def get_node_statistics(self):
+        """获取节点统计信息"""
+        counts = await self.get_count_statistics()
+        if not counts:
+            return []
+        return [{"label": label, "count": count} for label, count in counts["labels"].items()]
+
+    async def get_relation_statistics(self):
+        """获取关系统计信息"""
+        counts = await self.get_count_statistics()
+        if not counts:
+            return []
+        return [{"type": relation_type, "count": count} for relation_type, count in counts["relation_types"].items()]
+
+    async def get_entity_and_neighbors(self, entity_name, limit=10):
+        """获取指定实体及其相邻节点和关系，返回 (nodes, edges)"""
+        if self.replica is not None and self.replica.ready:
+            return self.replica.get_entity_and_neighbors(entity_name, limit)
+
+        try:
+            nodes, edges = collect_neighborhood(
+                await self._read(build_entity_neighbors_query(await self._use_name_key()),
+                                 {"name_key": normalize_name_key(entity_name), "limit": limit}))
+        except Exception as e:
+            logger.error(f"获取实体和邻居时出错: {e}")
+            return [], []
+
+        if not nodes:
+            logger.warning(f"未能找到实体: {entity_name}")
+            return [], []
+        logger.info(f"获取到实体'{entity_name}'及其{len(nodes)-1}个邻居和{len(edges)}条关系")
+        return nodes, edges
+
+    async def get_entity_neighbors_by_id(self, node_id, limit=10):
+        """获取指定节点ID的邻居节点和关系，返回 (nodes, edges)"""
+        if self.replica is not None and self.replica.ready:
+            return self.replica.get_entity_neighbors_by_id(node_id, limit)
+
+        try:
+            nodes, edges = collect_neighborhood(
+                await self._read(NODE_NEIGHBORS_QUERY, {"node_id": node_id, "limit": limit}))
+        except Exception as e:
+            logger.error(f"获取节点邻居时出错: {e}")
+            return [], []
+
+        if not nodes:
+            logger.warning(f"未能找到节点: {node_id}")
+            return [], []
+        logger.info(f"获取到节点{node_id}及其{len(nodes)-1}个邻居和{len(edges)}条关系")
+        return nodes, edges
+
+    async def search_entities(self, search_term, limit=20):
+        """搜索实体，优先使用全文索引，索引不可用时退回模糊匹配"""
+        if self.neo4j_client is not None and self.neo4j_client.fulltext_check_due():
+            await asyncio.to_thread(self.neo4j_client.ensure_fulltext_index)
+
+        if self.neo4j_client is not None and self.neo4j_client.fulltext_ready:
+            escaped = escape_lucene(search_term)
+            if not escaped:
+                return []
+            try:
+                return entity_rows(await self._read(FULLTEXT_SEARCH_QUERY, {"index_name": FULLTEXT_INDEX_NAME,
+                                                                             "search_term": escaped,
+                                                                             "limit": limit}))
+            except ClientError as e:
+                # 索引被删除等情况，标记为不可用并退回模糊匹配
+                logger.warning(f"全文索引查询失败，退回模糊匹配: {e}")
+                self.neo4j_client.fulltext_ready = False
+            except Exception as e:
+                logger.error(f"搜索实体时出错: {e}")
+                return []
+
+        try:
+            return entity_rows(await self._read(SCAN_SEARCH_QUERY, {"search_term": search_term, "limit": limit}))
+        except Exception as e:
+            logger.error(f"搜索实体时出错: {e}")
+            return []
+
+    async def get_subgraph_from_nodes(self, node_ids, depth=1, node_budget=None, edge_budget=None):
+        """获取以特定节点为中心的子图，返回 (nodes, edges)"""
+        subgraph = await self.fetch_subgraph(node_ids, depth, node_budget, edge_budget)
+        return subgraph["nodes"], subgraph["edges"]
+
+    async def fetch_subgraph(self, node_ids, depth=1, node_budget=None, edge_budget=None) -> Dict[str, Any]:
+        """一次往返获取子图的节点（含连接度）和子图内部的边，返回 {"nodes", "edges", "truncated"}"""
+        depth, node_budget, edge_budget = clamp_subgraph_request(depth, node_budget, edge_budget)
+
+        if self.replica is not None and self.replica.ready and node_ids:
+            return self.replica.fetch_subgraph(node_ids, depth, node_budget, edge_budget)
+
+        empty = {"nodes": [], "edges": [], "truncated": False}
+        if not node_ids:
+            logger.error("节点ID列表为空")
+            return empty
+
+        try:
+            # 连接度写法取决于服务端版本，由同步客户端在连接时确定
+            count_subquery = self.neo4j_client.count_subquery if self.neo4j_client is not None else True
+            record = await self._read(compile_subgraph_query(depth, count_subquery),
+                                      subgraph_params(node_ids, node_budget, edge_budget), single=True)
+        except Exception as e:
+            logger.error(f"获取子图时出错: {e}")
+            return empty
+
+        return shape_subgraph(record, node_ids, node_budget, edge_budget)
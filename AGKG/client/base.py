@@ -1,22 +1,122 @@
+import asyncio
+import atexit
+import logging
+import os
+import threading
 import requests
 from typing import Optional, Dict, Any
 import aiohttp
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('http_client')
+
+# 连接池配置：总连接数上限、单个主机的连接数上限、DNS缓存时间（秒）、空闲连接保活时间（秒）
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "100"))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "20"))
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30"))
+
+
 class HttpClientBase:
+    """
+    异步HTTP客户端基类，所有子类共用按事件循环划分的长连接会话：
+    aiohttp会话和连接器绑定创建它们的事件循环，每个循环各持有一个会话，登记在显式的注册表中。
+    会话和连接器强引用所属的循环，不能依赖弱引用自动释放：创建会话的同时在该循环中启动一个守护任务，
+    asyncio.run 退出前取消全部未完成任务时由它在循环内关闭会话并注销；
+    未经 asyncio.run 管理、已关闭的循环在下次创建会话时清理
+    """
+
+    _sessions = {}
+    _closers = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def _get_session(cls) -> aiohttp.ClientSession:
+        """获取当前事件循环对应的会话，不存在或已关闭时创建"""
+        loop = asyncio.get_running_loop()
+        with HttpClientBase._lock:
+            session = HttpClientBase._sessions.get(loop)
+            if session is not None and not session.closed:
+                return session
+            HttpClientBase._prune()
+            connector = aiohttp.TCPConnector(limit=HTTP_POOL_LIMIT,
+                                             limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+                                             ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+                                             keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT)
+            session = aiohttp.ClientSession(connector=connector)
+            HttpClientBase._sessions[loop] = session
+            HttpClientBase._closers[loop] = loop.create_task(HttpClientBase._close_on_shutdown(loop, session))
+        return session
+
+    @staticmethod
+    async def _close_on_shutdown(loop, session):
+        """守护任务：一直等待到被取消（循环结束或主动关闭），随后在所属循环内关闭会话"""
+        try:
+            await loop.create_future()
+        finally:
+            with HttpClientBase._lock:
+                if HttpClientBase._sessions.get(loop) is session:
+                    HttpClientBase._sessions.pop(loop, None)
+                    HttpClientBase._closers.pop(loop, None)
+            if not session.closed:
+                await session.close()
+
+    @staticmethod
+    def _prune():
+        """注销已关闭循环的会话（调用方持有锁），这些会话已无法在所属循环内关闭"""
+        for loop in [loop for loop in HttpClientBase._sessions if loop.is_closed()]:
+            session = HttpClientBase._sessions.pop(loop)
+            HttpClientBase._closers.pop(loop, None)
+            if not session.closed:
+                logger.warning("事件循环已关闭但HTTP会话未关闭，请在循环结束前调用 HttpClientBase.close()")
+
+    @classmethod
+    async def close(cls):
+        """关闭当前事件循环对应的会话"""
+        loop = asyncio.get_running_loop()
+        with HttpClientBase._lock:
+            session = HttpClientBase._sessions.pop(loop, None)
+            closer = HttpClientBase._closers.pop(loop, None)
+        if closer is not None:
+            closer.cancel()
+        if session is not None and not session.closed:
+            await session.close()
+
+    @classmethod
+    def close_all(cls):
+        """关闭所有事件循环中的会话，进程退出时自动调用"""
+        with HttpClientBase._lock:
+            sessions = list(HttpClientBase._sessions.items())
+            HttpClientBase._sessions.clear()
+            HttpClientBase._closers.clear()
+        for loop, session in sessions:
+            if session.closed or loop.is_closed():
+                continue
+            try:
+                if loop.is_running():
+                    # 会话属于其他线程中运行的循环，交由该循环关闭
+                    asyncio.run_coroutine_threadsafe(session.close(), loop).result(timeout=5)
+                else:
+                    loop.run_until_complete(session.close())
+            except Exception as e:
+                logger.error(f"关闭HTTP会话时发生错误: {str(e)}")
+
     @classmethod
     async def _method(cls, method: str, url: str, headers: dict = None, json_body: dict = None, params=None, timeout=120):
         if not headers:
             headers = {}
 
-        async with aiohttp.ClientSession() as session:
-            async with session.request(method, url,
-                                       params=params,
-                                       json=json_body,
-                                       headers=headers,
-                                       timeout=aiohttp.ClientTimeout(total=timeout)
-                                       ) as response:
-                if response.status != 200:
-                    raise Exception(f'{url} 调用失败: {response.status}')
-                return await response.json()
+        session = cls._get_session()
+        async with session.request(method, url,
+                                   params=params,
+                                   json=json_body,
+                                   headers=headers,
+                                   timeout=aiohttp.ClientTimeout(total=timeout)
+                                   ) as response:
+            if response.status != 200:
+                raise Exception(f'{url} 调用失败: {response.status}')
+            return await response.json()
 
     @classmethod
     async def post(cls, url: str, headers: dict = None, json_body: dict = None, params=None, timeout=120):
@@ -29,3 +129,6 @@ class HttpClientBase:
     @classmethod
     async def put(cls, url: str, headers: dict = None, json_body: dict = None, params=None, timeout=5):
         return await cls._method("PUT", url=url, headers=headers, json_body=json_body, params=params, timeout=timeout)
+
+
+atexit.register(HttpClientBase.close_all)
@@ -0,0 +1,381 @@
+import logging
+from functools import lru_cache
+from typing import Optional, Tuple
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('cypher_builder')
+
+# 意图标签枚举，与 zhipu_client.qa_system_content 中的【意图标签枚举】一致，即图谱中全部的关系类型
+INTENT_RELATIONS = (
+    "作者", "关键字", "别称", "包含",
+    "危害作物", "发生规律", "学名",
+    "形态特征", "摘要", "期刊", "父类",
+    "生活习性", "病害", "症状", "研究文献",
+    "简介", "网址", "虫害", "防治方法"
+)
+_INTENT_RELATION_SET = frozenset(INTENT_RELATIONS)
+
+# 各意图标签的触发关键词，标签本身也作为关键词，供本地问题解析器识别意图、语义缓存校验意图是否一致
+INTENT_KEYWORDS = {
+    "作者": ["作者", "谁提出", "谁写", "谁发表"],
+    "关键字": ["关键字", "关键词"],
+    "别称": ["别称", "别名", "俗称", "又叫", "又称", "也叫"],
+    "包含": ["包含", "包括", "分为", "有哪些种类"],
+    "危害作物": ["危害作物", "危害哪些作物", "危害什么作物", "寄主"],
+    "发生规律": ["发生规律", "发病规律", "流行规律", "发生条件"],
+    "学名": ["学名", "拉丁名", "科学名"],
+    "形态特征": ["形态特征", "形态", "长什么样", "外形"],
+    "摘要": ["摘要"],
+    "期刊": ["期刊", "发表在"],
+    "父类": ["父类", "属于什么", "属于哪"],
+    "生活习性": ["生活习性", "习性"],
+    "病害": ["病害", "什么病", "哪些病"],
+    "症状": ["症状", "病症", "表现"],
+    "研究文献": ["研究文献", "文献", "论文"],
+    "简介": ["简介", "介绍", "概况"],
+    "网址": ["网址", "链接", "网站"],
+    "虫害": ["虫害", "害虫", "什么虫", "哪些虫"],
+    "防治方法": ["防治方法", "防治", "防控", "治疗", "怎么治", "用什么药"],
+}
+
+
+# 名称查找键标签：所有节点额外带有该标签（见 neo4j_client），查询返回的节点类别不包含它
+ENTITY_LABEL = "Entity"
+
+
+def category_expression(var: str) -> str:
+    """节点类别：查找键标签以外的第一个标签"""
+    return f"HEAD([label IN LABELS({var}) WHERE label <> '{ENTITY_LABEL}'])"
+
+
+# 与 neo4j_client.NAME_KEY_EXPRESSION 一致的名称查找键表达式，name_key 缺失时按此逐节点比较
+_LEGACY_KEY_EXPRESSION = "toLower(trim(COALESCE({var}.name, {var}.title, '')))"
+
+# name_key 覆盖情况：三个计数分别来自计数存储、计数存储和 name_key 索引扫描，不扫描全图
+NAME_KEY_COVERAGE_QUERY = f"""
+        CALL {{ MATCH (n) RETURN count(n) AS total }}
+        CALL {{ MATCH (n:{ENTITY_LABEL}) RETURN count(n) AS entities }}
+        CALL {{ MATCH (n:{ENTITY_LABEL}) WHERE n.name_key IS NOT NULL RETURN count(n) AS keyed }}
+        RETURN total, entities, keyed
+"""
+
+# 标签与关系类型元数据，统计信息据此逐个从计数存储中读取
+LABELS_QUERY = "CALL db.labels() YIELD label RETURN collect(label) AS labels"
+RELATIONSHIP_TYPES_QUERY = ("CALL db.relationshipTypes() YIELD relationshipType "
+                            "RETURN collect(relationshipType) AS types")
+
+# 服务端版本，决定子图查询的连接度写法
+SERVER_VERSION_QUERY = """
+        CALL dbms.components() YIELD versions
+        RETURN versions[0] AS version
+"""
+
+# 全部实体名称，供本地问题解析器构建实体词典（不限定查找键标签，name_key 回填前同样可用）
+ENTITY_NAMES_QUERY = """
+        MATCH (n)
+        WHERE n.name IS NOT NULL
+        RETURN DISTINCT n.name AS name
+"""
+
+# 按节点ID区间 [$start_id, $end_id) 分页读取节点的类别及全部邻居ID（连接度即邻居列表长度），
+# ID等值匹配走NodeByIdSeek而非全图扫描，已删除的ID只是一次查找落空
+DEGREE_PAGE_QUERY = f"""
+        UNWIND range($start_id, $end_id - 1) AS node_id
+        MATCH (n)
+        WHERE ID(n) = node_id
+        RETURN ID(n) AS id,
+               COALESCE(n.name, n.title, '') AS name,
+               {category_expression('n')} AS category,
+               [(n)--(m) | ID(m)] AS neighbors
+"""
+
+# 中心节点及其1跳邻居，两条查询共用同一返回结构
+_NEIGHBORHOOD_RETURN = f"""
+            OPTIONAL MATCH (center)-[r]-(neighbor)
+            WITH center, neighbor, r
+            LIMIT $limit
+            RETURN 
+                ID(center) AS center_id, 
+                COALESCE(center.name, center.title, '') AS center_name, 
+                {category_expression('center')} AS center_category,
+                ID(neighbor) AS neighbor_id, 
+                COALESCE(neighbor.name, neighbor.title, '') AS neighbor_name, 
+                {category_expression('neighbor')} AS neighbor_category,
+                ID(r) AS rel_id,
+                TYPE(r) AS rel_type,
+                ID(startNode(r)) AS source_id,
+                ID(endNode(r)) AS target_id
+"""
+
+
+NODE_NEIGHBORS_QUERY = """
+            MATCH (center)
+            WHERE ID(center) = $node_id""" + _NEIGHBORHOOD_RETURN
+
+FULLTEXT_SEARCH_QUERY = f"""
+        CALL db.index.fulltext.queryNodes($index_name, $search_term, {{limit: $limit}})
+        YIELD node, score
+        RETURN ID(node) AS id, 
+               COALESCE(node.name, node.title, '') AS name, 
+               {category_expression('node')} AS category,
+               score
+"""
+
+SCAN_SEARCH_QUERY = f"""
+        MATCH (n)
+        WHERE toLower(COALESCE(n.name, n.title, '')) CONTAINS toLower($search_term)
+        RETURN ID(n) AS id, 
+               COALESCE(n.name, n.title, '') AS name, 
+               {category_expression('n')} AS category,
+               null AS score
+        LIMIT $limit
+"""
+
+
+def is_valid_relation(relation: Optional[str]) -> bool:
+    """关系是否属于意图标签枚举"""
+    return relation in _INTENT_RELATION_SET
+
+
+def _quote(identifier: str) -> str:
+    """Cypher标识符转义"""
+    return "`" + identifier.replace("`", "``") + "`"
+
+
+def _name_key(var: str, keyed: bool) -> str:
+    """节点的名称查找键：keyed时为 name_key 属性，否则为按名称计算的表达式"""
+    return f"COALESCE({var}.name_key, '')" if keyed else _LEGACY_KEY_EXPRESSION.format(var=var)
+
+
+def _keyed_node(var: str, key_expression: str, keyed: bool, label: Optional[str] = None) -> Tuple[str, str]:
+    """
+    按名称查找键匹配的节点模式及附加条件
+
+    keyed时走 (:Entity {name_key}) 查找键索引，条件为空；name_key 尚未回填或索引不可用时
+    退回按名称表达式逐节点比较，可附加标签提示以缩小匹配范围
+
+    Returns:
+        tuple: (节点模式, WHERE条件或空字符串)
+    """
+    labels = f":{_quote(label)}" if label else ""
+    if keyed:
+        return f"({var}:{ENTITY_LABEL}{labels} {{name_key: {key_expression}}})", ""
+    return f"({var}{labels})", f"{_LEGACY_KEY_EXPRESSION.format(var=var)} = {key_expression}"
+
+
+def _where(*conditions: str, indent: str = "            ") -> str:
+    """拼接非空条件为WHERE子句（含换行），全部为空时返回空字符串"""
+    conditions = [condition for condition in conditions if condition]
+    return f"\n{indent}WHERE " + " AND ".join(conditions) if conditions else ""
+
+
+@lru_cache(maxsize=2)
+def build_entity_triplets_query(keyed: bool = True) -> str:
+    """实体名称相关的所有三元组（实体作为头或尾）"""
+    head, head_condition = _keyed_node('h', '$name_key', keyed)
+    tail, tail_condition = _keyed_node('t', '$name_key', keyed)
+    return f"""
+            MATCH {head}-[r]->(t){_where(head_condition)}
+            RETURN h.name AS head, type(r) AS relation, t.name AS tail
+            UNION ALL
+            MATCH (h)-[r]->{tail}{_where(tail_condition, f"{_name_key('h', keyed)} <> $name_key")}
+            RETURN h.name AS head, type(r) AS relation, t.name AS tail
+"""
+
+
+@lru_cache(maxsize=2)
+def build_entity_neighbors_query(keyed: bool = True) -> str:
+    """按名称查找中心节点及其1跳邻居"""
+    center, condition = _keyed_node('center', '$name_key', keyed)
+    return f"""
+            MATCH {center}{_where(condition)}
+            WITH center LIMIT 1""" + _NEIGHBORHOOD_RETURN
+
+
+@lru_cache(maxsize=128)
+def build_head_relation_query(relation: str, head_label: Optional[str] = None, keyed: bool = True) -> str:
+    """头实体+关系 -> 尾实体，使用带类型的关系模式"""
+    head, condition = _keyed_node('h', '$head_key', keyed, head_label)
+    return f"""
+            MATCH {head}-[r:{_quote(relation)}]->(t){_where(condition)}
+            RETURN h.name AS head, type(r) AS relation, t.name AS tail
+    """
+
+
+@lru_cache(maxsize=128)
+def build_triplet_query(relation: str, head_label: Optional[str] = None, keyed: bool = True) -> str:
+    """验证三元组是否存在，使用带类型的关系模式"""
+    head, head_condition = _keyed_node('h', '$head_key', keyed, head_label)
+    tail, tail_condition = _keyed_node('t', '$tail_key', keyed)
+    return f"""
+            MATCH {head}-[r:{_quote(relation)}]->{tail}{_where(head_condition, tail_condition)}
+            RETURN h.name AS head, type(r) AS relation, t.name AS tail
+    """
+
+
+@lru_cache(maxsize=128)
+def build_batch_triplet_query(relations: Tuple[str, ...], with_entity: bool, keyed: bool = True) -> str:
+    """
+    批量三元组查询：一次往返解析同一跳内所有互不依赖的三元组
+
+    每种关系类型编译为一个带类型的UNION分支，row.mode 与 query_kg_triplets 的分支一一对应：
+    entity / head_relation / triplet。按（关系集合, 是否含实体查询, 是否使用name_key）缓存
+
+    Args:
+        relations: 本批次出现的关系类型（已校验、已排序）
+        with_entity: 本批次是否包含只有头实体的实体查询
+        keyed: 是否通过 name_key 索引匹配实体
+    """
+    head, head_condition = _keyed_node('h', 'row.head_key', keyed)
+    tail, tail_condition = _keyed_node('t', 'row.head_key', keyed)
+    branches = []
+    if with_entity:
+        branches.append(f"""
+    WITH row
+    WITH row WHERE row.mode = 'entity'
+    MATCH {head}-[r]->(t){_where(head_condition, indent="    ")}
+    RETURN h.name AS head, type(r) AS relation, t.name AS tail""")
+        branches.append(f"""
+    WITH row
+    WITH row WHERE row.mode = 'entity'
+    MATCH (h)-[r]->{tail}{_where(tail_condition, f"{_name_key('h', keyed)} <> row.head_key", indent="    ")}
+    RETURN h.name AS head, type(r) AS relation, t.name AS tail""")
+    for relation in relations:
+        tail_match = f"(row.mode <> 'triplet' OR {_name_key('t', keyed)} = row.tail_key)"
+        branches.append(f"""
+    WITH row
+    WITH row WHERE row.mode <> 'entity' AND row.relation = '{relation}'
+    MATCH {head}-[r:{_quote(relation)}]->(t){_where(head_condition, tail_match, indent="    ")}
+    RETURN h.name AS head, type(r) AS relation, t.name AS tail""")
+
+    return ("""
+UNWIND $rows AS row
+CALL {""" + "\n    UNION ALL".join(branches) + """
+}
+RETURN row.idx AS idx, head, relation, tail
+""")
+
+
+@lru_cache(maxsize=128)
+def compile_dependency_chain(relations: Tuple[str, ...], bound_tail: bool = False, keyed: bool = True) -> str:
+    """
+    将Qn依赖链编译为一条Cypher查询，每一跳以上一跳的尾实体（去重并按$limits截断）为头实体
+
+    Args:
+        relations: 每一跳的关系类型（已校验）
+        bound_tail: 最后一跳的尾实体是否为确定实体（需匹配$tail_key）
+        keyed: 是否通过 name_key 索引匹配实体
+
+    Returns:
+        str: 返回hop0..hopN（每跳的三元组列表）及frontier0..frontierN（下一跳的头实体）的Cypher查询
+    """
+    hops = len(relations)
+    parts = []
+    for i, relation in enumerate(relations):
+        if i == 0:
+            head, condition = _keyed_node('h', '$head_key', keyed)
+            source = f"            MATCH {head}-[r:{_quote(relation)}]->(t)"
+            importing = ""
+        else:
+            head, condition = _keyed_node('h', 'toLower(trim(name))', keyed)
+            source = (f"            UNWIND frontier{i - 1} AS name\n"
+                      f"            MATCH {head}-[r:{_quote(relation)}]->(t)")
+            importing = f"            WITH frontier{i - 1}\n"
+        tail_condition = f"{_name_key('t', keyed)} = $tail_key" if bound_tail and i == hops - 1 else ""
+        source += _where(condition, tail_condition)
+        parts.append(
+            "        CALL {\n"
+            + importing + source + "\n"
+            f"            RETURN collect({{head: h.name, relation: type(r), tail: t.name}}) AS hop{i},\n"
+            f"                   collect(DISTINCT t.name)[..$limits[{i}]] AS frontier{i}\n"
+            "        }"
+        )
+    returns = ", ".join(f"hop{i}, frontier{i}" for i in range(hops))
+    return "\n".join(parts) + f"\n        RETURN {returns}\n"
+
+
+@lru_cache(maxsize=32)
+def compile_count_store_query(labels: Tuple[str, ...], relation_types: Tuple[str, ...]) -> str:
+    """
+    编译统计查询：每个子查询都是单标签/单关系类型的count，由计数存储直接给出结果，无需扫描节点和关系
+
+    Returns:
+        str: 返回 total_nodes, total_relations, label_0..label_N, type_0..type_M 的Cypher查询
+    """
+    parts = [
+        "        CALL { MATCH (n) RETURN count(n) AS total_nodes }",
+        "        CALL { MATCH ()-[r]->() RETURN count(r) AS total_relations }",
+    ]
+    columns = ["total_nodes", "total_relations"]
+    for i, label in enumerate(labels):
+        parts.append(f"        CALL {{ MATCH (n:{_quote(label)}) RETURN count(n) AS label_{i} }}")
+        columns.append(f"label_{i}")
+    for i, relation_type in enumerate(relation_types):
+        parts.append(f"        CALL {{ MATCH ()-[r:{_quote(relation_type)}]->() RETURN count(r) AS type_{i} }}")
+        columns.append(f"type_{i}")
+    return "\n".join(parts) + f"\n        RETURN {', '.join(columns)}\n"
+
+
+def degree_expression(var: str, count_subquery: bool) -> str:
+    """
+    节点连接度：两种写法都由规划器直接读取节点的度数存储，不展开关系。
+    COUNT {} 子查询为5.x语法，4.x不支持；size() 模式表达式在5.x已移除
+    """
+    return f"COUNT {{ ({var})--() }}" if count_subquery else f"size(({var})--())"
+
+
+@lru_cache(maxsize=16)
+def compile_subgraph_query(depth: int, count_subquery: bool = True) -> str:
+    """
+    编译单次往返的子图查询：中心节点的depth跳邻居（按预算截断）、节点连接度以及子图内部的边。
+
+    邻居逐跳扩展，每一跳是带自己LIMIT的子查询，只从上一跳的新节点出发，已达到节点预算后不再扩展，
+    避免 [*1..depth] 可变长路径在LIMIT生效前枚举全部路径（遇到枢纽节点时路径数随深度指数增长）。
+    内部边按成员节点对匹配，两端都已绑定，规划器使用Expand(Into)只检查两点之间的关系，
+    不会展开枢纽节点的全部关系；逐对产出，LIMIT到达边预算即停止。
+    跳数决定子查询个数，因此按（深度, 连接度写法）编译并缓存
+
+    Args:
+        depth: 扩展跳数
+        count_subquery: 服务端是否支持 COUNT {} 子查询（5.x起），见 degree_expression
+    """
+    hops = []
+    for hop in range(1, max(1, int(depth)) + 1):
+        hops.append(f"""
+        CALL {{
+            WITH frontier, seen
+            UNWIND CASE WHEN size(seen) > $node_budget THEN [] ELSE frontier END AS n
+            MATCH (n)--(m)
+            WHERE NOT m IN seen
+            WITH DISTINCT m LIMIT $neighbor_limit
+            RETURN collect(m) AS hop{hop}
+        }}
+        WITH hop{hop} AS frontier, seen + hop{hop} AS seen""")
+    return f"""
+        MATCH (center)
+        WHERE ID(center) IN $node_ids
+        WITH collect(center) AS frontier
+        WITH frontier, frontier AS seen{"".join(hops)}
+        WITH seen[..$node_budget] AS members,
+             size(seen) > $node_budget AS node_truncated
+        CALL {{
+            WITH members
+            UNWIND members AS n
+            RETURN collect({{
+                id: ID(n),
+                name: COALESCE(n.name, n.title, ''),
+                category: {category_expression('n')},
+                degree: {degree_expression('n', count_subquery)}
+            }}) AS nodes
+        }}
+        CALL {{
+            WITH members
+            UNWIND members AS a
+            UNWIND members AS b
+            MATCH (a)-[r]->(b)
+            WITH a, r, b LIMIT $edge_limit
+            RETURN collect({{source: ID(a), target: ID(b), type: TYPE(r)}}) AS edges
+        }}
+        RETURN nodes, edges, node_truncated
+    """
@@ -0,0 +1,378 @@
+import logging
+import os
+import sys
+import threading
+import time
+from array import array
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+from AGKG.client.cypher_builder import category_expression
+from AGKG.client.neo4j_client import normalize_name_key
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('graph_replica')
+
+# 快照替换后旧快照保持映射的秒数，之后关闭映射
+SNAPSHOT_RETIRE_SECONDS = float(os.getenv("KG_SNAPSHOT_RETIRE_SECONDS", "30"))
+
+NODE_QUERY = f"""
+MATCH (n)
+RETURN ID(n) AS id,
+       COALESCE(n.name, n.title, '') AS name,
+       {category_expression('n')} AS label
+"""
+
+EDGE_QUERY = """
+MATCH (a)-[r]->(b)
+RETURN ID(r) AS id, ID(a) AS source, ID(b) AS target, TYPE(r) AS type
+"""
+
+
+class CSRGraph:
+    """
+    知识图谱的只读内存副本，邻接关系以CSR（压缩稀疏行）数组存储
+
+    节点按Neo4j ID升序编号为 0..n-1；每个节点的邻接项（无向）位于
+    neighbors[offsets[i]:offsets[i + 1]]，同一位置的 edge_index 指向边数组，
+    outgoing 标记该边是否由当前节点出发
+    """
+
+    def __init__(self, node_ids, names, node_labels, label_table,
+                 edge_ids, edge_types, type_table, offsets, neighbors, edge_index, outgoing):
+        self.node_ids = node_ids          # int64[n]   Neo4j节点ID（升序）
+        self.names = names                # list[str]  节点名称（已intern）
+        self.node_labels = node_labels    # int16[n]   标签编号，-1表示无标签
+        self.label_table = label_table    # list[str]
+        self.edge_ids = edge_ids          # int64[m]   Neo4j关系ID
+        self.edge_types = edge_types      # int16[m]   关系类型编号
+        self.type_table = type_table      # list[str]
+        self.offsets = offsets            # int64[n+1]
+        self.neighbors = neighbors        # int32[2m]
+        self.edge_index = edge_index      # int32[2m]
+        self.outgoing = outgoing          # bool[2m]
+        self.name_index = {}
+        for i, name in enumerate(names):
+            self.name_index.setdefault(normalize_name_key(name), i)
+
+    @classmethod
+    def build(cls, node_ids, names, labels, edge_ids, edge_sources, edge_targets, edge_types):
+        """
+        由节点列与边列构建CSR结构，节点/边的标签和类型为字符串列表
+
+        端点不在节点列中的边（读取期间被并发写入的节点）会被丢弃，不会挂到相邻ID的节点上
+        """
+        order = np.argsort(np.asarray(node_ids, dtype=np.int64), kind='stable')
+        node_ids = np.asarray(node_ids, dtype=np.int64)[order]
+        names = [sys.intern(names[i]) for i in order]
+        label_table, label_codes = cls._intern_column([labels[i] for i in order])
+        type_table, type_codes = cls._intern_column(edge_types)
+
+        edge_ids = np.asarray(edge_ids, dtype=np.int64)
+        edge_sources = np.asarray(edge_sources, dtype=np.int64)
+        edge_targets = np.asarray(edge_targets, dtype=np.int64)
+        if len(node_ids):
+            sources = np.minimum(np.searchsorted(node_ids, edge_sources), len(node_ids) - 1)
+            targets = np.minimum(np.searchsorted(node_ids, edge_targets), len(node_ids) - 1)
+            valid = (node_ids[sources] == edge_sources) & (node_ids[targets] == edge_targets)
+        else:
+            sources = targets = np.zeros(len(edge_ids), dtype=np.int64)
+            valid = np.zeros(len(edge_ids), dtype=bool)
+        if not valid.all():
+            logger.warning(f"丢弃{int((~valid).sum())}条端点不在节点列表中的关系")
+            edge_ids, type_codes, sources, targets = edge_ids[valid], type_codes[valid], sources[valid], targets[valid]
+        edge_count = len(edge_ids)
+
+        # 每条边在两个端点各登记一次，按端点稳定排序得到CSR
+        endpoints = np.concatenate([sources, targets])
+        others = np.concatenate([targets, sources]).astype(np.int32)
+        positions = np.concatenate([np.arange(edge_count), np.arange(edge_count)]).astype(np.int32)
+        outgoing = np.concatenate([np.ones(edge_count, dtype=bool), np.zeros(edge_count, dtype=bool)])
+        adjacency_order = np.argsort(endpoints, kind='stable')
+
+        offsets = np.zeros(len(node_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(endpoints, minlength=len(node_ids)), out=offsets[1:])
+
+        return cls(node_ids, names, label_codes, label_table,
+                   edge_ids, type_codes, type_table,
+                   offsets, others[adjacency_order], positions[adjacency_order], outgoing[adjacency_order])
+
+    @staticmethod
+    def _intern_column(values):
+        """将字符串列转换为 (字典, int16编号数组)，None编号为-1"""
+        table, codes = [], {}
+        column = np.empty(len(values), dtype=np.int16)
+        for i, value in enumerate(values):
+            if value is None:
+                column[i] = -1
+                continue
+            code = codes.get(value)
+            if code is None:
+                code = codes[value] = len(table)
+                table.append(value)
+            column[i] = code
+        return table, column
+
+    @property
+    def node_count(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.edge_ids)
+
+    def find_by_name(self, name: str) -> Optional[int]:
+        """按名称查找键返回节点编号"""
+        return self.name_index.get(normalize_name_key(name))
+
+    def find_by_id(self, node_id: int) -> Optional[int]:
+        """按Neo4j节点ID返回节点编号"""
+        i = int(np.searchsorted(self.node_ids, node_id))
+        if i < len(self.node_ids) and self.node_ids[i] == node_id:
+            return i
+        return None
+
+    def name(self, i: int) -> str:
+        return self.names[i]
+
+    def label(self, i: int) -> Optional[str]:
+        code = self.node_labels[i]
+        return self.label_table[code] if code >= 0 else None
+
+    def degree(self, i: int) -> int:
+        return int(self.offsets[i + 1] - self.offsets[i])
+
+    def neighbor_ids(self, i: int):
+        """返回节点的所有邻居（Neo4j节点ID）"""
+        return self.node_ids[self.neighbors[self.offsets[i]:self.offsets[i + 1]]]
+
+    def edge(self, slot: int, i: int) -> Dict[str, Any]:
+        """将第slot个邻接项转换为与Neo4jClient一致的边字典"""
+        e = self.edge_index[slot]
+        other = int(self.node_ids[self.neighbors[slot]])
+        own = int(self.node_ids[i])
+        source, target = (own, other) if self.outgoing[slot] else (other, own)
+        return {
+            "id": int(self.edge_ids[e]),
+            "source": source,
+            "target": target,
+            "name": self.type_table[self.edge_types[e]]
+        }
+
+
+def load_csr_graph(neo4j_client) -> CSRGraph:
+    """
+    在同一个读事务中流式读取全部节点和关系，构建CSR结构
+
+    读事务不保证快照一致，两次查询之间仍可能有并发写入，由 CSRGraph.build 丢弃端点缺失的关系
+    """
+    def work(tx):
+        node_ids, names, labels = array('q'), [], []
+        edge_ids, sources, targets, types = array('q'), array('q'), array('q'), []
+        for record in tx.run(NODE_QUERY):
+            node_ids.append(record["id"])
+            names.append(record["name"])
+            labels.append(record["label"])
+        for record in tx.run(EDGE_QUERY):
+            edge_ids.append(record["id"])
+            sources.append(record["source"])
+            targets.append(record["target"])
+            types.append(record["type"])
+        return node_ids, names, labels, edge_ids, sources, targets, types
+
+    with neo4j_client.session() as session:
+        # 5.x驱动为execute_read，4.x驱动为read_transaction
+        execute_read = getattr(session, "execute_read", None) or session.read_transaction
+        columns = execute_read(work)
+    return CSRGraph.build(*columns)
+
+
+class GraphReplica:
+    """
+    知识图谱的进程内只读副本，Neo4j仍是唯一数据源
+
+    为一跳邻域读取（get_entity_and_neighbors / get_entity_neighbors_by_id /
+    get_subgraph_from_nodes）提供免网络往返的实现，返回结构与Neo4jClient一致
+    """
+
+    def __init__(self, neo4j_client, refresh_interval: Optional[float] = None, snapshot_path: Optional[str] = None):
+        self.neo4j_client = neo4j_client
+        # 配置了快照文件时从mmap快照加载，多个worker进程共享同一份物理内存
+        self.snapshot_path = snapshot_path if snapshot_path is not None else os.getenv("KG_SNAPSHOT_PATH")
+        self.refresh_interval = refresh_interval if refresh_interval is not None else \
+            float(os.getenv("KG_REPLICA_REFRESH_SECONDS", "600"))
+        self.graph: Optional[CSRGraph] = None
+        self.loaded_at = 0.0
+        # 当前映射的快照文件的 (mtime, 大小, inode)，文件未变化时刷新不再重新映射
+        self._snapshot_stat = None
+        self._refresh_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def ready(self) -> bool:
+        return self.graph is not None
+
+    def refresh(self) -> bool:
+        """从Neo4j（或配置的mmap快照文件）重新加载全图并原子替换当前副本"""
+        if not self._refresh_lock.acquire(blocking=False):
+            logger.info("图副本正在刷新，跳过本次请求")
+            return False
+        try:
+            start = time.time()
+            if self.snapshot_path:
+                if not self._load_snapshot():
+                    return True
+            else:
+                if not self.neo4j_client.driver:
+                    logger.error("数据库未连接，无法加载图副本")
+                    return False
+                self.graph = load_csr_graph(self.neo4j_client)
+            self.loaded_at = time.time()
+            logger.info(f"图副本加载完成: {self.graph.node_count}个节点, {self.graph.edge_count}条关系, "
+                        f"耗时{self.loaded_at - start:.2f}秒")
+            return True
+        except Exception as e:
+            logger.error(f"加载图副本时出错: {e}")
+            return False
+        finally:
+            self._refresh_lock.release()
+
+    def _load_snapshot(self) -> bool:
+        """
+        快照文件变化时重新映射并替换当前副本，旧快照在宽限期后关闭映射，留给正在读取旧副本的请求完成
+
+        Returns:
+            bool: 是否加载了新的快照，文件未变化时为False
+        """
+        from AGKG.client.graph_snapshot import GraphSnapshot
+        stat = os.stat(self.snapshot_path)
+        signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        if self.graph is not None and signature == self._snapshot_stat:
+            logger.debug(f"图快照 {self.snapshot_path} 未变化，跳过重新映射")
+            return False
+
+        previous = self.graph
+        self.graph = GraphSnapshot(self.snapshot_path)
+        self._snapshot_stat = signature
+        if isinstance(previous, GraphSnapshot):
+            closer = threading.Timer(SNAPSHOT_RETIRE_SECONDS, previous.close)
+            closer.daemon = True
+            closer.start()
+        return True
+
+    def start(self):
+        """在后台线程中加载副本，并按refresh_interval定期刷新"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, name='graph-replica-refresh', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _refresh_loop(self):
+        while not self._stop_event.is_set():
+            self.refresh()
+            if self.refresh_interval <= 0:
+                break
+            self._stop_event.wait(self.refresh_interval)
+
+    def get_entity_and_neighbors(self, entity_name, limit=10):
+        """与 Neo4jClient.get_entity_and_neighbors 相同，从内存副本读取"""
+        graph = self.graph
+        center = graph.find_by_name(entity_name)
+        if center is None:
+            logger.warning(f"未能找到实体: {entity_name}")
+            return [], []
+        return self._neighborhood(graph, center, limit)
+
+    def get_entity_neighbors_by_id(self, node_id, limit=10):
+        """与 Neo4jClient.get_entity_neighbors_by_id 相同，从内存副本读取"""
+        graph = self.graph
+        center = graph.find_by_id(node_id)
+        if center is None:
+            logger.warning(f"未能找到节点: {node_id}")
+            return [], []
+        return self._neighborhood(graph, center, limit)
+
+    def _neighborhood(self, graph: CSRGraph, center: int, limit: int):
+        nodes = {
+            center: {
+                "id": int(graph.node_ids[center]),
+                "name": graph.name(center),
+                "category": graph.label(center),
+                "symbolSize": 50  # 中心节点大小
+            }
+        }
+        edges = {}
+        start = graph.offsets[center]
+        end = min(graph.offsets[center + 1], start + limit)
+        for slot in range(start, end):
+            neighbor = int(graph.neighbors[slot])
+            if neighbor not in nodes:
+                nodes[neighbor] = {
+                    "id": int(graph.node_ids[neighbor]),
+                    "name": graph.name(neighbor),
+                    "category": graph.label(neighbor),
+                    "symbolSize": 40  # 邻居节点大小
+                }
+            edge = graph.edge(slot, center)
+            edges.setdefault(edge["id"], edge)
+        return list(nodes.values()), list(edges.values())
+
+    def get_subgraph_from_nodes(self, node_ids, depth=1, node_budget=200, edge_budget=500):
+        """与 Neo4jClient.get_subgraph_from_nodes 相同，从内存副本读取"""
+        subgraph = self.fetch_subgraph(node_ids, depth, node_budget, edge_budget)
+        return subgraph["nodes"], subgraph["edges"]
+
+    def fetch_subgraph(self, node_ids, depth=1, node_budget=200, edge_budget=500) -> Dict[str, Any]:
+        """与 Neo4jClient.fetch_subgraph 相同：按预算截断的depth跳子图及其内部的边"""
+        graph = self.graph
+        centers = [i for i in (graph.find_by_id(node_id) for node_id in node_ids) if i is not None]
+        if not centers:
+            logger.warning("未能获取到节点数据")
+            return {"nodes": [], "edges": [], "truncated": False}
+
+        # 广度优先扩展，达到节点预算后停止
+        members = dict.fromkeys(centers[:node_budget])
+        truncated = len(centers) > node_budget
+        frontier = list(members)
+        for _ in range(depth):
+            next_frontier = []
+            for i in frontier:
+                for neighbor in graph.neighbors[graph.offsets[i]:graph.offsets[i + 1]]:
+                    neighbor = int(neighbor)
+                    if neighbor in members:
+                        continue
+                    if len(members) >= node_budget:
+                        truncated = True
+                        break
+                    members[neighbor] = None
+                    next_frontier.append(neighbor)
+            frontier = next_frontier
+
+        nodes = [
+            {
+                "id": int(graph.node_ids[i]),
+                "name": graph.name(i),
+                "category": graph.label(i),
+                "symbolSize": min(40 + graph.degree(i) * 2, 80)  # 节点大小根据连接度调整
+            }
+            for i in members
+        ]
+
+        # 子图内部的边：只从出边一侧登记，避免重复
+        edges = []
+        for i in members:
+            for slot in range(graph.offsets[i], graph.offsets[i + 1]):
+                if graph.outgoing[slot] and int(graph.neighbors[slot]) in members:
+                    if len(edges) >= edge_budget:
+                        truncated = True
+                        break
+                    edge = graph.edge(slot, i)
+                    edges.append({"source": edge["source"], "target": edge["target"], "name": edge["name"]})
+        return {"nodes": nodes, "edges": edges, "truncated": truncated}
@@ -0,0 +1,221 @@
+import json
+import logging
+import mmap
+import os
+import struct
+from typing import Optional
+
+import numpy as np
+
+from AGKG.client.graph_replica import CSRGraph, load_csr_graph
+from AGKG.client.neo4j_client import normalize_name_key
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('graph_snapshot')
+
+# 快照文件格式（小端）：
+#   头部: magic(8s) version(I) node_count(Q) edge_count(Q) section_count(I)
+#   段表: section_count 个 (offset(Q), length(Q))
+#   各段按8字节对齐，顺序见 SECTIONS
+SNAPSHOT_MAGIC = b'AGKGSNP1'
+SNAPSHOT_VERSION = 1
+_HEADER = struct.Struct('<8sIQQI')
+_SECTION = struct.Struct('<QQ')
+_ALIGNMENT = 8
+
+SECTIONS = (
+    ('node_ids', np.int64),       # Neo4j节点ID，升序
+    ('node_labels', np.int16),    # 标签编号，-1表示无标签
+    ('name_offsets', np.int64),   # names 段内每个名称的起止偏移，n+1项
+    ('names', np.uint8),          # UTF-8名称数据
+    ('key_offsets', np.int64),    # keys 段内每个查找键的起止偏移，n+1项
+    ('keys', np.uint8),           # 按字节序排序的UTF-8名称查找键
+    ('key_nodes', np.int32),      # 每个排序后查找键对应的节点编号
+    ('offsets', np.int64),        # CSR行偏移，n+1项
+    ('neighbors', np.int32),      # 邻居节点编号
+    ('edge_index', np.int32),     # 邻接项对应的边编号
+    ('outgoing', np.bool_),       # 邻接项是否为出边
+    ('edge_ids', np.int64),       # Neo4j关系ID
+    ('edge_types', np.int16),     # 关系类型编号
+    ('dictionaries', np.uint8),   # JSON: {"labels": [...], "relation_types": [...]}
+)
+
+
+# GraphSnapshot 中直接指向映射内存的列属性
+_MAPPED_COLUMNS = ('node_ids', 'node_labels', 'name_offsets', 'key_offsets', 'key_nodes', 'offsets',
+                   'neighbors', 'edge_index', 'outgoing', 'edge_ids', 'edge_types')
+
+
+def _pack_strings(strings):
+    """将字符串列表编码为 (偏移数组, 数据字节)"""
+    encoded = [value.encode('utf-8') for value in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return offsets, b''.join(encoded)
+
+
+def write_snapshot(graph: CSRGraph, path: str) -> int:
+    """
+    将CSR图写入快照文件，先写临时文件再原子替换，已映射旧文件的进程不受影响
+
+    Returns:
+        int: 快照文件字节数
+    """
+    name_offsets, names = _pack_strings(graph.names)
+    keyed = sorted((normalize_name_key(name).encode('utf-8'), i) for i, name in enumerate(graph.names))
+    key_offsets = np.zeros(len(keyed) + 1, dtype=np.int64)
+    np.cumsum([len(key) for key, _ in keyed], out=key_offsets[1:])
+    dictionaries = json.dumps({"labels": graph.label_table, "relation_types": graph.type_table},
+                              ensure_ascii=False).encode('utf-8')
+
+    columns = {
+        'node_ids': graph.node_ids,
+        'node_labels': graph.node_labels,
+        'name_offsets': name_offsets,
+        'names': names,
+        'key_offsets': key_offsets,
+        'keys': b''.join(key for key, _ in keyed),
+        'key_nodes': np.asarray([i for _, i in keyed], dtype=np.int32),
+        'offsets': graph.offsets,
+        'neighbors': graph.neighbors,
+        'edge_index': graph.edge_index,
+        'outgoing': graph.outgoing,
+        'edge_ids': graph.edge_ids,
+        'edge_types': graph.edge_types,
+        'dictionaries': dictionaries,
+    }
+
+    payloads = []
+    for name, dtype in SECTIONS:
+        column = columns[name]
+        payloads.append(column if isinstance(column, bytes) else np.ascontiguousarray(column, dtype=dtype).tobytes())
+
+    position = _HEADER.size + _SECTION.size * len(SECTIONS)
+    table = []
+    for payload in payloads:
+        position += -position % _ALIGNMENT
+        table.append((position, len(payload)))
+        position += len(payload)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, graph.node_count, graph.edge_count, len(SECTIONS)))
+        for offset, length in table:
+            f.write(_SECTION.pack(offset, length))
+        for (offset, _), payload in zip(table, payloads):
+            f.write(b'\0' * (offset - f.tell()))
+            f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return position
+
+
+def compile_snapshot(neo4j_client, path: str) -> int:
+    """
+    离线编译：从Neo4j导出全图并写入快照文件
+
+    Returns:
+        int: 快照文件字节数
+    """
+    graph = load_csr_graph(neo4j_client)
+    size = write_snapshot(graph, path)
+    logger.info(f"快照已写入 {path}: {graph.node_count}个节点, {graph.edge_count}条关系, {size}字节")
+    return size
+
+
+class GraphSnapshot(CSRGraph):
+    """
+    通过mmap只读映射的图快照，各列均为直接指向映射内存的numpy视图（零拷贝），
+    多个worker进程映射同一文件时共享同一份页缓存
+
+    不调用 CSRGraph.__init__：它会把全部名称解码为列表并建立 name_index 字典，
+    与零拷贝加载相违背。因此本类没有 name_index 属性，names 是按需解码的只读属性，
+    按名称查找改为在映射的排序查找键上二分查找（见 find_by_name）；CSRGraph 的其余列属性均由映射提供
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, node_count, edge_count, section_count = _HEADER.unpack_from(self._mmap, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError(f"无效的图快照文件: {path}")
+        if section_count != len(SECTIONS):
+            raise ValueError(f"图快照段数量不匹配: {section_count}")
+
+        sections = {}
+        for index, (name, dtype) in enumerate(SECTIONS):
+            offset, length = _SECTION.unpack_from(self._mmap, _HEADER.size + _SECTION.size * index)
+            count = length // np.dtype(dtype).itemsize
+            sections[name] = np.frombuffer(self._mmap, dtype=dtype, count=count, offset=offset)
+
+        self.node_ids = sections['node_ids']
+        self.node_labels = sections['node_labels']
+        self.name_offsets = sections['name_offsets']
+        self.key_offsets = sections['key_offsets']
+        self.key_nodes = sections['key_nodes']
+        self.offsets = sections['offsets']
+        self.neighbors = sections['neighbors']
+        self.edge_index = sections['edge_index']
+        self.outgoing = sections['outgoing']
+        self.edge_ids = sections['edge_ids']
+        self.edge_types = sections['edge_types']
+        self._names_view = memoryview(sections['names'])
+        self._keys_view = memoryview(sections['keys'])
+
+        dictionaries = json.loads(sections['dictionaries'].tobytes().decode('utf-8'))
+        self.label_table = dictionaries["labels"]
+        self.type_table = dictionaries["relation_types"]
+
+    def close(self):
+        """
+        释放映射：置空各列视图后关闭mmap。调用前应确保没有读取方仍在使用本快照；
+        切片等派生视图仍被引用时无法立即关闭，映射在这些视图回收后随mmap对象释放
+        """
+        for name in _MAPPED_COLUMNS:
+            setattr(self, name, None)
+        self._names_view.release()
+        self._keys_view.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            logger.warning(f"图快照 {self.path} 仍有视图被引用，映射将在其回收后释放")
+
+    @property
+    def names(self):
+        return [self.name(i) for i in range(self.node_count)]
+
+    def name(self, i: int) -> str:
+        return bytes(self._names_view[self.name_offsets[i]:self.name_offsets[i + 1]]).decode('utf-8')
+
+    def _key(self, position: int) -> bytes:
+        return bytes(self._keys_view[self.key_offsets[position]:self.key_offsets[position + 1]])
+
+    def find_by_name(self, name: str) -> Optional[int]:
+        """在排序后的查找键上二分查找，重名时返回编号最小的节点"""
+        target = normalize_name_key(name).encode('utf-8')
+        low, high = 0, self.node_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.node_count and self._key(low) == target:
+            return int(self.key_nodes[low])
+        return None
+
+    def resolve_name(self, name: str) -> Optional[int]:
+        """名称 -> Neo4j节点ID"""
+        i = self.find_by_name(name)
+        return int(self.node_ids[i]) if i is not None else None
+
+    def neighbors_of(self, node_id: int):
+        """Neo4j节点ID -> 邻居节点ID数组，直接读取映射内存中的邻接段"""
+        i = self.find_by_id(node_id)
+        if i is None:
+            return np.empty(0, dtype=np.int64)
+        return self.neighbor_ids(i)
@@ -1,9 +1,22 @@
-from neo4j import GraphDatabase
+from contextlib import contextmanager
+from neo4j import GraphDatabase, READ_ACCESS, unit_of_work
 import logging
+import re
+import time
 from typing import Dict, List, Any, Optional
 import os
 from neo4j.exceptions import ServiceUnavailable, ClientError
+from AGKG.utils.metrics import counter, gauge, histogram
+from AGKG.utils.deadline import Deadline, DeadlineExceeded
 from dotenv import load_dotenv
+from AGKG.client.cypher_builder import (is_valid_relation, build_head_relation_query, build_triplet_query,
+                                        build_batch_triplet_query, compile_dependency_chain,
+                                        compile_subgraph_query, build_entity_triplets_query,
+                                        LABELS_QUERY, RELATIONSHIP_TYPES_QUERY, compile_count_store_query,
+                                        DEGREE_PAGE_QUERY, ENTITY_NAMES_QUERY, NAME_KEY_COVERAGE_QUERY,
+                                        build_entity_neighbors_query, NODE_NEIGHBORS_QUERY,
+                                        FULLTEXT_SEARCH_QUERY, SCAN_SEARCH_QUERY, SERVER_VERSION_QUERY,
+                                        ENTITY_LABEL)
 
 # 加载环境变量
 load_dotenv()
@@ -15,6 +28,305 @@ logger = logging.getLogger('neo4j_client')
 # 创建Neo4j客户端的单例实例
 _neo4j_client_instance = None
 
+# 名称查找键：所有节点额外带有Entity标签，并以 name_key 保存规范化后的名称（去首尾空白、小写），
+# 索引已上线且全部节点都已回填时，精确名称查找走 (:Entity {name_key}) 索引，否则退回按名称逐节点比较；
+# 查询返回的节点类别会排除该标签
+NAME_KEY_INDEX_NAME = "entity_name_key"
+NAME_KEY_EXPRESSION = "toLower(trim(COALESCE(n.name, n.title, '')))"
+# 重新校验 name_key 覆盖情况的间隔（秒），之后新写入、尚未回填的节点会让查找退回按名称比较
+NAME_KEY_RECHECK_INTERVAL = float(os.getenv("NEO4J_NAME_KEY_RECHECK_SECONDS", "300"))
+# 启动时发现缺少 name_key 的节点时自动回填（会写库，多进程部署时建议只在一个进程或通过CLI执行）
+NAME_KEY_AUTO_BACKFILL = os.getenv("NEO4J_NAME_KEY_AUTO_BACKFILL", "false").lower() in ("1", "true", "yes")
+
+
+def normalize_name_key(name: Optional[str]) -> str:
+    """计算实体名称的查找键，与 NAME_KEY_EXPRESSION 保持一致"""
+    return (name or "").strip().lower()
+
+
+# 实体名称全文索引（CJK分词），用于替代CONTAINS全表扫描
+FULLTEXT_INDEX_NAME = os.getenv("NEO4J_FULLTEXT_INDEX", "entity_name_fulltext")
+FULLTEXT_ANALYZER = os.getenv("NEO4J_FULLTEXT_ANALYZER", "cjk")
+# 索引尚未上线时重新检查状态的间隔（秒）
+FULLTEXT_RECHECK_INTERVAL = 30
+# 子图查询的深度上限与默认节点/边预算，防止中心节点为枢纽实体时结果无限膨胀
+SUBGRAPH_MAX_DEPTH = int(os.getenv("NEO4J_SUBGRAPH_MAX_DEPTH", "3"))
+SUBGRAPH_NODE_BUDGET = int(os.getenv("NEO4J_SUBGRAPH_NODE_BUDGET", "200"))
+SUBGRAPH_EDGE_BUDGET = int(os.getenv("NEO4J_SUBGRAPH_EDGE_BUDGET", "500"))
+# Lucene查询语法中的特殊字符
+_LUCENE_SPECIAL_CHARS = re.compile(r'([+\-&|!(){}\[\]^"~*?:\\/])')
+
+# 连接池与查询指标
+POOL_MAX_SIZE = gauge("neo4j_pool_max_size", "Bolt连接池容量")
+SESSIONS_IN_USE = gauge("neo4j_sessions_in_use", "已借出的会话数（读事务、索引维护与图副本加载），每个会话执行期间占用一个连接")
+QUERY_SECONDS = histogram("neo4j_query_seconds", "读事务耗时（含连接获取与重试）")
+QUERY_ERRORS = counter("neo4j_query_errors_total", "读事务失败次数")
+TRANSACTION_RETRIES = counter("neo4j_transaction_retries_total", "读事务因瞬时错误重试的次数")
+
+
+def pool_config_from_env() -> Dict[str, Any]:
+    """
+    从环境变量读取Bolt连接池配置
+
+    NEO4J_MAX_POOL_SIZE: 连接池容量
+    NEO4J_POOL_ACQUISITION_TIMEOUT: 获取连接的超时时间（秒）
+    NEO4J_MAX_CONNECTION_LIFETIME: 连接最长存活时间（秒），超时后由连接池回收重建
+    NEO4J_KEEP_ALIVE: 是否开启TCP keep-alive
+    NEO4J_MAX_RETRY_TIME: 托管事务遇到瞬时错误时的最长重试时间（秒）
+    """
+    return {
+        "max_connection_pool_size": int(os.getenv("NEO4J_MAX_POOL_SIZE", "50")),
+        "connection_acquisition_timeout": float(os.getenv("NEO4J_POOL_ACQUISITION_TIMEOUT", "30")),
+        "max_connection_lifetime": float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "3600")),
+        "keep_alive": os.getenv("NEO4J_KEEP_ALIVE", "true").lower() in ("1", "true", "yes"),
+        "max_transaction_retry_time": float(os.getenv("NEO4J_MAX_RETRY_TIME", "15")),
+    }
+
+
+# ---- 查询结果整形 ----
+
+def escape_lucene(search_term: str) -> str:
+    """转义Lucene查询语法中的特殊字符"""
+    return _LUCENE_SPECIAL_CHARS.sub(r'\\\1', (search_term or "").strip())
+
+
+def triplet_rows(records) -> List[Dict[str, str]]:
+    """三元组查询结果 -> [{"head", "relation", "tail"}]"""
+    return [{"head": record["head"], "relation": record["relation"], "tail": record["tail"]}
+            for record in records]
+
+
+def entity_rows(records) -> List[Dict[str, Any]]:
+    """实体搜索结果 -> [{"id", "name", "category", "score"}]"""
+    return [
+        {
+            "id": record["id"],
+            "name": record["name"],
+            "category": record["category"],
+            "score": record["score"]
+        }
+        for record in records
+    ]
+
+
+def triplet_query_mode(head: str, relation: str, tail: str) -> Optional[str]:
+    """判断三元组的查询方式，与query_kg_triplets中的分支保持一致"""
+    if not head or head.startswith('Q'):
+        return None
+    if tail.startswith('Q'):
+        return 'head_relation'
+    if relation and tail:
+        return 'triplet'
+    if relation:
+        return 'head_relation'
+    return 'entity'
+
+
+def clamp_subgraph_request(depth, node_budget, edge_budget):
+    """子图请求参数的默认值与深度校验"""
+    node_budget = node_budget or SUBGRAPH_NODE_BUDGET
+    edge_budget = edge_budget or SUBGRAPH_EDGE_BUDGET
+    if not 1 <= depth <= SUBGRAPH_MAX_DEPTH:
+        logger.warning(f"不支持的深度值 {depth}，使用默认深度 1")
+        depth = 1
+    return depth, node_budget, edge_budget
+
+
+def triplet_batch_rows(triplets: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+    """批量查询的参数行：可以查询的三元组各一行，带原下标与查询方式"""
+    rows = []
+    for index, triplet in enumerate(triplets):
+        head = triplet.get("head", "")
+        relation = triplet.get("relation", "")
+        tail = triplet.get("tail", "")
+        mode = triplet_query_mode(head, relation, tail)
+        # 不在意图标签枚举中的关系不会有结果，无需发送到数据库
+        if mode and mode != 'entity' and not is_valid_relation(relation):
+            logger.warning(f"关系 {relation} 不在意图标签枚举中，跳过查询")
+            mode = None
+        if mode:
+            rows.append({"idx": index, "mode": mode, "relation": relation,
+                         "head_key": normalize_name_key(head), "tail_key": normalize_name_key(tail)})
+    return rows
+
+
+def triplet_batch_query(rows: List[Dict[str, Any]], use_name_key: bool) -> str:
+    """按参数行中出现的关系类型与查询方式生成批量查询"""
+    relations = tuple(sorted({row["relation"] for row in rows if row["mode"] != 'entity'}))
+    with_entity = any(row["mode"] == 'entity' for row in rows)
+    return build_batch_triplet_query(relations, with_entity, use_name_key)
+
+
+def group_triplet_batch(triplets: List[Dict[str, str]], rows: List[Dict[str, Any]],
+                        records) -> List[Optional[Dict[str, Any]]]:
+    """按下标拆分批量查询结果，返回与输入一一对应的 {"triplet", "result"} 或None"""
+    grouped = {row["idx"]: [] for row in rows}
+    for record in records:
+        grouped[record["idx"]].append({"head": record["head"], "relation": record["relation"], "tail": record["tail"]})
+
+    results = []
+    for index, triplet in enumerate(triplets):
+        query_result = grouped.get(index)
+        # 尾实体为Q值时，只有查到结果才记录，与逐条查询的行为一致
+        if query_result is None or (triplet.get("tail", "").startswith('Q') and not query_result):
+            results.append(None)
+            continue
+        results.append({"triplet": triplet, "result": query_result})
+    return results
+
+
+def dependency_chain_request(triplets: List[Dict[str, str]], hop_limit):
+    """
+    依赖链查询的参数：关系不在意图标签枚举中的一跳不会有结果，只编译其之前的部分
+
+    Returns:
+        tuple: (截断后的三元组, 关系元组, 尾实体是否确定, 查询参数)，没有可查询的一跳时三元组为空
+    """
+    relations = []
+    for triplet in triplets:
+        if not is_valid_relation(triplet.get("relation", "")):
+            logger.warning(f"关系 {triplet.get('relation', '')} 不在意图标签枚举中，依赖链在此截断")
+            break
+        relations.append(triplet["relation"])
+    triplets = triplets[:len(relations)]
+    if not triplets:
+        return [], (), False, {}
+
+    last_tail = triplets[-1].get("tail", "")
+    bound_tail = bool(last_tail) and not last_tail.startswith('Q')
+    params = {
+        "head_key": normalize_name_key(triplets[0].get("head", "")),
+        "tail_key": normalize_name_key(last_tail),
+        "limits": hop_limit if isinstance(hop_limit, list) else [hop_limit] * len(triplets),
+    }
+    return triplets, tuple(relations), bound_tail, params
+
+
+def split_dependency_chain(triplets: List[Dict[str, str]], record):
+    """按跳、按头实体拆分依赖链查询结果，返回 (kg_results, q_values)"""
+    kg_results = []
+    q_values = {}
+    heads = [triplets[0].get("head", "")]
+    for i, triplet in enumerate(triplets):
+        rows = [row for row in record[f"hop{i}"] if row["head"] is not None]
+        tail = triplet.get("tail", "")
+        for head in heads:
+            head_key = normalize_name_key(head)
+            query_result = [row for row in rows if normalize_name_key(row["head"]) == head_key]
+            # 尾实体为Q值且无结果时不记录，与逐条查询的行为一致
+            if tail.startswith('Q') and not query_result:
+                continue
+            expanded = triplet if i == 0 else {"head": head, "relation": triplet.get("relation", ""), "tail": tail}
+            kg_results.append({"triplet": expanded, "result": query_result})
+        if tail.startswith('Q'):
+            values = []
+            for row in rows:
+                if row["tail"] not in values:
+                    values.append(row["tail"])
+            if values:
+                q_values[tail] = values
+            heads = record[f"frontier{i}"]
+    return kg_results, q_values
+
+
+def count_store_keys(labels, relation_types):
+    """计数存储查询的标签与关系类型，Entity为查找键标签，不计入类别统计"""
+    return (tuple(sorted(label for label in labels if label != ENTITY_LABEL)),
+            tuple(sorted(relation_types)))
+
+
+def shape_count_statistics(labels, relation_types, record) -> Dict[str, Any]:
+    """计数存储查询结果 -> {"total_nodes", "total_relations", "labels", "relation_types"}，按数量降序"""
+    label_counts = {label: record[f"label_{i}"] for i, label in enumerate(labels) if record[f"label_{i}"]}
+    type_counts = {relation_type: record[f"type_{i}"]
+                   for i, relation_type in enumerate(relation_types) if record[f"type_{i}"]}
+    return {
+        "total_nodes": record["total_nodes"],
+        "total_relations": record["total_relations"],
+        "labels": dict(sorted(label_counts.items(), key=lambda item: item[1], reverse=True)),
+        "relation_types": dict(sorted(type_counts.items(), key=lambda item: item[1], reverse=True)),
+    }
+
+
+def collect_neighborhood(records):
+    """
+    将中心节点及其邻居的查询结果整理为去重后的节点和边
+
+    Returns:
+        tuple: (nodes, edges) 节点和边的列表
+    """
+    # 用于存储所有唯一节点和关系
+    nodes_dict = {}
+    edges_dict = {}
+
+    for record in records:
+        # 添加中心节点
+        center_id = record["center_id"]
+        if center_id not in nodes_dict:
+            nodes_dict[center_id] = {
+                "id": center_id,
+                "name": record["center_name"],
+                "category": record["center_category"],
+                "symbolSize": 50  # 中心节点大小
+            }
+
+        # 只有当邻居节点存在时才添加（可能是孤立节点）
+        if record["neighbor_id"] is not None:
+            neighbor_id = record["neighbor_id"]
+            if neighbor_id not in nodes_dict:
+                nodes_dict[neighbor_id] = {
+                    "id": neighbor_id,
+                    "name": record["neighbor_name"],
+                    "category": record["neighbor_category"],
+                    "symbolSize": 40  # 邻居节点大小
+                }
+
+            # 添加关系
+            rel_id = record["rel_id"]
+            if rel_id is not None and rel_id not in edges_dict:
+                edges_dict[rel_id] = {
+                    "id": rel_id,
+                    "source": record["source_id"],
+                    "target": record["target_id"],
+                    "name": record["rel_type"]
+                }
+
+    return list(nodes_dict.values()), list(edges_dict.values())
+
+
+def subgraph_params(node_ids, node_budget: int, edge_budget: int) -> Dict[str, Any]:
+    """子图查询参数，多取一个节点/一条边用于判断是否超出预算"""
+    return {"node_ids": list(node_ids), "node_budget": node_budget,
+            "neighbor_limit": node_budget + 1, "edge_limit": edge_budget + 1}
+
+
+def shape_subgraph(record, node_ids, node_budget: int, edge_budget: int) -> Dict[str, Any]:
+    """子图查询结果 -> {"nodes", "edges", "truncated"}"""
+    nodes = [
+        {
+            "id": row["id"],
+            "name": row["name"],
+            "category": row["category"],
+            "symbolSize": min(40 + row["degree"] * 2, 80)  # 节点大小根据连接度调整
+        }
+        for row in (record["nodes"] if record else [])
+    ]
+    if not nodes:
+        logger.warning("未能获取到节点数据")
+        return {"nodes": [], "edges": [], "truncated": False}
+
+    edges = [
+        {"source": row["source"], "target": row["target"], "name": row["type"]}
+        for row in record["edges"][:edge_budget]
+    ]
+    truncated = record["node_truncated"] or len(record["edges"]) > edge_budget
+    if truncated:
+        logger.info(f"子图超出预算（节点{node_budget}，边{edge_budget}），返回部分结果")
+
+    logger.info(f"获取到以{len(node_ids)}个节点为中心的子图，包含{len(nodes)}个节点和{len(edges)}条边")
+    return {"nodes": nodes, "edges": edges, "truncated": truncated}
+
+
 class Neo4jClient:
     def __new__(cls):
         global _neo4j_client_instance
@@ -33,44 +345,65 @@ class Neo4jClient:
         self.driver = None
         self.max_retries = 3
         self.retry_delay = 1  # 重试延迟（秒）
+        self.fulltext_ready = False
+        self._fulltext_checked_at = 0.0
+        self.name_key_ready = False
+        self._name_key_checked_at = 0.0
+        # 可选的进程内图副本（GraphReplica），就绪后一跳邻域读取直接由内存提供
+        self.replica = None
+        # 服务端是否支持 COUNT {} 子查询（5.x起），连接时按服务端版本确定
+        self.count_subquery = True
         
         # 自动连接数据库
         self.connect()
         self._initialized = True
 
+        # 启动时创建/校验名称查找键索引和实体名称全文索引，并检查 name_key 是否已回填
+        if self.driver:
+            self.ensure_name_key_index()
+            if not self.check_name_keys() and NAME_KEY_AUTO_BACKFILL:
+                self.backfill_name_keys()
+            self.ensure_fulltext_index()
+
     def connect(self):
-        """连接到Neo4j数据库"""
-        # 如果已经连接成功，直接返回True
+        """连接到Neo4j数据库，连接有效性由连接池在借出连接时维护，无需逐次探测"""
         if self.driver:
-            try:
-                # 快速测试连接是否有效
-                with self.driver.session() as session:
-                    session.run("RETURN 1")
-                return True
-            except Exception:
-                # 如果测试失败，继续尝试重新连接
-                self.driver = None
-        
+            return True
+
         try:
             if not self.url or not self.username or not self.password:
                 logger.error("未提供连接信息")
                 self.driver = None
                 return False
 
+            pool_config = pool_config_from_env()
             self.driver = GraphDatabase.driver(
                 self.url, 
-                auth=(self.username, self.password)
+                auth=(self.username, self.password),
+                **pool_config
             )
-            # 测试连接
-            with self.driver.session() as session:
-                session.run("RETURN 1")
+            # 仅在创建驱动时校验一次连通性
+            self.driver.verify_connectivity()
+            POOL_MAX_SIZE.set(pool_config["max_connection_pool_size"])
+            self.count_subquery = self._server_major_version() >= 5
             logger.info("成功连接到Neo4j数据库")
             return True
         except Exception as e:
             logger.error(f"连接到Neo4j数据库时出错: {e}")
+            if self.driver:
+                self.driver.close()
             self.driver = None
             return False
 
+    def _server_major_version(self) -> int:
+        """读取服务端主版本号（如 4、5、2025），读取失败时按5.x处理"""
+        try:
+            version = self._read(SERVER_VERSION_QUERY, single=True)["version"]
+            return int(version.split(".")[0])
+        except Exception as e:
+            logger.warning(f"读取Neo4j服务端版本失败，按5.x处理: {e}")
+            return 5
+
     def close(self):
         """关闭 Neo4j 驱动"""
         if self.driver:
@@ -81,56 +414,99 @@ class Neo4jClient:
             except Exception as e:
                 logger.error(f"关闭Neo4j连接时发生错误: {str(e)}")
 
+    @contextmanager
+    def session(self, **config):
+        """
+        借出一个会话，所有访问数据库的代码都经由此处，使 SESSIONS_IN_USE 与 POOL_MAX_SIZE 之比反映连接池利用率
+
+        Raises:
+            ServiceUnavailable: 数据库未连接且重连失败
+        """
+        if not self.driver and not self.connect():
+            raise ServiceUnavailable("数据库未连接")
+        SESSIONS_IN_USE.inc()
+        try:
+            with self.driver.session(**config) as session:
+                yield session
+        finally:
+            SESSIONS_IN_USE.dec()
+
+    def _read(self, query: str, params: Optional[Dict[str, Any]] = None, single: bool = False,
+              deadline: Optional[Deadline] = None):
+        """
+        在托管读事务中执行查询，遇到瞬时错误（如连接中断、集群切主）时由驱动自动重试
+
+        Args:
+            query: Cypher查询
+            params: 查询参数
+            single: 是否只取单条记录
+            deadline: 请求截止时间，剩余时间作为事务超时，到期后由数据库终止查询并释放连接
+
+        Returns:
+            list或Record: 全部记录，single为True时为单条记录（可能为None）
+
+        Raises:
+            DeadlineExceeded: 执行前截止时间已到
+        """
+        attempts = 0
+
+        def work(tx):
+            nonlocal attempts
+            attempts += 1
+            result = tx.run(query, **(params or {}))
+            return result.single() if single else list(result)
+
+        timeout = deadline.remaining() if deadline is not None else None
+        if timeout is not None:
+            # 事务超时为0表示永不超时，到期的请求不再发起查询
+            if timeout <= 0:
+                raise DeadlineExceeded(f"超过请求时间预算 {deadline.budget} 秒")
+            work = unit_of_work(timeout=timeout)(work)
+
+        started = time.perf_counter()
+        try:
+            with self.session(default_access_mode=READ_ACCESS) as session:
+                # 5.x驱动为execute_read，4.x驱动为read_transaction
+                execute_read = getattr(session, "execute_read", None) or session.read_transaction
+                return execute_read(work)
+        except Exception:
+            QUERY_ERRORS.inc()
+            raise
+        finally:
+            if attempts > 1:
+                TRANSACTION_RETRIES.inc(attempts - 1)
+            QUERY_SECONDS.observe(time.perf_counter() - started)
+
     def query_by_entity_name(self, entity_name: str) -> List[Dict[str, str]]:
         """根据实体名称查询相关的所有三元组"""
-        if not self.driver:
-            self.connect()
         try:
-            with self.driver.session() as session:
-                result = session.run("""
-            MATCH (h)-[r]->(t)
-            WHERE h.name = $entity_name OR t.name = $entity_name
-            RETURN h.name AS head, type(r) AS relation, t.name AS tail
-                """, entity_name=entity_name)
-                records = list(result)
-            return [{"head": record["head"], "relation": record["relation"], "tail": record["tail"]} 
-                        for record in records]
+            return triplet_rows(self._read(build_entity_triplets_query(self.use_name_key()),
+                                           {"name_key": normalize_name_key(entity_name)}))
         except Exception as e:
             logger.error(f"查询实体 {entity_name} 时发生错误: {str(e)}")
             return []
 
-    def query_by_head_relation(self, head: str, relation: str) -> List[Dict[str, str]]:
-        """根据头实体和关系查询尾实体"""
-        if not self.driver:
-            self.connect()
+    def query_by_head_relation(self, head: str, relation: str, head_label: Optional[str] = None) -> List[Dict[str, str]]:
+        """根据头实体和关系查询尾实体，head_label为可选的头实体标签提示"""
+        if not is_valid_relation(relation):
+            logger.warning(f"关系 {relation} 不在意图标签枚举中，跳过查询")
+            return []
         try:
-            with self.driver.session() as session:
-                result = session.run("""
-            MATCH (h)-[r]->(t)
-            WHERE h.name = $head AND type(r) = $relation
-            RETURN h.name AS head, type(r) AS relation, t.name AS tail
-                """, head=head, relation=relation)
-                records = list(result)
-            return [{"head": record["head"], "relation": record["relation"], "tail": record["tail"]} 
-                        for record in records]
+            return triplet_rows(self._read(build_head_relation_query(relation, head_label, self.use_name_key()),
+                                           {"head_key": normalize_name_key(head)}))
         except Exception as e:
             logger.error(f"查询头实体 {head} 和关系 {relation} 时发生错误: {str(e)}")
             return []
 
-    def query_triplet(self, head: str, relation: str, tail: str) -> List[Dict[str, str]]:
-        """查询特定的三元组是否存在"""
-        if not self.driver:
-            self.connect()
+    def query_triplet(self, head: str, relation: str, tail: str, head_label: Optional[str] = None) -> List[Dict[str, str]]:
+        """查询特定的三元组是否存在，head_label为可选的头实体标签提示"""
+        if not is_valid_relation(relation):
+            logger.warning(f"关系 {relation} 不在意图标签枚举中，跳过查询")
+            return []
         try:
-            with self.driver.session() as session:
-                result = session.run("""
-            MATCH (h)-[r]->(t)
-            WHERE h.name = $head AND type(r) = $relation AND t.name = $tail
-            RETURN h.name AS head, type(r) AS relation, t.name AS tail
-                """, head=head, relation=relation, tail=tail)
-                records = list(result)
-            return [{"head": record["head"], "relation": record["relation"], "tail": record["tail"]} 
-                        for record in records]
+            return triplet_rows(self._read(build_triplet_query(relation, head_label, self.use_name_key()),
+                                           {"head_key": normalize_name_key(head),
+                                            "tail_key": normalize_name_key(tail)}))
         except Exception as e:
             logger.error(f"查询三元组 ({head}, {relation}, {tail}) 时发生错误: {str(e)}")
             return []
@@ -191,49 +567,128 @@ class Neo4jClient:
 
         return results
 
-    def get_node_statistics(self):
-        """获取节点统计信息"""
-        if not self.driver:
-            logger.error("数据库未连接")
-            return []
-        
-        query = """
-        MATCH (n)
-        WITH LABELS(n)[0] AS label, COUNT(n) AS count
-        RETURN label, count
-        ORDER BY count DESC
+    def query_kg_triplets_batch(self, triplets: List[Dict[str, str]],
+                                deadline: Optional[Deadline] = None) -> List[Optional[Dict[str, Any]]]:
         """
-        
-        with self.driver.session() as session:
+        批量查询同一跳内互不依赖的三元组，通过一次UNWIND查询完成
+
+        Args:
+            triplets: 三元组列表，头实体中的Q值需由调用方提前替换为实际实体
+            deadline: 请求截止时间，剩余时间作为事务超时
+
+        Returns:
+            list: 与输入一一对应的 {"triplet", "result"}；与query_kg_triplets一样，
+                  无法查询的三元组（头实体为未知Q值）或尾实体为Q值但无结果时对应None
+        """
+        if not triplets:
+            return []
+
+        rows = triplet_batch_rows(triplets)
+        records = []
+        if rows:
             try:
-                result = session.run(query)
-                stats = [{"label": record["label"], "count": record["count"]} for record in result]
-                return stats
+                records = self._read(triplet_batch_query(rows, self.use_name_key()), {"rows": rows},
+                                     deadline=deadline)
             except Exception as e:
-                logger.error(f"获取节点统计时出错: {e}")
-                return []
+                logger.error(f"批量查询{len(rows)}个三元组时发生错误: {str(e)}")
+        return group_triplet_batch(triplets, rows, records)
+
+    def query_dependency_chain(self, triplets: List[Dict[str, str]], hop_limit: int = 10,
+                               deadline: Optional[Deadline] = None):
+        """
+        一次往返查询线性Qn依赖链，如 稻瘟病 -症状-> Q1 -作者-> Q2
+
+        Args:
+            triplets: 按依赖顺序排列的三元组，第i跳的头实体为第i-1跳的尾Q值
+            hop_limit: 每跳向下一跳展开的Q值数量上限，可为每跳单独指定的列表
+            deadline: 请求截止时间，剩余时间作为事务超时
+
+        Returns:
+            tuple: (kg_results, q_values)，结构与逐跳查询的结果一致
+        """
+        if not triplets:
+            return [], {}
+
+        triplets, relations, bound_tail, params = dependency_chain_request(triplets, hop_limit)
+        if not triplets:
+            return [], {}
+
+        try:
+            record = self._read(compile_dependency_chain(relations, bound_tail, self.use_name_key()),
+                                params, single=True, deadline=deadline)
+        except Exception as e:
+            logger.error(f"查询依赖链 {triplets} 时发生错误: {str(e)}")
+            return [], {}
+        if record is None:
+            return [], {}
+        return split_dependency_chain(triplets, record)
+
+    def get_count_statistics(self) -> Optional[Dict[str, Any]]:
+        """
+        从计数存储读取节点/关系总数以及各标签、各关系类型的数量，不扫描图数据
+
+        Returns:
+            dict: {"total_nodes", "total_relations", "labels": {标签: 数量}, "relation_types": {类型: 数量}}，
+                  出错时返回None
+        """
+        if not self.driver:
+            logger.error("数据库未连接")
+            return None
+
+        try:
+            labels, relation_types = count_store_keys(self._read(LABELS_QUERY, single=True)["labels"],
+                                                      self._read(RELATIONSHIP_TYPES_QUERY, single=True)["types"])
+            record = self._read(compile_count_store_query(labels, relation_types), single=True)
+        except Exception as e:
+            logger.error(f"获取计数统计时出错: {e}")
+            return None
+
+        return shape_count_statistics(labels, relation_types, record)
+
+    def get_node_statistics(self):
+        """获取节点统计信息"""
+        counts = self.get_count_statistics()
+        if not counts:
+            return []
+        return [{"label": label, "count": count} for label, count in counts["labels"].items()]
     
     def get_relation_statistics(self):
         """获取关系统计信息"""
-        if not self.driver:
-            logger.error("数据库未连接")
+        counts = self.get_count_statistics()
+        if not counts:
             return []
-        
-        query = """
-        MATCH ()-[r]->()
-        WITH TYPE(r) AS type, COUNT(r) AS count
-        RETURN type, count
-        ORDER BY count DESC
+        return [{"type": relation_type, "count": count} for relation_type, count in counts["relation_types"].items()]
+
+    def fetch_degree_page(self, start_id: int, end_id: int) -> Optional[List[Dict[str, Any]]]:
         """
-        
-        with self.driver.session() as session:
-            try:
-                result = session.run(query)
-                stats = [{"type": record["type"], "count": record["count"]} for record in result]
-                return stats
-            except Exception as e:
-                logger.error(f"获取关系统计时出错: {e}")
-                return []
+        读取ID在 [start_id, end_id) 区间内的节点及其邻居，供后台分析任务分页遍历
+
+        Args:
+            start_id: 区间起始节点ID
+            end_id: 区间结束节点ID（不含）
+
+        Returns:
+            list: [{"id", "name", "category", "degree", "neighbors"}]，出错时返回None
+        """
+        try:
+            records = self._read(DEGREE_PAGE_QUERY, {"start_id": start_id, "end_id": end_id})
+            return [{**dict(record), "degree": len(record["neighbors"])} for record in records]
+        except Exception as e:
+            logger.error(f"分页读取节点连接度时出错: {e}")
+            return None
+
+    def get_entity_names(self) -> Optional[List[str]]:
+        """
+        读取全部实体名称，供本地问题解析器构建实体词典
+
+        Returns:
+            list: 实体名称列表，出错时返回None
+        """
+        try:
+            return [record["name"] for record in self._read(ENTITY_NAMES_QUERY)]
+        except Exception as e:
+            logger.error(f"读取实体名称时出错: {e}")
+            return None
 
     def get_entity_and_neighbors(self, entity_name, limit=10):
         """
@@ -246,84 +701,25 @@ class Neo4jClient:
         Returns:
             tuple: (nodes, edges) 节点和边的列表
         """
+        if self.replica is not None and self.replica.ready:
+            return self.replica.get_entity_and_neighbors(entity_name, limit)
+
         try:
             if not self.driver:
                 logger.error("数据库未连接")
                 return [], []
             
-            # 查询指定实体及其1跳内的所有相关节点
-            query = """
-            MATCH (center)
-            WHERE toLower(center.name) = toLower($entity_name) OR toLower(center.title) = toLower($entity_name)
-            WITH center LIMIT 1
-            OPTIONAL MATCH (center)-[r]-(neighbor)
-            WITH center, neighbor, r
-            LIMIT $limit
-            RETURN 
-                ID(center) AS center_id, 
-                COALESCE(center.name, center.title, '') AS center_name, 
-                LABELS(center)[0] AS center_category,
-                ID(neighbor) AS neighbor_id, 
-                COALESCE(neighbor.name, neighbor.title, '') AS neighbor_name, 
-                LABELS(neighbor)[0] AS neighbor_category,
-                ID(r) AS rel_id,
-                TYPE(r) AS rel_type,
-                ID(startNode(r)) AS source_id,
-                ID(endNode(r)) AS target_id
-            """
-            
-            with self.driver.session() as session:
-                result = session.run(query, entity_name=entity_name, limit=limit)
-                
-                # 用于存储所有唯一节点和关系
-                nodes_dict = {}
-                edges_dict = {}
-                
-                # 处理查询结果
-                for record in result:
-                    # 添加中心节点
-                    center_id = record["center_id"]
-                    if center_id not in nodes_dict:
-                        nodes_dict[center_id] = {
-                            "id": center_id,
-                            "name": record["center_name"],
-                            "category": record["center_category"],
-                            "symbolSize": 50  # 中心节点大小
-                        }
-                    
-                    # 只有当邻居节点存在时才添加
-                    if record["neighbor_id"] is not None:
-                        # 添加邻居节点
-                        neighbor_id = record["neighbor_id"]
-                        if neighbor_id not in nodes_dict:
-                            nodes_dict[neighbor_id] = {
-                                "id": neighbor_id,
-                                "name": record["neighbor_name"],
-                                "category": record["neighbor_category"],
-                                "symbolSize": 40  # 邻居节点大小
-                            }
-                        
-                        # 添加关系
-                        rel_id = record["rel_id"]
-                        if rel_id is not None and rel_id not in edges_dict:
-                            edges_dict[rel_id] = {
-                                "id": rel_id,
-                                "source": record["source_id"],
-                                "target": record["target_id"],
-                                "name": record["rel_type"]
-                            }
-                
-                # 将字典转换为列表
-                nodes = list(nodes_dict.values())
-                edges = list(edges_dict.values())
-                
-                # 如果找不到实体，返回空数据
-                if not nodes:
-                    logger.warning(f"未能找到实体: {entity_name}")
-                    return [], []
-                
-                logger.info(f"获取到实体'{entity_name}'及其{len(nodes)-1}个邻居和{len(edges)}条关系")
-                return nodes, edges
+            nodes, edges = collect_neighborhood(
+                self._read(build_entity_neighbors_query(self.use_name_key()),
+                           {"name_key": normalize_name_key(entity_name), "limit": limit}))
+
+            # 如果找不到实体，返回空数据
+            if not nodes:
+                logger.warning(f"未能找到实体: {entity_name}")
+                return [], []
+
+            logger.info(f"获取到实体'{entity_name}'及其{len(nodes)-1}个邻居和{len(edges)}条关系")
+            return nodes, edges
         except Exception as e:
             logger.error(f"获取实体和邻居时出错: {e}")
             return [], []
@@ -339,235 +735,261 @@ class Neo4jClient:
         Returns:
             tuple: (nodes, edges) 节点和边的列表
         """
+        if self.replica is not None and self.replica.ready:
+            return self.replica.get_entity_neighbors_by_id(node_id, limit)
+
         try:
             if not self.driver:
                 logger.error("数据库未连接")
                 return [], []
             
-            # 查询指定节点及其直接邻居
-            query = """
-            MATCH (center)
-            WHERE ID(center) = $node_id
-            OPTIONAL MATCH (center)-[r]-(neighbor)
-            WITH center, neighbor, r
-            LIMIT $limit
-            RETURN 
-                ID(center) AS center_id, 
-                COALESCE(center.name, center.title, '') AS center_name, 
-                LABELS(center)[0] AS center_category,
-                ID(neighbor) AS neighbor_id, 
-                COALESCE(neighbor.name, neighbor.title, '') AS neighbor_name, 
-                LABELS(neighbor)[0] AS neighbor_category,
-                ID(r) AS rel_id,
-                TYPE(r) AS rel_type,
-                ID(startNode(r)) AS source_id,
-                ID(endNode(r)) AS target_id
-            """
-            
-            with self.driver.session() as session:
-                result = session.run(query, node_id=node_id, limit=limit)
-                
-                # 用于存储所有唯一节点和关系
-                nodes_dict = {}
-                edges_dict = {}
-                center_name = None
-                
-                # 处理查询结果
-                for record in result:
-                    # 添加中心节点
-                    center_id = record["center_id"]
-                    center_name = record["center_name"]
-                    if center_id not in nodes_dict:
-                        nodes_dict[center_id] = {
-                            "id": center_id,
-                            "name": center_name,
-                            "category": record["center_category"],
-                            "symbolSize": 50  # 中心节点大小
-                        }
-                    
-                    # 如果有邻居节点（可能是孤立节点）
-                    if record["neighbor_id"] is not None:
-                        # 添加邻居节点
-                        neighbor_id = record["neighbor_id"]
-                        if neighbor_id not in nodes_dict:
-                            nodes_dict[neighbor_id] = {
-                                "id": neighbor_id,
-                                "name": record["neighbor_name"],
-                                "category": record["neighbor_category"],
-                                "symbolSize": 40  # 邻居节点大小
-                            }
-                        
-                        # 添加关系
-                        rel_id = record["rel_id"]
-                        if rel_id is not None and rel_id not in edges_dict:
-                            edges_dict[rel_id] = {
-                                "id": rel_id,
-                                "source": record["source_id"],
-                                "target": record["target_id"],
-                                "name": record["rel_type"]
-                            }
-                
-                # 将字典转换为列表
-                nodes = list(nodes_dict.values())
-                edges = list(edges_dict.values())
-                
-                # 如果找不到指定节点，返回空数据
-                if not nodes:
-                    logger.warning(f"未能找到节点: {node_id}")
-                    return [], []
-                
-                logger.info(f"获取到节点{node_id}及其{len(nodes)-1}个邻居和{len(edges)}条关系")
-                return nodes, edges
+            nodes, edges = collect_neighborhood(
+                self._read(NODE_NEIGHBORS_QUERY, {"node_id": node_id, "limit": limit}))
+
+            # 如果找不到指定节点，返回空数据
+            if not nodes:
+                logger.warning(f"未能找到节点: {node_id}")
+                return [], []
+
+            logger.info(f"获取到节点{node_id}及其{len(nodes)-1}个邻居和{len(edges)}条关系")
+            return nodes, edges
         except Exception as e:
             logger.error(f"获取节点邻居时出错: {e}")
             return [], []
 
-    def search_entities(self, search_term):
+    def ensure_name_key_index(self) -> bool:
+        """创建 (:Entity {name_key}) 查找键索引（已存在时不做任何操作）"""
+        if not self.driver:
+            return False
+        try:
+            with self.session() as session:
+                session.run(f"""
+                CREATE INDEX `{NAME_KEY_INDEX_NAME}` IF NOT EXISTS
+                FOR (n:`{ENTITY_LABEL}`) ON (n.name_key)
+                """).consume()
+            return True
+        except Exception as e:
+            logger.error(f"创建名称查找键索引时出错: {e}")
+            return False
+
+    def check_name_keys(self) -> bool:
         """
-        搜索实体
+        校验能否通过 name_key 查找：索引已上线，且全部节点都带有Entity标签和 name_key。
+        节点数取自计数存储和索引，不扫描全图；回填前或有新写入的节点尚未回填时返回False
+
+        Returns:
+            bool: 精确名称查找是否可以走 name_key 索引
+        """
+        self._name_key_checked_at = time.time()
+        ready = False
+        if self.driver:
+            try:
+                with self.session(default_access_mode=READ_ACCESS) as session:
+                    index = session.run("""
+                    SHOW INDEXES YIELD name, state
+                    WHERE name = $name
+                    RETURN state
+                    """, name=NAME_KEY_INDEX_NAME).single()
+                    counts = session.run(NAME_KEY_COVERAGE_QUERY).single()
+                # keyed <= entities <= total，缺少Entity标签或 name_key 的节点均计入未回填
+                missing = counts["total"] - counts["keyed"]
+                ready = index is not None and index["state"] == "ONLINE" and missing == 0
+                if not ready and self.name_key_ready:
+                    # 只要有一个节点未回填，全部精确查找都会退回按名称比较，覆盖率下降时单独告警
+                    logger.warning(f"名称查找键覆盖率下降：{missing} 个节点缺少 name_key（节点: {counts['total']}），"
+                                   f"全部精确查找退回按名称比较；新写入数据后需重新执行 backfill-name-key")
+                elif not ready:
+                    logger.warning(f"名称查找键不可用（索引: {index['state'] if index else '不存在'}，"
+                                   f"节点: {counts['total']}，缺少 name_key: {missing}），精确查找退回按名称比较；"
+                                   f"可执行 backfill-name-key 补写")
+            except Exception as e:
+                logger.error(f"校验名称查找键时出错: {e}")
+        self.name_key_ready = ready
+        return ready
+
+    def name_key_check_due(self) -> bool:
+        """距上次校验 name_key 是否已超过 NAME_KEY_RECHECK_INTERVAL 秒"""
+        return time.time() - self._name_key_checked_at > NAME_KEY_RECHECK_INTERVAL
+
+    def use_name_key(self) -> bool:
+        """精确名称查找是否走 name_key 索引，每隔 NAME_KEY_RECHECK_INTERVAL 秒重新校验一次"""
+        if self.name_key_check_due():
+            self.check_name_keys()
+        return self.name_key_ready
+
+    def backfill_name_keys(self, batch_size: int = 5000) -> int:
+        """
+        为缺少或已过期 name_key 的节点补写查找键并打上Entity标签，可重复执行
+
+        Args:
+            batch_size: 每个事务处理的节点数量
+
+        Returns:
+            int: 更新的节点总数
+        """
+        if not self.driver:
+            self.connect()
+        self.ensure_name_key_index()
+
+        query = f"""
+        MATCH (n)
+        WHERE n.name_key IS NULL OR n.name_key <> {NAME_KEY_EXPRESSION} OR NOT n:`{ENTITY_LABEL}`
+        CALL {{
+            WITH n
+            SET n.name_key = {NAME_KEY_EXPRESSION}, n:`{ENTITY_LABEL}`
+        }} IN TRANSACTIONS OF {int(batch_size)} ROWS
+        RETURN count(n) AS updated
+        """
+        # CALL {} IN TRANSACTIONS 只能在自动提交事务中执行
+        with self.session() as session:
+            total = session.run(query).single()["updated"]
+        logger.info(f"已补写 {total} 个节点的名称查找键")
+        self.check_name_keys()
+        return total
+
+    def ensure_fulltext_index(self) -> bool:
+        """
+        创建或校验实体名称全文索引，索引覆盖的标签与数据库当前标签不一致时重建
+
+        Returns:
+            bool: 索引是否已上线可用
+        """
+        self._fulltext_checked_at = time.time()
+        if not self.driver:
+            self.fulltext_ready = False
+            return False
+
+        try:
+            with self.session() as session:
+                labels = session.run("CALL db.labels() YIELD label RETURN collect(label) AS labels").single()["labels"]
+                labels = [label for label in labels if label != ENTITY_LABEL]
+                existing = session.run("""
+                SHOW INDEXES YIELD name, type, labelsOrTypes, state
+                WHERE name = $name
+                RETURN type, labelsOrTypes, state
+                """, name=FULLTEXT_INDEX_NAME).single()
+
+                if not labels:
+                    logger.warning("数据库中没有节点标签，跳过全文索引创建")
+                    self.fulltext_ready = False
+                    return False
+
+                if existing and (existing["type"] != "FULLTEXT" or set(existing["labelsOrTypes"]) != set(labels)):
+                    logger.info(f"全文索引 {FULLTEXT_INDEX_NAME} 覆盖的标签已过期，重新创建")
+                    session.run(f"DROP INDEX `{FULLTEXT_INDEX_NAME}` IF EXISTS").consume()
+                    existing = None
+
+                if not existing:
+                    label_pattern = "|".join(f"`{label}`" for label in labels)
+                    session.run(f"""
+                    CREATE FULLTEXT INDEX `{FULLTEXT_INDEX_NAME}` IF NOT EXISTS
+                    FOR (n:{label_pattern}) ON EACH [n.name, n.title]
+                    OPTIONS {{indexConfig: {{`fulltext.analyzer`: $analyzer}}}}
+                    """, analyzer=FULLTEXT_ANALYZER).consume()
+                    logger.info(f"已创建全文索引 {FULLTEXT_INDEX_NAME}，覆盖{len(labels)}个标签")
+                    state = "POPULATING"
+                else:
+                    state = existing["state"]
+
+            self.fulltext_ready = state == "ONLINE"
+            if not self.fulltext_ready:
+                logger.info(f"全文索引 {FULLTEXT_INDEX_NAME} 当前状态: {state}，暂时使用模糊匹配")
+            return self.fulltext_ready
+        except Exception as e:
+            logger.error(f"创建/校验全文索引时出错: {e}")
+            self.fulltext_ready = False
+            return False
+
+    def fulltext_check_due(self) -> bool:
+        """全文索引不可用且距上次检查已超过 FULLTEXT_RECHECK_INTERVAL 秒"""
+        return not self.fulltext_ready and time.time() - self._fulltext_checked_at > FULLTEXT_RECHECK_INTERVAL
+
+    def search_entities(self, search_term, limit=20):
+        """
+        搜索实体，优先使用全文索引，索引不可用时退回模糊匹配
         
         Args:
             search_term (str): 搜索关键词
+            limit (int): 返回实体的最大数量
             
         Returns:
-            list: 匹配的实体列表
+            list: 按相关度排序的匹配实体列表
         """
         if not self.driver:
             logger.error("数据库未连接")
             return []
-        
-        # 使用模糊匹配搜索实体
-        cypher_query = """
-        MATCH (n)
-        WHERE toLower(COALESCE(n.name, n.title, '')) CONTAINS toLower($search_term)
-        RETURN ID(n) AS id, 
-               COALESCE(n.name, n.title, '') AS name, 
-               LABELS(n)[0] AS category
-        LIMIT 20
-        """
-        
-        with self.driver.session() as session:
+
+        if self.fulltext_check_due():
+            self.ensure_fulltext_index()
+
+        if self.fulltext_ready:
             try:
-                result = session.run(cypher_query, search_term=search_term)
-                entities = [
-                    {
-                        "id": record["id"],
-                        "name": record["name"],
-                        "category": record["category"]
-                    }
-                    for record in result
-                ]
-                return entities
+                return self._search_entities_fulltext(search_term, limit)
+            except ClientError as e:
+                # 索引被删除等情况，标记为不可用并退回模糊匹配
+                logger.warning(f"全文索引查询失败，退回模糊匹配: {e}")
+                self.fulltext_ready = False
             except Exception as e:
                 logger.error(f"搜索实体时出错: {e}")
                 return []
 
-    def get_subgraph_from_nodes(self, node_ids, depth=1):
+        return self._search_entities_scan(search_term, limit)
+
+    def _search_entities_fulltext(self, search_term, limit):
+        """通过全文索引搜索实体，返回带相关度得分的结果"""
+        escaped = escape_lucene(search_term)
+        if not escaped:
+            return []
+
+        return entity_rows(self._read(FULLTEXT_SEARCH_QUERY, {"index_name": FULLTEXT_INDEX_NAME,
+                                                               "search_term": escaped, "limit": limit}))
+
+    def _search_entities_scan(self, search_term, limit):
+        """全文索引缺失时的模糊匹配搜索（全表扫描）"""
+        try:
+            return entity_rows(self._read(SCAN_SEARCH_QUERY, {"search_term": search_term, "limit": limit}))
+        except Exception as e:
+            logger.error(f"搜索实体时出错: {e}")
+            return []
+
+    def get_subgraph_from_nodes(self, node_ids, depth=1, node_budget=None, edge_budget=None):
         """
         获取以特定节点为中心的子图
         
         Args:
             node_ids (list): 中心节点ID列表
             depth (int): 查询深度，默认为1跳
+            node_budget (int): 子图节点数量上限，默认取 SUBGRAPH_NODE_BUDGET
+            edge_budget (int): 子图边数量上限，默认取 SUBGRAPH_EDGE_BUDGET
             
         Returns:
             tuple: (nodes, edges) 节点和边的列表
         """
+        subgraph = self.fetch_subgraph(node_ids, depth, node_budget, edge_budget)
+        return subgraph["nodes"], subgraph["edges"]
+
+    def fetch_subgraph(self, node_ids, depth=1, node_budget=None, edge_budget=None) -> Dict[str, Any]:
+        """
+        一次往返获取子图的节点（含连接度）和子图内部的边，超出预算时返回部分结果
+
+        Returns:
+            dict: {"nodes": [...], "edges": [...], "truncated": bool}
+        """
+        depth, node_budget, edge_budget = clamp_subgraph_request(depth, node_budget, edge_budget)
+
+        if self.replica is not None and self.replica.ready and node_ids:
+            return self.replica.fetch_subgraph(node_ids, depth, node_budget, edge_budget)
+
+        empty = {"nodes": [], "edges": [], "truncated": False}
         if not self.driver or not node_ids:
             logger.error("数据库未连接或节点ID列表为空")
-            return [], []
-        
-        # Neo4j不允许在关系模式中使用参数，因此根据深度选择适当的查询
-        if depth == 1:
-            query = """
-            MATCH (center)
-            WHERE ID(center) IN $node_ids
-            OPTIONAL MATCH path = (center)-[*1..1]-(neighbor)
-            WITH COLLECT(center) + COLLECT(neighbor) AS nodes, 
-                 COLLECT(RELATIONSHIPS(path)) AS rels
-            UNWIND nodes AS n
-            WITH DISTINCT n
-            RETURN ID(n) AS id, 
-                   COALESCE(n.name, n.title, '') AS name, 
-                   LABELS(n)[0] AS category, 
-                   SIZE((n)--()) AS degree
-            """
-        elif depth == 2:
-            query = """
-            MATCH (center)
-            WHERE ID(center) IN $node_ids
-            OPTIONAL MATCH path = (center)-[*1..2]-(neighbor)
-            WITH COLLECT(center) + COLLECT(neighbor) AS nodes, 
-                 COLLECT(RELATIONSHIPS(path)) AS rels
-            UNWIND nodes AS n
-            WITH DISTINCT n
-            RETURN ID(n) AS id, 
-                   COALESCE(n.name, n.title, '') AS name, 
-                   LABELS(n)[0] AS category, 
-                   SIZE((n)--()) AS degree
-            """
-        else:
-            # 默认使用深度1
-            logger.warning(f"不支持的深度值 {depth}，使用默认深度 1")
-            query = """
-            MATCH (center)
-            WHERE ID(center) IN $node_ids
-            OPTIONAL MATCH path = (center)-[*1..1]-(neighbor)
-            WITH COLLECT(center) + COLLECT(neighbor) AS nodes, 
-                 COLLECT(RELATIONSHIPS(path)) AS rels
-            UNWIND nodes AS n
-            WITH DISTINCT n
-            RETURN ID(n) AS id, 
-                   COALESCE(n.name, n.title, '') AS name, 
-                   LABELS(n)[0] AS category, 
-                   SIZE((n)--()) AS degree
-            """
-        
-        with self.driver.session() as session:
-            try:
-                # 获取节点
-                result = session.run(query, node_ids=node_ids)
-                nodes = [
-                    {
-                        "id": record["id"], 
-                        "name": record["name"],
-                        "category": record["category"],
-                        "symbolSize": min(40 + record["degree"] * 2, 80)  # 节点大小根据连接度调整
-                    } 
-                    for record in result
-                ]
-                
-                # 如果没有获取到节点，返回空结果
-                if not nodes:
-                    logger.warning("未能获取到节点数据")
-                    return [], []
-                
-                # 获取边
-                # 使用OR条件而不是参数列表，避免参数过多的问题
-                node_id_list = ", ".join([str(node_id) for node_id in node_ids])
-                edge_query = f"""
-                MATCH (n1)-[r]->(n2)
-                WHERE ID(n1) IN [{node_id_list}] OR ID(n2) IN [{node_id_list}]
-                RETURN ID(n1) AS source, ID(n2) AS target, TYPE(r) AS type
-                """
-                
-                edge_result = session.run(edge_query)
-                edges = [
-                    {
-                        "source": record["source"], 
-                        "target": record["target"],
-                        "name": record["type"]
-                    } 
-                    for record in edge_result
-                ]
-                
-                # 过滤边，确保两端的节点都在节点列表中
-                node_id_set = {node["id"] for node in nodes}
-                edges = [edge for edge in edges 
-                         if edge["source"] in node_id_set and edge["target"] in node_id_set]
-                
-                logger.info(f"获取到以{len(node_ids)}个节点为中心的子图，包含{len(nodes)}个节点和{len(edges)}条边")
-                return nodes, edges
-            except Exception as e:
-                logger.error(f"获取子图时出错: {e}")
-                return [], []
+            return empty
+
+        try:
+            record = self._read(compile_subgraph_query(depth, self.count_subquery),
+                                subgraph_params(node_ids, node_budget, edge_budget), single=True)
+        except Exception as e:
+            logger.error(f"获取子图时出错: {e}")
+            return empty
+
+        return shape_subgraph(record, node_ids, node_budget, edge_budget)
@@ -1,11 +1,23 @@
+import hashlib
 import json
+import os
 import re
 import logging
 import traceback
+import unicodedata
+from concurrent.futures import TimeoutError as FutureTimeoutError
 
 import requests
 from zhipuai import ZhipuAI
 import settings
+from AGKG.client.cypher_builder import INTENT_KEYWORDS
+from AGKG.utils.cache import TTLCache
+from AGKG.utils.deadline import Deadline, DeadlineExceeded
+from AGKG.utils.incremental_json import ArrayItemParser
+from AGKG.utils.metrics import counter
+from AGKG.utils.micro_batcher import MicroBatcher
+from AGKG.utils.resilience import CircuitBreaker, CircuitOpenError, ResilientCaller, RetryBudget
+from AGKG.utils.semantic_cache import SemanticCache, intent_verifier
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -84,6 +96,14 @@ qa_system_content = """
     }
 """
 
+batch_parse_prompt = qa_system_content + """
+# 批量模式
+    用户输入为JSON数组，每个元素形如 {"id": 序号, "question": "用户原始提问"}
+    1. 对每个问题分别按上述规范独立解析，问题之间互不影响
+    2. 输出一个JSON数组，每个元素为对应问题的解析结果，并增加 "id" 字段，值与输入序号相同
+    3. 只输出JSON数组，不要输出其他内容
+"""
+
 format_prompt = """
     # 任务
         根据提供的信息，生成一个完整、专业且易于理解的答案。
@@ -93,6 +113,65 @@ format_prompt = """
         3. 内容做一个大致的概况即可
 """
 
+# 问题解析缓存：temperature=0.01 时解析结果近似确定，相同问题直接复用
+PARSE_CACHE_ENABLED = os.getenv("ZHIPU_PARSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+PARSE_CACHE_SIZE = int(os.getenv("ZHIPU_PARSE_CACHE_SIZE", "1024"))
+PARSE_CACHE_TTL = float(os.getenv("ZHIPU_PARSE_CACHE_TTL", "86400"))
+# 配置后启用SQLite磁盘层，重启后缓存依然有效
+PARSE_CACHE_PATH = os.getenv("ZHIPU_PARSE_CACHE_PATH")
+PARSE_CACHE_DISK_SIZE = int(os.getenv("ZHIPU_PARSE_CACHE_DISK_SIZE", "100000"))
+
+# 近似问题缓存：改写过的相同问题（相似度达到阈值，核心实体都出现在新问题中且意图相同）复用解析结果
+SEMANTIC_CACHE_ENABLED = os.getenv("ZHIPU_SEMANTIC_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("ZHIPU_SEMANTIC_CACHE_THRESHOLD", "0.75"))
+SEMANTIC_CACHE_SIZE = int(os.getenv("ZHIPU_SEMANTIC_CACHE_SIZE", "5000"))
+
+# 单次调用的默认超时（秒），传入请求截止时间时改用剩余时间
+ZHIPUAI_TIMEOUT = float(os.getenv("ZHIPUAI_TIMEOUT", "60"))
+# 接口地址，本地联调或压测时可指向智谱API的本地桩服务
+ZHIPUAI_BASE_URL = os.getenv("ZHIPUAI_BASE_URL")
+
+# 熔断：最近WINDOW次调用中错误率或慢调用率达到阈值时打开，OPEN_SECONDS后放行探测调用
+BREAKER_FAILURE_RATE = float(os.getenv("ZHIPU_BREAKER_FAILURE_RATE", "0.5"))
+BREAKER_SLOW_CALL_SECONDS = float(os.getenv("ZHIPU_BREAKER_SLOW_CALL_SECONDS", "20"))
+BREAKER_SLOW_CALL_RATE = float(os.getenv("ZHIPU_BREAKER_SLOW_CALL_RATE", "0.8"))
+BREAKER_WINDOW = int(os.getenv("ZHIPU_BREAKER_WINDOW", "20"))
+BREAKER_MIN_CALLS = int(os.getenv("ZHIPU_BREAKER_MIN_CALLS", "10"))
+BREAKER_OPEN_SECONDS = float(os.getenv("ZHIPU_BREAKER_OPEN_SECONDS", "30"))
+# 重试：单次调用最多尝试MAX_ATTEMPTS次，总重试量不超过调用量的RATIO倍
+RETRY_MAX_ATTEMPTS = int(os.getenv("ZHIPU_RETRY_MAX_ATTEMPTS", "3"))
+RETRY_BUDGET_RATIO = float(os.getenv("ZHIPU_RETRY_BUDGET_RATIO", "0.2"))
+RETRY_BACKOFF = float(os.getenv("ZHIPU_RETRY_BACKOFF", "0.2"))
+# 对冲：非流式调用超过历史耗时的QUANTILE分位仍未返回时，在线程池中再发出一个相同的请求，采用先成功的结果。
+# 只有非流式调用会被对冲，即 process_multiple_results 的答案整合，以及关闭增量解析（QA_INCREMENTAL_PARSE_ENABLED）
+# 或启用解析微批时的问题解析；默认的增量解析走 stream_parse、/qa/stream 的答案整合走流式输出，均不对冲
+HEDGE_ENABLED = os.getenv("ZHIPU_HEDGE_ENABLED", "false").lower() in ("1", "true", "yes")
+HEDGE_QUANTILE = float(os.getenv("ZHIPU_HEDGE_QUANTILE", "0.95"))
+# 解析微批：窗口（毫秒）内到达的问题最多BATCH_SIZE个合并为一次调用，系统提示词只发送一次
+PARSE_BATCH_ENABLED = os.getenv("ZHIPU_PARSE_BATCH_ENABLED", "false").lower() in ("1", "true", "yes")
+PARSE_BATCH_WINDOW_MS = float(os.getenv("ZHIPU_PARSE_BATCH_WINDOW_MS", "30"))
+PARSE_BATCH_SIZE = int(os.getenv("ZHIPU_PARSE_BATCH_SIZE", "4"))
+PARSE_BATCH_MAX_TOKENS = int(os.getenv("ZHIPU_PARSE_BATCH_MAX_TOKENS", "4096"))
+PARSE_BATCH_WORKERS = int(os.getenv("ZHIPU_PARSE_BATCH_WORKERS", "4"))
+
+PARSE_BATCH_FALLBACKS = counter("zhipu_parse_batch_fallbacks_total", "批量解析输出缺失或格式错误、改为单独解析的问题数")
+
+_TRAILING_PUNCTUATION = "？?。.！!～~ "
+
+
+def normalize_question(question: str) -> str:
+    """问题规范化：全角转半角、小写、合并空白、去掉末尾标点"""
+    text = unicodedata.normalize("NFKC", question or "").lower()
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.rstrip(_TRAILING_PUNCTUATION)
+
+
+def parse_cache_key(question: str, system_prompt: str, model: str) -> str:
+    """解析缓存键：规范化问题 + 系统提示词哈希 + 模型，提示词或模型变更后旧缓存自动失效"""
+    prompt_hash = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:16]
+    return hashlib.sha256(f"{model}\0{prompt_hash}\0{normalize_question(question)}".encode("utf-8")).hexdigest()
+
+
 # 创建ZhipuClient客户端的单例实例
 _zhipu_client_instance = None
 
@@ -109,81 +188,348 @@ class ZhipuClient:
             return
             
         try:
-            self.client = ZhipuAI(api_key=settings.Config.ZHIPUAI_API_KEY)
+            # 重试由 self.resilience 统一控制，关闭SDK自带的重试，避免重试次数相乘
+            self.client = ZhipuAI(api_key=settings.Config.ZHIPUAI_API_KEY, base_url=ZHIPUAI_BASE_URL or None,
+                                  timeout=ZHIPUAI_TIMEOUT, max_retries=0)
             self.model = "glm-4v-flash"
+            breaker = CircuitBreaker("zhipu", failure_rate=BREAKER_FAILURE_RATE,
+                                     slow_call_seconds=BREAKER_SLOW_CALL_SECONDS,
+                                     slow_call_rate=BREAKER_SLOW_CALL_RATE, window=BREAKER_WINDOW,
+                                     min_calls=BREAKER_MIN_CALLS, open_seconds=BREAKER_OPEN_SECONDS)
+            self.resilience = ResilientCaller("zhipu", breaker, RetryBudget("zhipu", ratio=RETRY_BUDGET_RATIO),
+                                              max_attempts=RETRY_MAX_ATTEMPTS, backoff=RETRY_BACKOFF,
+                                              hedge=HEDGE_ENABLED, hedge_quantile=HEDGE_QUANTILE)
+            self.parse_cache = TTLCache("zhipu_parse_cache", max_size=PARSE_CACHE_SIZE, ttl=PARSE_CACHE_TTL,
+                                        sqlite_path=PARSE_CACHE_PATH, disk_max_size=PARSE_CACHE_DISK_SIZE) \
+                if PARSE_CACHE_ENABLED else None
+            self.semantic_cache = SemanticCache("zhipu_semantic_cache", threshold=SEMANTIC_CACHE_THRESHOLD,
+                                                capacity=SEMANTIC_CACHE_SIZE, verify=intent_verifier(INTENT_KEYWORDS)) \
+                if SEMANTIC_CACHE_ENABLED else None
+            self.parse_batcher = MicroBatcher("zhipu_parse", self._parse_batch, window=PARSE_BATCH_WINDOW_MS / 1000,
+                                              max_size=PARSE_BATCH_SIZE, max_workers=PARSE_BATCH_WORKERS) \
+                if PARSE_BATCH_ENABLED else None
             logger.info("ZhipuClient初始化成功")
             self._initialized = True
         except Exception as e:
             logger.error(f"ZhipuClient初始化失败: {str(e)}")
             raise
 
-    def chat_completion(self, user_content, top_p=0.01, temperature=0.01, max_tokens=1024, stream=False):
+    def chat_completion(self, user_content, top_p=0.01, temperature=0.01, max_tokens=1024, stream=False,
+                        deadline: Deadline = None):
         """
-        调用智谱AI进行对话，解析用户问题
+        调用智谱AI进行对话，解析用户问题，命中解析缓存时不再调用模型
+
+        stream为True时以流式方式接收模型输出，拼接完整后再解析，返回值与非流式一致；
+        传入deadline时以剩余时间作为本次调用的超时，超时返回None。
+        启用解析微批时，非流式调用先与同一窗口内的其他问题合并解析，批量输出中该问题缺失或格式错误时再单独解析；
+        批量调用本身失败（超时、熔断、上游错误）时批内问题都直接失败，不再逐个重试以免放大上游负载
         """
+        cache_key, cached = self._lookup_parse(user_content)
+        if cached is not None:
+            return cached
+
         logger.info(f"发送请求到智谱AI，问题: {user_content[:50]}...")
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": qa_system_content},
-                    {"role": "user", "content": user_content}
-                ],
-                top_p=top_p,
-                temperature=temperature,
-                max_tokens=max_tokens,
-                stream=stream
-            )
-
-            text = response.choices[0].message.content
-            logger.info(f"收到智谱AI响应: {text[:100]}...")
-
-            pattern = r'\{.*\}'
-            match = re.search(pattern, text, re.DOTALL)
-
-            if match:
-                json_str = match.group(0)
-                # 将字符串解析为 JSON 对象
-                json_data = json.loads(json_str)
-                return json_data
-            
+            if self.parse_batcher is not None and not stream:
+                batched = self._submit_batch(user_content, deadline)
+                if batched is not None:
+                    self._store_parse(user_content, cache_key, batched)
+                    return batched
+            response = self._create_parse(user_content, top_p, temperature, max_tokens, stream, deadline)
+            text = "".join(self._iter_deltas(response, deadline)) if stream else response.choices[0].message.content
+            return self._finish_parse(user_content, cache_key, text)
+        except DeadlineExceeded as e:
+            logger.warning(f"解析问题超时: {str(e)}")
+            return None
+        except CircuitOpenError as e:
+            logger.warning(str(e))
             return None
         except Exception as e:
             logger.error(f"调用智谱AI时发生错误: {str(e)}")
             logger.error(traceback.format_exc())
             return None
 
-    def process_multiple_results(self, prompt: str) -> str:
+    def stream_parse(self, user_content, top_p=0.01, temperature=0.01, max_tokens=1024, deadline: Deadline = None):
+        """
+        流式解析用户问题：模型仍在输出时，knowledge_graph 数组中每出现一个完整的三元组就立即产出，
+        调用方可以在生成结束前开始查询知识图谱
+
+        启用解析微批时改为批量解析，得到完整结果后再依次产出三元组
+
+        Yields:
+            tuple: ('triplet', 三元组) 按数组顺序产出，可能多次；
+                   最后产出一次 ('result', 完整解析结果)，失败时结果为None
+        """
+        if self.parse_batcher is not None:
+            result = self.chat_completion(user_content, top_p, temperature, max_tokens, deadline=deadline)
+            for triplet in (result or {}).get('knowledge_graph') or []:
+                yield 'triplet', triplet
+            yield 'result', result
+            return
+
+        cache_key, cached = self._lookup_parse(user_content)
+        if cached is not None:
+            for triplet in cached.get('knowledge_graph') or []:
+                yield 'triplet', triplet
+            yield 'result', cached
+            return
+
+        logger.info(f"流式发送请求到智谱AI，问题: {user_content[:50]}...")
+
+        result = None
+        try:
+            response = self._create_parse(user_content, top_p, temperature, max_tokens, True, deadline)
+            parser = ArrayItemParser('knowledge_graph')
+            for delta in self._iter_deltas(response, deadline):
+                for triplet in parser.feed(delta):
+                    yield 'triplet', triplet
+            result = self._finish_parse(user_content, cache_key, parser.text)
+        except DeadlineExceeded as e:
+            logger.warning(f"流式解析问题超时: {str(e)}")
+        except CircuitOpenError as e:
+            logger.warning(str(e))
+        except Exception as e:
+            logger.error(f"流式调用智谱AI时发生错误: {str(e)}")
+            logger.error(traceback.format_exc())
+        yield 'result', result
+
+    def _lookup_parse(self, user_content):
+        """
+        依次查询精确缓存和近似问题缓存
+
+        Returns:
+            tuple: (精确缓存键, 缓存的解析结果)，未启用精确缓存时键为None，未命中时结果为None
+        """
+        cache_key = None
+        if self.parse_cache is not None:
+            cache_key = parse_cache_key(user_content, qa_system_content, self.model)
+            cached = self.parse_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"问题解析命中缓存: {user_content[:50]}")
+                return cache_key, cached
+
+        if self.semantic_cache is not None:
+            similar = self.semantic_cache.get(user_content)
+            if similar is not None:
+                # 复用近似问题的解析结果，question 字段保持为用户原始提问
+                similar["question"] = user_content
+                if cache_key is not None:
+                    self.parse_cache.set(cache_key, similar)
+                return cache_key, similar
+
+        return cache_key, None
+
+    def _create_parse(self, user_content, top_p, temperature, max_tokens, stream, deadline=None):
+        return self._create('parse', [
+            {"role": "system", "content": qa_system_content},
+            {"role": "user", "content": user_content}
+        ], top_p=top_p, temperature=temperature, max_tokens=max_tokens, stream=stream, deadline=deadline)
+
+    def _create(self, method, messages, top_p=0.01, temperature=0.01, max_tokens=1024, stream=False,
+                deadline: Deadline = None):
+        """
+        经熔断、重试和对冲发出一次对话请求，耗时按method记入 zhipu_<method>_seconds 直方图
+
+        流式调用只对建立连接重试，不做对冲；每次尝试都按截止时间的剩余时间重新计算超时
+        """
+        return self.resilience.call(method, lambda: self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            top_p=top_p,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=stream,
+            **self._request_options(deadline)
+        ), deadline=deadline, hedge=not stream)
+
+    def _finish_parse(self, user_content, cache_key, text):
+        """从模型输出中提取JSON解析结果并写入缓存，没有JSON时返回None"""
+        logger.info(f"收到智谱AI响应: {text[:100]}...")
+
+        pattern = r'\{.*\}'
+        match = re.search(pattern, text, re.DOTALL)
+
+        if match:
+            json_str = match.group(0)
+            # 将字符串解析为 JSON 对象
+            json_data = json.loads(json_str)
+            self._store_parse(user_content, cache_key, json_data)
+            return json_data
+
+        return None
+
+    def _store_parse(self, user_content, cache_key, json_data):
+        """解析结果写入精确缓存和近似问题缓存"""
+        if cache_key is not None:
+            self.parse_cache.set(cache_key, json_data)
+        if self.semantic_cache is not None:
+            self.semantic_cache.set(user_content, json_data)
+
+    def _submit_batch(self, user_content, deadline: Deadline = None):
+        """
+        提交到解析微批并等待结果
+
+        Returns:
+            dict: 该问题的解析结果；窗口内没有其他问题或批量输出中该问题不可用时返回None，由调用方单独解析
+
+        Raises:
+            DeadlineExceeded: 等待批量结果超过截止时间
+            Exception: 批量调用失败时的错误
+        """
+        try:
+            return self.parse_batcher.submit((user_content, deadline),
+                                             timeout=deadline.remaining() if deadline is not None else None)
+        except FutureTimeoutError:
+            raise DeadlineExceeded(f"等待批量解析超过请求时间预算 {deadline.budget} 秒")
+
+    def _parse_batch(self, items):
+        """
+        微批处理函数：一次调用解析窗口内的全部问题，超时取批内最早的截止时间
+
+        Args:
+            items: [(问题, 截止时间)]
+
+        Returns:
+            list: 与items一一对应的解析结果，输出中缺失或格式错误的位置为None
+
+        Raises:
+            Exception: 批量调用失败，由微批处理器传给批内全部请求
+        """
+        if len(items) == 1:
+            return [None]
+
+        questions = [question for question, _ in items]
+        deadlines = [deadline for _, deadline in items if deadline is not None and deadline.remaining() is not None]
+        deadline = min(deadlines, key=lambda d: d.remaining()) if deadlines else None
+        logger.info(f"批量发送{len(questions)}个问题到智谱AI")
+
+        response = self._create('parse_batch', [
+            {"role": "system", "content": batch_parse_prompt},
+            {"role": "user", "content": json.dumps([{"id": index, "question": question}
+                                                    for index, question in enumerate(questions)],
+                                                   ensure_ascii=False)}
+        ], max_tokens=min(PARSE_BATCH_MAX_TOKENS, 1024 * len(questions)), deadline=deadline)
+        results = self._split_batch(questions, response.choices[0].message.content)
+
+        fallbacks = sum(1 for result in results if result is None)
+        if fallbacks:
+            PARSE_BATCH_FALLBACKS.inc(fallbacks)
+        return results
+
+    @staticmethod
+    def _split_batch(questions, text):
+        """把批量输出按id拆分回各问题，缺失或结构不完整的位置为None"""
+        logger.info(f"收到智谱AI批量响应: {text[:100]}...")
+        match = re.search(r'\[.*\]', text, re.DOTALL)
+        try:
+            items = json.loads(match.group(0)) if match else None
+        except ValueError:
+            items = None
+        if not isinstance(items, list):
+            logger.warning("批量解析输出不是JSON数组，全部改为单独解析")
+            return [None] * len(questions)
+
+        by_id = {}
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            try:
+                by_id[int(item.pop('id'))] = item
+            except (KeyError, TypeError, ValueError):
+                continue
+
+        results = []
+        for index, question in enumerate(questions):
+            item = by_id.get(index)
+            if item is None or not isinstance(item.get('analysis'), dict) or \
+                    not isinstance(item.get('knowledge_graph'), list):
+                results.append(None)
+                continue
+            # question 字段以用户原始提问为准
+            item['question'] = question
+            results.append(item)
+        return results
+
+    @staticmethod
+    def _request_options(deadline: Deadline = None):
+        """以请求截止时间的剩余时间作为本次调用的超时"""
+        if deadline is None or deadline.remaining() is None:
+            return {}
+        deadline.check()
+        return {"timeout": deadline.timeout(cap=ZHIPUAI_TIMEOUT)}
+
+    @staticmethod
+    def _iter_deltas(response, deadline: Deadline = None):
+        """逐块读取流式响应中的文本增量，超过截止时间时关闭响应并抛出DeadlineExceeded"""
+        for chunk in response:
+            if deadline is not None and deadline.expired():
+                close = getattr(response, "close", None)
+                if close is not None:
+                    close()
+                deadline.check()
+            if not chunk.choices:
+                continue
+            content = chunk.choices[0].delta.content
+            if content:
+                yield content
+
+    def process_multiple_results(self, prompt: str, deadline: Deadline = None) -> str:
         """
         处理多个查询结果，生成一个综合的答案
         
         Args:
             prompt: 包含问题类型、核心实体、查询意图和查询结果的提示信息
+            deadline: 请求截止时间，以剩余时间作为超时
             
         Returns:
             str: 处理后的综合答案
         """
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": format_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                top_p=0.01,
-                temperature=0.01,
-                max_tokens=1024
-            )
+            response = self._create('synthesis', [
+                {"role": "system", "content": format_prompt},
+                {"role": "user", "content": prompt}
+            ], deadline=deadline)
             
             answer = response.choices[0].message.content
             return answer.strip()
             
+        except DeadlineExceeded as e:
+            logger.warning(f"整合答案超时: {str(e)}")
+            return None
+        except CircuitOpenError as e:
+            logger.warning(str(e))
+            return None
         except Exception as e:
             logger.error(f"处理多个结果时发生错误: {str(e)}")
             logger.error(traceback.format_exc())
             return None
 
+    def stream_multiple_results(self, prompt: str, deadline: Deadline = None):
+        """
+        流式版本的 process_multiple_results，逐块产出综合答案的文本增量
+
+        Args:
+            prompt: 包含问题类型、核心实体、查询意图和查询结果的提示信息
+            deadline: 请求截止时间，超过后停止产出
+
+        Yields:
+            str: 答案文本增量；出错时停止产出
+        """
+        try:
+            response = self._create('synthesis_stream', [
+                {"role": "system", "content": format_prompt},
+                {"role": "user", "content": prompt}
+            ], stream=True, deadline=deadline)
+            yield from self._iter_deltas(response, deadline)
+        except DeadlineExceeded as e:
+            logger.warning(f"流式整合答案超时: {str(e)}")
+        except CircuitOpenError as e:
+            logger.warning(str(e))
+        except Exception as e:
+            logger.error(f"流式处理多个结果时发生错误: {str(e)}")
+            logger.error(traceback.format_exc())
+
 if __name__ == "__main__":
     client = ZhipuClient()
     response = client.chat_completion("小麦有什么病？")
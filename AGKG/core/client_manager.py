@@ -1,5 +1,8 @@
 import logging
+import os
 from AGKG.client.neo4j_client import Neo4jClient
+from AGKG.client.async_neo4j_client import AsyncNeo4jClient
+from AGKG.client.graph_replica import GraphReplica
 from AGKG.client.zhipu_client import ZhipuClient
 
 # 配置日志
@@ -34,7 +37,9 @@ class ClientManager:
 
         # 初始化所有客户端
         self._neo4j_client = None
+        self._async_neo4j_client = None
         self._zhipu_client = None
+        self._graph_replica = None
 
         # 标记为已初始化
         self._initialized = True
@@ -44,8 +49,32 @@ class ClientManager:
         if self._neo4j_client is None:
             logger.info("首次请求Neo4j客户端，开始初始化...")
             self._neo4j_client = Neo4jClient()
+            if os.getenv("KG_REPLICA_ENABLED", "false").lower() in ("1", "true", "yes"):
+                self.get_graph_replica()
         return self._neo4j_client
 
+    def get_graph_replica(self):
+        """获取进程内图副本，首次调用时在后台加载并挂到Neo4j客户端上"""
+        neo4j_client = self.get_neo4j_client()
+        if self._graph_replica is None:
+            logger.info("初始化进程内图副本...")
+            self._graph_replica = GraphReplica(neo4j_client)
+            neo4j_client.replica = self._graph_replica
+            if self._async_neo4j_client is not None:
+                self._async_neo4j_client.replica = self._graph_replica
+            self._graph_replica.start()
+        return self._graph_replica
+
+    def get_async_neo4j_client(self):
+        """获取异步Neo4j客户端实例，与同步客户端共用索引状态和进程内图副本"""
+        if self._async_neo4j_client is None:
+            logger.info("首次请求异步Neo4j客户端，开始初始化...")
+            # 索引的创建与校验由同步客户端负责
+            neo4j_client = self.get_neo4j_client()
+            self._async_neo4j_client = AsyncNeo4jClient(neo4j_client)
+            self._async_neo4j_client.replica = neo4j_client.replica
+        return self._async_neo4j_client
+
     def get_zhipu_client(self):
         """获取智谱AI客户端实例"""
         if self._zhipu_client is None:
@@ -0,0 +1,122 @@
+import logging
+import os
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional
+
+from AGKG.utils.metrics import counter
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('answer_synthesizer')
+
+# 各关系的答案模板，{head} 为头实体（多个头实体结果相同时合并为"A、B"），{tails} 为尾实体列表
+RELATION_TEMPLATES = {
+    "作者": "{head}的作者为{tails}。",
+    "关键字": "{head}的关键字包括{tails}。",
+    "别称": "{head}又称{tails}。",
+    "包含": "{head}包括{tails}。",
+    "危害作物": "{head}主要危害{tails}。",
+    "发生规律": "{head}的发生规律：{tails}",
+    "学名": "{head}的学名为{tails}。",
+    "形态特征": "{head}的形态特征：{tails}",
+    "摘要": "{head}的摘要：{tails}",
+    "期刊": "{head}发表于{tails}。",
+    "父类": "{head}属于{tails}。",
+    "生活习性": "{head}的生活习性：{tails}",
+    "病害": "{head}的常见病害有{tails}。",
+    "症状": "{head}的主要症状：{tails}",
+    "研究文献": "{head}的相关研究文献有{tails}。",
+    "简介": "{head}简介：{tails}",
+    "网址": "{head}的网址为{tails}。",
+    "虫害": "{head}的常见虫害有{tails}。",
+    "防治方法": "{head}的防治方法：{tails}",
+}
+DEFAULT_TEMPLATE = "{head}的{relation}有：{tails}。"
+
+# 超过该长度的尾实体视为描述性文本，逐条分行列出而不是用顿号连接
+LONG_TAIL_LENGTH = 30
+_SENTENCE_ENDINGS = ("。", "！", "？", ".", "!", "?")
+
+TEMPLATE_ANSWERS = counter("qa_template_answers_total", "由模板直接合成的答案数")
+# 超过阈值时不一定调用大模型（可能命中整合缓存或剩余时间不足），实际调用数由 qa_service 统计
+OVER_THRESHOLD = counter("qa_synthesis_over_threshold_total", "复杂度超过阈值、未用模板合成的答案数")
+
+
+def _join_tails(tails: List[str]) -> str:
+    if any(len(tail) > LONG_TAIL_LENGTH for tail in tails):
+        if len(tails) == 1:
+            return tails[0]
+        return "\n" + "\n".join(f"{index}. {tail}" for index, tail in enumerate(tails, 1))
+    return "、".join(tails)
+
+
+class AnswerSynthesizer:
+    """
+    确定性的答案合成：把知识图谱查询结果按 (头实体, 关系) 分组、尾实体去重，
+    结果完全相同的多个头实体合并为一句，再套用各关系的模板
+
+    合并后的分组数即复杂度，超过 QA_SYNTHESIS_COMPLEXITY_THRESHOLD 时返回None，由调用方交给大模型整合
+    """
+
+    def __init__(self, complexity_threshold: Optional[int] = None):
+        self.complexity_threshold = complexity_threshold if complexity_threshold is not None else \
+            int(os.getenv("QA_SYNTHESIS_COMPLEXITY_THRESHOLD", "3"))
+
+    @staticmethod
+    def group(kg_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        按 (头实体, 关系) 分组并合并结果相同的头实体
+
+        Returns:
+            list: [{"heads", "relation", "tails"}]，按结果首次出现的顺序排列
+        """
+        grouped = OrderedDict()
+        for result in kg_results:
+            for row in result.get('result') or []:
+                head, relation, tail = row.get('head'), row.get('relation'), row.get('tail')
+                if not (head and relation and tail):
+                    continue
+                tails = grouped.setdefault((head, relation), [])
+                if tail not in tails:
+                    tails.append(tail)
+
+        merged = OrderedDict()
+        for (head, relation), tails in grouped.items():
+            heads = merged.setdefault((relation, tuple(tails)), [])
+            if head not in heads:
+                heads.append(head)
+        return [{"heads": heads, "relation": relation, "tails": list(tails)}
+                for (relation, tails), heads in merged.items()]
+
+    def synthesize(self, question_type: str, kg_results: List[Dict[str, Any]],
+                   answer_parts: List[str]) -> Optional[str]:
+        """
+        用模板合成答案
+
+        Args:
+            question_type: 问题类型
+            kg_results: 知识图谱查询结果
+            answer_parts: 逐三元组格式化的结果文本
+
+        Returns:
+            str: 合成的答案；复杂度超过阈值时返回None
+        """
+        # 是非推理的逐条结论已是完整答案
+        if question_type == '是非推理':
+            TEMPLATE_ANSWERS.inc()
+            return "\n".join(answer_parts)
+
+        groups = self.group(kg_results)
+        if not groups or len(groups) > self.complexity_threshold:
+            OVER_THRESHOLD.inc()
+            logger.info(f"答案包含{len(groups)}组结果，超过模板合成阈值{self.complexity_threshold}")
+            return None
+
+        sentences = []
+        for group in groups:
+            template = RELATION_TEMPLATES.get(group["relation"], DEFAULT_TEMPLATE)
+            sentence = template.format(head="、".join(group["heads"]), relation=group["relation"],
+                                       tails=_join_tails(group["tails"]))
+            sentences.append(sentence if sentence.endswith(_SENTENCE_ENDINGS) else sentence + "。")
+        TEMPLATE_ANSWERS.inc()
+        return "\n".join(sentences)
@@ -0,0 +1,202 @@
+import copy
+import logging
+import os
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+from AGKG.utils.sketches import ReservoirSample, TopK, HyperLogLog
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('graph_analytics')
+
+# 创建图分析任务的单例实例
+_graph_analytics_instance = None
+
+
+def _degree_histogram(sample: ReservoirSample, population: int) -> List[Dict[str, Any]]:
+    """按2的幂分桶的连接度分布，各桶数量由样本比例按总节点数放大估计"""
+    if not sample.items:
+        return []
+    buckets = {}
+    for degree in sample.items:
+        bucket = 0 if degree == 0 else int(degree).bit_length()
+        buckets[bucket] = buckets.get(bucket, 0) + 1
+    histogram = []
+    for bucket in sorted(buckets):
+        low, high = (0, 0) if bucket == 0 else (1 << (bucket - 1), (1 << bucket) - 1)
+        histogram.append({
+            'range': f"{low}" if low == high else f"{low}-{high}",
+            'count': round(buckets[bucket] / len(sample.items) * population)
+        })
+    return histogram
+
+
+class GraphAnalytics:
+    """
+    仪表盘扩展分析的后台任务：按节点ID区间分页流式遍历图（页间休眠以免占满数据库），遍历到计数存储中的节点数为止，
+    蓄水池抽样估计连接度分布，最小堆维护枢纽实体，各类别的平均连接度精确累计，
+    各类别实体的不同邻居数由HyperLogLog估计。结果缓存为一份payload，接口直接读取
+
+    每页的ID区间按上一页的命中密度自适应伸缩：ID连续时区间等于 page_size，遇到已删除ID的空洞时区间扩大
+    （至多 page_size * max_span_factor），页数随节点数而不是随ID空洞增长
+    """
+
+    def __new__(cls, neo4j_client=None, refresh_interval: Optional[float] = None):
+        global _graph_analytics_instance
+        if _graph_analytics_instance is None:
+            _graph_analytics_instance = super(GraphAnalytics, cls).__new__(cls)
+            _graph_analytics_instance._initialized = False
+        return _graph_analytics_instance
+
+    def __init__(self, neo4j_client=None, refresh_interval: Optional[float] = None):
+        if self._initialized:
+            return
+
+        self.neo4j_client = neo4j_client
+        self.refresh_interval = refresh_interval if refresh_interval is not None else \
+            float(os.getenv("KG_ANALYTICS_REFRESH_SECONDS", "3600"))
+        self.page_size = int(os.getenv("KG_ANALYTICS_PAGE_SIZE", "500"))
+        self.page_pause = float(os.getenv("KG_ANALYTICS_PAGE_PAUSE", "0.2"))
+        self.sample_size = int(os.getenv("KG_ANALYTICS_SAMPLE_SIZE", "2000"))
+        self.top_k = int(os.getenv("KG_ANALYTICS_TOP_K", "20"))
+        self.max_span_factor = int(os.getenv("KG_ANALYTICS_MAX_SPAN_FACTOR", "64"))
+        # 遍历期间有节点被删除时计数存储中的总数无法达到，连续这么多个空页后结束（空页的区间逐页翻倍）
+        self.max_empty_pages = int(os.getenv("KG_ANALYTICS_MAX_EMPTY_PAGES", "20"))
+        self.payload: Optional[Dict[str, Any]] = None
+        self.computed_at = 0.0
+        self._refresh_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._initialized = True
+
+    def refresh(self) -> bool:
+        """完整遍历一次图并替换缓存的分析结果，已有任务进行中时直接返回"""
+        if not self._refresh_lock.acquire(blocking=False):
+            logger.info("图分析任务正在进行，跳过本次请求")
+            return False
+        try:
+            payload = self._compute()
+            if payload is None:
+                return False
+            self.payload = payload
+            self.computed_at = time.time()
+            return True
+        except Exception as e:
+            logger.error(f"计算图分析结果时出错: {e}")
+            return False
+        finally:
+            self._refresh_lock.release()
+
+    def _compute(self) -> Optional[Dict[str, Any]]:
+        # 节点总数来自计数存储，遍历到这么多节点为止，之后新建的节点留到下一轮
+        counts = self.neo4j_client.get_count_statistics()
+        if counts is None:
+            return None
+        total_nodes = counts["total_nodes"]
+
+        started = time.time()
+        degrees = ReservoirSample(self.sample_size)
+        hubs = TopK(self.top_k)
+        label_degrees = {}
+        label_neighbors = {}
+        degree_sum = 0
+        max_degree = 0
+        scanned = 0
+        empty_pages = 0
+        start_id = 0
+        span = self.page_size
+        max_span = self.page_size * self.max_span_factor
+
+        while scanned < total_nodes and empty_pages < self.max_empty_pages:
+            if self._stop_event.is_set():
+                return None
+            rows = self.neo4j_client.fetch_degree_page(start_id, start_id + span)
+            if rows is None:
+                return None
+            start_id += span
+            if rows:
+                # 按本页命中密度估计下一页覆盖 page_size 个节点所需的ID区间
+                span = min(max_span, max(self.page_size, span * self.page_size // len(rows)))
+                empty_pages = 0
+            else:
+                span = min(max_span, span * 2)
+                empty_pages += 1
+
+            for row in rows:
+                degree = row["degree"]
+                category = row["category"] or "未分类"
+                scanned += 1
+                degree_sum += degree
+                max_degree = max(max_degree, degree)
+                degrees.add(degree)
+                hubs.add(degree, {'id': str(row["id"]), 'name': row["name"], 'category': row["category"]})
+                stats = label_degrees.setdefault(category, [0, 0])
+                stats[0] += 1
+                stats[1] += degree
+                sketch = label_neighbors.setdefault(category, HyperLogLog())
+                for neighbor in row["neighbors"]:
+                    sketch.add(neighbor)
+
+            # 页间休眠，避免后台任务持续占用数据库
+            self._stop_event.wait(self.page_pause)
+
+        duration = time.time() - started
+        logger.info(f"图分析完成: 遍历{scanned}个节点, 耗时{duration:.1f}秒")
+        return {
+            'nodes_scanned': scanned,
+            'duration': round(duration, 3),
+            'degree_distribution': {
+                'sample_size': len(degrees.items),
+                'mean': round(degree_sum / scanned, 3) if scanned else 0,
+                'p50': degrees.quantile(0.5),
+                'p90': degrees.quantile(0.9),
+                'p99': degrees.quantile(0.99),
+                'max': max_degree,
+                'histogram': _degree_histogram(degrees, scanned),
+            },
+            'top_hubs': [{**item, 'degree': degree} for degree, item in hubs.items()],
+            'labels': {
+                category: {
+                    'nodes': count,
+                    'average_degree': round(total / count, 3) if count else 0,
+                    'distinct_neighbors': label_neighbors[category].count(),
+                }
+                for category, (count, total) in sorted(label_degrees.items(), key=lambda item: item[1][0],
+                                                       reverse=True)
+            },
+        }
+
+    def start(self):
+        """在后台线程中运行分析任务，并按refresh_interval定期重算"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, name='graph-analytics', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _refresh_loop(self):
+        while not self._stop_event.is_set():
+            self.refresh()
+            if self.refresh_interval <= 0:
+                break
+            self._stop_event.wait(self.refresh_interval)
+
+    def get(self) -> Optional[Dict[str, Any]]:
+        """
+        读取缓存的分析结果，附带 snapshot_time 和 snapshot_age（秒）
+
+        Returns:
+            dict: 分析结果副本，首次计算尚未完成时返回None
+        """
+        payload, computed_at = self.payload, self.computed_at
+        if payload is None:
+            return None
+        result = copy.deepcopy(payload)
+        result['snapshot_time'] = computed_at
+        result['snapshot_age'] = round(time.time() - computed_at, 3)
+        return result
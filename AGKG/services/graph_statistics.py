@@ -0,0 +1,129 @@
+import copy
+import logging
+import os
+import threading
+import time
+from typing import Dict, Any, Optional
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('graph_statistics')
+
+# 创建统计快照的单例实例
+_graph_statistics_instance = None
+
+
+def empty_statistics() -> Dict[str, Any]:
+    """数据库不可用时返回的空统计数据"""
+    return {
+        '总实体数': 0,
+        '总关系数': 0,
+        '实体类型数': 0,
+        '关系类型数': 0,
+        '实体类型分布': {},
+        '关系类型分布': {},
+    }
+
+
+class GraphStatistics:
+    """
+    知识图谱统计信息的物化快照
+
+    后台线程按 KG_STATISTICS_REFRESH_SECONDS 定期从计数存储重建快照，读取方直接拿到缓存结果，
+    不会再为每次页面加载触发全图聚合
+    """
+
+    def __new__(cls, neo4j_client=None, refresh_interval: Optional[float] = None):
+        global _graph_statistics_instance
+        if _graph_statistics_instance is None:
+            _graph_statistics_instance = super(GraphStatistics, cls).__new__(cls)
+            _graph_statistics_instance._initialized = False
+        return _graph_statistics_instance
+
+    def __init__(self, neo4j_client=None, refresh_interval: Optional[float] = None):
+        if self._initialized:
+            return
+
+        self.neo4j_client = neo4j_client
+        self.refresh_interval = refresh_interval if refresh_interval is not None else \
+            float(os.getenv("KG_STATISTICS_REFRESH_SECONDS", "300"))
+        self.snapshot: Optional[Dict[str, Any]] = None
+        self.snapshot_at = 0.0
+        self._refresh_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        # 快照更新后的回调，参数为 (新快照, 生成时间)
+        self._listeners = []
+        self._initialized = True
+
+    def refresh(self) -> bool:
+        """从计数存储重建统计快照并原子替换，已有刷新进行中时直接返回"""
+        if not self._refresh_lock.acquire(blocking=False):
+            logger.info("统计快照正在刷新，跳过本次请求")
+            return False
+        try:
+            counts = self.neo4j_client.get_count_statistics()
+            if counts is None:
+                return False
+
+            node_label_counts = counts["labels"]
+            relation_type_counts = counts["relation_types"]
+            self.snapshot = {
+                '总实体数': counts["total_nodes"],
+                '总关系数': counts["total_relations"],
+                '实体类型数': len(node_label_counts),
+                '关系类型数': len(relation_type_counts),
+                '实体类型分布': node_label_counts,
+                '关系类型分布': relation_type_counts,
+            }
+            self.snapshot_at = time.time()
+            logger.info(f"统计快照已更新: {counts['total_nodes']}个实体, {counts['total_relations']}条关系")
+            for listener in list(self._listeners):
+                try:
+                    listener(self.snapshot, self.snapshot_at)
+                except Exception as e:
+                    logger.error(f"统计快照回调出错: {e}")
+            return True
+        except Exception as e:
+            logger.error(f"刷新统计快照时出错: {e}")
+            return False
+        finally:
+            self._refresh_lock.release()
+
+    def add_listener(self, listener):
+        """注册快照更新回调，回调在刷新线程中同步执行，应尽快返回"""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def start(self):
+        """在后台线程中构建快照，并按refresh_interval定期刷新"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, name='graph-statistics-refresh', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _refresh_loop(self):
+        while not self._stop_event.is_set():
+            self.refresh()
+            if self.refresh_interval <= 0:
+                break
+            self._stop_event.wait(self.refresh_interval)
+
+    def get(self) -> Optional[Dict[str, Any]]:
+        """
+        读取当前快照，附带 snapshot_time（生成时间戳）和 snapshot_age（距今秒数）
+
+        Returns:
+            dict: 快照副本，尚未生成快照时返回None
+        """
+        snapshot, snapshot_at = self.snapshot, self.snapshot_at
+        if snapshot is None:
+            return None
+        result = copy.deepcopy(snapshot)
+        result['snapshot_time'] = snapshot_at
+        result['snapshot_age'] = round(time.time() - snapshot_at, 3)
+        return result
@@ -1,7 +1,12 @@
 import logging
 from typing import Dict, List, Any, Optional
+import os
+import threading
 import time
 from AGKG.core.client_manager import get_client_manager
+from AGKG.services.graph_statistics import GraphStatistics, empty_statistics
+from AGKG.services.graph_analytics import GraphAnalytics
+from AGKG.services.statistics_broadcaster import StatisticsBroadcaster
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -26,6 +31,16 @@ class KnowledgeGraphService:
         self.retry_delay = retry_delay
         self.connected = True  # Neo4jClient已经在其自身的__init__中连接了数据库
         # 不需要再次调用connect()，避免重复连接和日志
+        # 统计信息由后台线程物化，接口只读取缓存的快照
+        self.statistics = GraphStatistics(self.neo4j_client)
+        self.statistics.start()
+        # 所有仪表盘的SSE连接共享同一份统计快照
+        self.broadcaster = StatisticsBroadcaster(self.statistics)
+        # 连接度分布、枢纽实体等扩展分析由后台任务按ID区间分页、页间休眠计算，可通过 KG_ANALYTICS_ENABLED 关闭
+        self.analytics = GraphAnalytics(self.neo4j_client)
+        self.analytics_enabled = os.getenv("KG_ANALYTICS_ENABLED", "true").lower() in ("1", "true", "yes")
+        if self.analytics_enabled:
+            self.analytics.start()
         
     def search_node_by_name(self, entity_name: Optional[str] = None, limit: int = 10) -> Dict[str, Any]:
         """
@@ -57,12 +72,13 @@ class KnowledgeGraphService:
             # 返回空数据而不是抛出异常，让前端可以处理
             return {'nodes': [], 'links': [], 'error': str(e)}
     
-    def search_entity(self, query: str) -> Dict[str, Any]:
+    def search_entity(self, query: str, depth: int = 1) -> Dict[str, Any]:
         """
         搜索实体
         
         Args:
             query: 搜索关键词
+            depth: 子图深度，默认为1跳
             
         Returns:
             dict: 包含匹配的节点和连接
@@ -78,8 +94,16 @@ class KnowledgeGraphService:
             if entities:
                 # 获取这些实体及其邻居形成的子图
                 entity_ids = [entity['id'] for entity in entities]
-                nodes, links = self.neo4j_client.get_subgraph_from_nodes(entity_ids)
-                return self.format_graph_data(nodes, links)
+                subgraph = self.neo4j_client.fetch_subgraph(entity_ids, depth)
+                graph_data = self.format_graph_data(subgraph['nodes'], subgraph['edges'])
+                # 子图超出节点/边预算时只返回部分结果
+                graph_data['truncated'] = subgraph['truncated']
+                # 附带按相关度排序的命中实体，模糊匹配时得分为None
+                graph_data['matches'] = [
+                    {'id': str(entity['id']), 'name': entity['name'], 'score': entity.get('score')}
+                    for entity in entities
+                ]
+                return graph_data
             else:
                 return {'nodes': [], 'links': []}
         except Exception as e:
@@ -103,6 +127,28 @@ class KnowledgeGraphService:
             logger.error(f"展开节点失败: {str(e)}")
             return {'nodes': [], 'links': [], 'error': f"展开失败: {str(e)}"}
     
+    def refresh_replica(self) -> Dict[str, Any]:
+        """
+        在后台线程中按需刷新进程内图副本
+
+        Returns:
+            dict: 副本状态
+        """
+        replica = self.neo4j_client.replica
+        if replica is None:
+            return {'status': 'error', 'message': '未启用进程内图副本'}
+
+        threading.Thread(target=replica.refresh, name='graph-replica-manual-refresh', daemon=True).start()
+        graph = replica.graph
+        return {
+            'status': 'success',
+            'message': '图副本刷新已开始',
+            'ready': replica.ready,
+            'loaded_at': replica.loaded_at,
+            'nodes': graph.node_count if graph else 0,
+            'relations': graph.edge_count if graph else 0
+        }
+
     def format_graph_data(self, nodes, links):
         # 格式化节点时统一转换为字符串
         formatted_nodes = []
@@ -159,62 +205,53 @@ class KnowledgeGraphService:
     
     def get_statistics(self) -> Dict[str, Any]:
         """
-        获取知识图谱统计信息
+        获取知识图谱统计信息，直接读取物化的统计快照
         
         Returns:
-            dict: 包含实体数量、关系数量等统计信息
+            dict: 包含实体数量、关系数量等统计信息，以及快照生成时间 snapshot_time 和快照年龄 snapshot_age（秒）
         """
         if not self.connected:
             logger.warning("未连接到Neo4j数据库，返回模拟统计数据")
             # 返回模拟的统计数据，而不是抛出异常
-            return {
-                '总实体数': 0,
-                '总关系数': 0,
-                '实体类型数': 0,
-                '关系类型数': 0,
-                '实体类型分布': {},
-                '关系类型分布': {},
-                'error': '数据库连接失败'
-            }
+            return {**empty_statistics(), 'error': '数据库连接失败'}
         
-        try:
-            logger.info("获取知识图谱统计信息")
-            node_stats = self.neo4j_client.get_node_statistics()
-            relation_stats = self.neo4j_client.get_relation_statistics()
-            
-            # 计算总节点数和总关系数
-            total_nodes = sum(item['count'] for item in node_stats) if node_stats else 0
-            total_relationships = sum(item['count'] for item in relation_stats) if relation_stats else 0
-            
-            # 处理节点标签统计
-            node_label_counts = {}
-            for item in node_stats:
-                if 'label' in item and 'count' in item:
-                    node_label_counts[item['label']] = item['count']
-            
-            # 处理关系类型统计
-            relation_type_counts = {}
-            for item in relation_stats:
-                if 'type' in item and 'count' in item:
-                    relation_type_counts[item['type']] = item['count']
-            
-            return {
-                '总实体数': total_nodes,
-                '总关系数': total_relationships,
-                '实体类型数': len(node_label_counts),
-                '关系类型数': len(relation_type_counts),
-                '实体类型分布': node_label_counts,
-                '关系类型分布': relation_type_counts
-            }
-        except Exception as e:
-            logger.error(f"获取统计信息失败: {str(e)}")
-            # 返回模拟数据，避免前端错误
-            return {
-                '总实体数': 0,
-                '总关系数': 0,
-                '实体类型数': 0,
-                '关系类型数': 0,
-                '实体类型分布': {},
-                '关系类型分布': {},
-                'error': f"获取统计信息失败: {str(e)}"
-            }
\ No newline at end of file
+        statistics = self.statistics.get()
+        if statistics is None:
+            # 首个快照仍在后台构建中
+            logger.info("统计快照尚未生成")
+            return {**empty_statistics(), 'snapshot_age': None, 'error': '统计信息正在生成，请稍后刷新'}
+        return statistics
+
+    def stream_statistics(self):
+        """
+        统计信息的SSE事件流，先推送全量快照，之后只推送变化的计数
+
+        Returns:
+            generator: SSE消息文本
+        """
+        return self.broadcaster.stream()
+
+    def refresh_statistics(self) -> Dict[str, Any]:
+        """
+        立即重建统计快照
+
+        Returns:
+            dict: 刷新结果及最新快照
+        """
+        if self.statistics.refresh():
+            return {'status': 'success', 'message': '统计信息已刷新', 'data': self.statistics.get()}
+        return {'status': 'error', 'message': '统计信息刷新失败或正在进行中', 'data': self.statistics.get()}
+
+    def get_analytics(self) -> Dict[str, Any]:
+        """
+        获取仪表盘扩展分析结果（连接度分布、枢纽实体、各类别平均连接度及不同邻居数）
+
+        Returns:
+            dict: 缓存的分析结果，首次计算尚未完成时 status 为 pending，未启用时为 disabled
+        """
+        if not self.analytics_enabled:
+            return {'status': 'disabled', 'message': '扩展分析未启用（KG_ANALYTICS_ENABLED）'}
+        analytics = self.analytics.get()
+        if analytics is None:
+            return {'status': 'pending', 'message': '分析结果正在计算，请稍后刷新'}
+        return {'status': 'success', 'data': analytics}
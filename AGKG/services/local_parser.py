@@ -0,0 +1,202 @@
+import logging
+import os
+import re
+import threading
+import unicodedata
+from typing import Dict, Any, Optional
+
+from AGKG.client.cypher_builder import INTENT_RELATIONS, INTENT_KEYWORDS
+from AGKG.services.graph_statistics import GraphStatistics
+from AGKG.utils.aho_corasick import AhoCorasick
+from AGKG.utils.metrics import counter, gauge
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('local_parser')
+
+# 创建本地问题解析器的单例实例
+_local_question_parser_instance = None
+
+# 去掉实体和意图关键词后允许剩下的疑问词、语气词
+_FILLER_PATTERN = re.compile(r"有什么|有哪些|是什么|是哪些|是啥|什么|哪些|怎么|如何|怎样|请问|一下|主要|具体|方法|吗|呢|呀|啊|的|有|是")
+_PUNCTUATION_PATTERN = re.compile(r"[\s\W_]+")
+# 指代词意味着问题依赖前文或包含多个子问题，交给大模型解析
+_REFERENCE_PATTERN = re.compile(r"它|其|他们|她们|这个|那个|以及|并且|同时")
+
+LOCAL_PARSES = counter("qa_local_parse_hits_total", "本地解析器直接解析的问题数")
+LOCAL_PARSE_FALLBACKS = counter("qa_local_parse_fallbacks_total", "本地解析器无法解析、回退到大模型的问题数")
+LOCAL_PARSE_HIT_RATE = gauge("qa_local_parse_hit_rate", "本地解析器命中率")
+LOCAL_PARSER_ENTITIES = gauge("qa_local_parser_entities", "本地解析器实体词典的词条数")
+
+
+def _normalize(text: str) -> str:
+    return unicodedata.normalize("NFKC", text or "").lower()
+
+
+class LocalQuestionParser:
+    """
+    本地问题解析器：单实体、单意图的简单问题（如"稻瘟病的防治方法"）直接由实体词典和意图关键词解析，
+    输出与大模型解析相同的结构，不再调用大模型
+
+    实体词典是基于Neo4j全部实体名称的Aho–Corasick自动机。启动时完整构建一次，之后由图变化信号触发增量更新：
+    GraphStatistics 快照中的实体总数或各类别实体数发生变化时，后台线程重新读取名称，只把新增、删除和改名的词条
+    应用到当前自动机的副本上，编译后原子地替换引用，更新期间的解析继续使用旧词典。
+    不改变计数的变化（如只修改名称）要等到下一次计数变化时才会反映到词典中。
+    无法高置信解析的问题返回None，由调用方交给大模型
+    """
+
+    def __new__(cls, neo4j_client=None, statistics: Optional[GraphStatistics] = None):
+        global _local_question_parser_instance
+        if _local_question_parser_instance is None:
+            _local_question_parser_instance = super(LocalQuestionParser, cls).__new__(cls)
+            _local_question_parser_instance._initialized = False
+        return _local_question_parser_instance
+
+    def __init__(self, neo4j_client=None, statistics: Optional[GraphStatistics] = None):
+        if self._initialized:
+            return
+
+        self.neo4j_client = neo4j_client
+        # 图变化信号的来源，为None时只在启动时构建一次词典
+        self.statistics = statistics
+        # 首次构建失败（如数据库尚未就绪）时的重试间隔（秒）
+        self.retry_interval = float(os.getenv("QA_LOCAL_PARSER_RETRY_SECONDS", "30"))
+        # 过短的名称容易误匹配普通词语
+        self.min_entity_length = int(os.getenv("QA_LOCAL_PARSER_MIN_ENTITY_LENGTH", "2"))
+        # 去掉实体、意图关键词和疑问词后最多允许剩余的字数，超出说明问题还包含其他信息
+        self.max_residual = int(os.getenv("QA_LOCAL_PARSER_MAX_RESIDUAL", "2"))
+        self.entities = AhoCorasick()
+        self.intents = AhoCorasick({_normalize(keyword): intent
+                                    for intent in INTENT_RELATIONS
+                                    for keyword in [intent] + INTENT_KEYWORDS.get(intent, [])})
+        self.loaded = False
+        self._refresh_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._changed = threading.Event()
+        self._last_counts = None
+        self._thread = None
+        self._initialized = True
+
+    def refresh(self) -> bool:
+        """读取全部实体名称，把与当前词典的差异应用到副本上并替换，已有刷新进行中时直接返回"""
+        if not self._refresh_lock.acquire(blocking=False):
+            logger.info("实体词典正在刷新，跳过本次请求")
+            return False
+        try:
+            names = self.neo4j_client.get_entity_names()
+            if names is None:
+                return False
+
+            current = {}
+            for name in names:
+                key = _normalize(str(name)).strip()
+                if len(key) >= self.min_entity_length:
+                    current.setdefault(key, str(name).strip())
+            # 新增词条及同一查找键下显示名称改变的词条
+            changed = {key: name for key, name in current.items() if self.entities.get(key) != name}
+            removed = [key for key in self.entities.words() if key not in current]
+            if changed or removed:
+                # 在解析线程看不到的副本上增量更新并编译，完成后一次赋值替换
+                entities = self.entities.copy()
+                entities.update(added=changed, removed=removed)
+                entities.compile()
+                self.entities = entities
+            LOCAL_PARSER_ENTITIES.set(len(self.entities))
+            self.loaded = True
+            logger.info(f"实体词典已更新: 新增或修改{len(changed)}个, 删除{len(removed)}个, 共{len(self.entities)}个")
+            return True
+        except Exception as e:
+            logger.error(f"刷新实体词典时出错: {e}")
+            return False
+        finally:
+            self._refresh_lock.release()
+
+    def _on_statistics(self, snapshot: Dict[str, Any], snapshot_at: float):
+        """统计快照回调：实体数量发生变化时唤醒刷新线程"""
+        counts = (snapshot.get('总实体数'), snapshot.get('实体类型分布'))
+        if self._last_counts is not None and counts != self._last_counts:
+            self._changed.set()
+        self._last_counts = counts
+
+    def start(self):
+        """在后台线程中构建实体词典，之后在图变化时增量更新"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        if self.statistics is not None:
+            self.statistics.add_listener(self._on_statistics)
+        self._thread = threading.Thread(target=self._refresh_loop, name='local-parser-refresh', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._changed.set()
+
+    def _refresh_loop(self):
+        while not self.refresh() and not self.loaded:
+            if self._stop_event.wait(self.retry_interval):
+                return
+        while not self._stop_event.is_set():
+            self._changed.wait()
+            self._changed.clear()
+            if self._stop_event.is_set():
+                return
+            self.refresh()
+
+    def parse(self, question: str) -> Optional[Dict[str, Any]]:
+        """
+        解析单实体、单意图的问题
+
+        Returns:
+            dict: 与大模型解析结果结构相同的JSON；无法高置信解析或词典尚未加载时返回None
+        """
+        result = self._parse(question) if self.loaded else None
+        (LOCAL_PARSES if result is not None else LOCAL_PARSE_FALLBACKS).inc()
+        total = LOCAL_PARSES.value + LOCAL_PARSE_FALLBACKS.value
+        LOCAL_PARSE_HIT_RATE.set(round(LOCAL_PARSES.value / total, 4) if total else 0)
+        if result is not None:
+            logger.info(f"本地解析问题: {question[:50]} -> {result['analysis']}")
+        return result
+
+    def _parse(self, question: str) -> Optional[Dict[str, Any]]:
+        text = _normalize(question)
+        if _REFERENCE_PATTERN.search(text):
+            return None
+
+        entities = self.entities.longest_matches(text)
+        if len({name for _, _, _, name in entities}) != 1:
+            return None
+        entity = entities[0][3]
+
+        # 意图关键词只在实体以外的文本中匹配，避免"稻瘟病"中的"病"之类的误判
+        remainder, last = [], 0
+        for start, end, _, _ in entities:
+            remainder.append(text[last:start])
+            last = end
+        remainder.append(text[last:])
+        remainder = "\0".join(remainder)
+
+        keywords = self.intents.longest_matches(remainder)
+        intents = {intent for _, _, _, intent in keywords}
+        if len(intents) != 1:
+            return None
+        intent = intents.pop()
+
+        residual = remainder
+        for start, end, keyword, _ in reversed(keywords):
+            residual = residual[:start] + "\0" + residual[end:]
+        residual = _PUNCTUATION_PATTERN.sub("", _FILLER_PATTERN.sub("", residual.replace("\0", "")))
+        if len(residual) > self.max_residual:
+            return None
+
+        return {
+            "question": question,
+            "analysis": {
+                "question_type": "实体推理",
+                "core_entities": [entity],
+                "query_intent": intent
+            },
+            "knowledge_graph": [
+                {"head": entity, "relation": intent, "tail": "Q1"}
+            ]
+        }
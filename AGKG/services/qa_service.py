@@ -1,13 +1,59 @@
+import copy
+import hashlib
 import json
 import logging
+import os
 import traceback
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from typing import Dict, List, Any
+from AGKG.client.zhipu_client import normalize_question
 from AGKG.core.client_manager import get_client_manager
+from AGKG.services.answer_synthesizer import AnswerSynthesizer
+from AGKG.services.graph_statistics import GraphStatistics
+from AGKG.services.local_parser import LocalQuestionParser
+from AGKG.utils.background_loop import BackgroundLoop
+from AGKG.utils.cache import TTLCache
+from AGKG.utils.dag_scheduler import DagScheduler
+from AGKG.utils.deadline import Deadline
+from AGKG.utils.metrics import counter
+from AGKG.utils.single_flight import SingleFlight
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('qa_service')
 
+# 增量解析：模型仍在输出问题解析时，已完整且头实体确定的三元组立即提交查询
+INCREMENTAL_PARSE_ENABLED = os.getenv("QA_INCREMENTAL_PARSE_ENABLED", "true").lower() in ("1", "true", "yes")
+PREFETCH_WORKERS = int(os.getenv("QA_PREFETCH_WORKERS", "4"))
+# 预取查询走异步驱动：作为协程提交到后台事件循环并发执行，图查询与模型输出重叠时不为每个预取占用线程；
+# 关闭时预取提交到 QA_PREFETCH_WORKERS 大小的线程池
+ASYNC_PREFETCH_ENABLED = os.getenv("QA_ASYNC_PREFETCH_ENABLED", "true").lower() in ("1", "true", "yes")
+# 本地解析：单实体、单意图的简单问题由实体词典和意图关键词直接解析，不调用大模型
+LOCAL_PARSER_ENABLED = os.getenv("QA_LOCAL_PARSER_ENABLED", "true").lower() in ("1", "true", "yes")
+# 三元组依赖图调度：共享线程池大小，以及单个问题最多同时执行的查询数，避免一个问题占满数据库连接池
+TRIPLET_WORKERS = int(os.getenv("QA_TRIPLET_WORKERS", "8"))
+REQUEST_CONCURRENCY = int(os.getenv("QA_REQUEST_CONCURRENCY", "4"))
+# Q值展开时每个Q值最多使用的结果数
+Q_VALUE_LIMIT = 10
+# 单个问题的时间预算（秒），沿 解析 -> 图查询 -> 答案整合 传递
+DEADLINE_SECONDS = float(os.getenv("QA_DEADLINE_SECONDS", "30"))
+# 解析阶段为图查询和答案拼接预留的秒数，解析在预留时间之前仍未完成时返回partial
+LOOKUP_RESERVE_SECONDS = float(os.getenv("QA_LOOKUP_RESERVE_SECONDS", "3"))
+# 剩余时间不足该秒数时不再调用大模型整合答案，直接返回逐条格式化的结果
+SYNTHESIS_MIN_SECONDS = float(os.getenv("QA_SYNTHESIS_MIN_SECONDS", "1"))
+# 大模型整合答案的缓存：相同的查询结果不重复整合
+ANSWER_CACHE_SIZE = int(os.getenv("QA_ANSWER_CACHE_SIZE", "1024"))
+ANSWER_CACHE_TTL = float(os.getenv("QA_ANSWER_CACHE_TTL", "86400"))
+# 合并并发的相同问题（按规范化后的问题文本）：只处理一次，其余请求等待并共享结果
+SINGLE_FLIGHT_ENABLED = os.getenv("QA_SINGLE_FLIGHT_ENABLED", "true").lower() in ("1", "true", "yes")
+
+LLM_ANSWERS = counter("qa_llm_answers_total", "实际调用大模型并得到整合结果的答案数")
+
+
+def answer_cache_key(answer_parts: List[str]) -> str:
+    """整合答案缓存键：逐三元组格式化结果文本的哈希"""
+    return hashlib.sha256("\n".join(answer_parts).encode("utf-8")).hexdigest()
+
 
 class QAService:
     def __init__(self):
@@ -15,157 +61,450 @@ class QAService:
         client_manager = get_client_manager()
         self.zhipu_client = client_manager.get_zhipu_client()
         self.neo4j_client = client_manager.get_neo4j_client()
-
-    def process_question(self, question: str, user_id: str = None) -> Dict[str, Any]:
+        self.async_neo4j_client = None
+        self.graph_loop = None
+        self.prefetch_executor = None
+        if INCREMENTAL_PARSE_ENABLED and ASYNC_PREFETCH_ENABLED:
+            self.async_neo4j_client = client_manager.get_async_neo4j_client()
+            self.graph_loop = BackgroundLoop('qa-graph-loop')
+        elif INCREMENTAL_PARSE_ENABLED:
+            self.prefetch_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix='qa-prefetch')
+        self.local_parser = None
+        if LOCAL_PARSER_ENABLED:
+            # 实体词典在统计快照中的实体数量变化时增量更新
+            statistics = GraphStatistics(self.neo4j_client)
+            statistics.start()
+            self.local_parser = LocalQuestionParser(self.neo4j_client, statistics)
+            self.local_parser.start()
+        self.scheduler = DagScheduler(TRIPLET_WORKERS, REQUEST_CONCURRENCY, thread_name_prefix='qa-triplet')
+        self.synthesizer = AnswerSynthesizer()
+        self.answer_cache = TTLCache("qa_answer_cache", max_size=ANSWER_CACHE_SIZE, ttl=ANSWER_CACHE_TTL)
+        self.single_flight = SingleFlight("qa_single_flight") if SINGLE_FLIGHT_ENABLED else None
+        # 解析阶段单独合并：流式请求无法共享整条流水线的结果，但可以共享最耗时的大模型解析
+        self.parse_flight = SingleFlight("qa_parse_single_flight") if SINGLE_FLIGHT_ENABLED else None
+
+    def process_question(self, question: str, user_id: str = None, deadline: Deadline = None) -> Dict[str, Any]:
         """
         处理用户问题，返回答案
+
+        同一问题（规范化后相同）的并发请求只处理一次，其余请求共享结果；
+        结果与用户无关，搜索记录等按用户的处理由调用方各自完成
         
         Args:
             question: 用户问题
             user_id: 用户ID，可选
+            deadline: 请求截止时间，默认为 QA_DEADLINE_SECONDS 秒
         """
+        deadline = deadline or Deadline(DEADLINE_SECONDS)
+        if self.single_flight is None:
+            return self._process_question(question, deadline)
+
+        try:
+            result, shared = self.single_flight.do(normalize_question(question),
+                                                   lambda: self._process_question(question, deadline),
+                                                   timeout=deadline.remaining())
+        except FutureTimeoutError:
+            logger.warning(f"等待相同问题的处理结果超时: {question[:50]}")
+            return self._partial_response(question, deadline, 'coalesced_wait')
+        if not shared:
+            return result
+        # 共享的结果保留本请求的原始提问
+        result = dict(result)
+        if 'question' in result:
+            result['question'] = question
+        return result
+
+    def _process_question(self, question: str, deadline: Deadline) -> Dict[str, Any]:
         try:
             # 1. 调用智谱API获取分析结果和知识图谱三元组
-            llm_result = self.zhipu_client.chat_completion(question)
-            logger.info(f"智谱AI返回结果: {json.dumps(llm_result, ensure_ascii=False)}")
+            parse_deadline = deadline.reserve(LOOKUP_RESERVE_SECONDS)
+            llm_result, prefetched = self._parse_coalesced(question, parse_deadline)
+            if llm_result is None:
+                return self._partial_response(question, deadline) if parse_deadline.expired() \
+                    else self._parse_error()
 
-            # 如果没有返回有效结果
-            if not llm_result or 'knowledge_graph' not in llm_result:
-                return {
-                    'status': 'error',
-                    'message': '处理问题时出错，无法识别问题结构'
-                }
-
-            # 2. 从返回结果中获取知识图谱三元组
+            # 2. 按依赖关系并行查询知识图谱
             triplets = llm_result.get('knowledge_graph', [])
-            logger.info(f"提取的三元组: {json.dumps(triplets, ensure_ascii=False)}")
-
-            # 3. 按依赖顺序处理三元组，动态查询知识图谱
-            kg_results = []
-            q_values = {}
-
-            for triplet in triplets:
-                head = triplet.get('head', '')
-                relation = triplet.get('relation', '')
-                tail = triplet.get('tail', '')
-
-                # 如果head是Q值，尝试替换
-                if head.startswith('Q') and head in q_values:
-                    # 限制为前10个值
-                    limited_values = q_values[head][:10]
-                    logger.info(f"限制为前10个Q值: {limited_values}")
-                    # 为Q值的每个结果生成新三元组
-                    for value in limited_values:
-                        new_triplet = {'head': value, 'relation': relation, 'tail': tail}
-                        logger.info(f"动态生成三元组: {json.dumps(new_triplet, ensure_ascii=False)}")
-                        result = self.neo4j_client.query_kg_triplets([new_triplet])
-                        kg_results.extend(result)
-                else:
-                    # 直接查询当前三元组
-                    logger.info(f"查询三元组: {json.dumps(triplet, ensure_ascii=False)}")
-                    result = self.neo4j_client.query_kg_triplets([triplet])
-                    kg_results.extend(result)
-
-                # 更新q_values
-                for res in result:
-                    triplet_res = res.get('triplet', {})
-                    query_result = res.get('result', [])
-                    if triplet_res.get('tail', '').startswith('Q') and query_result:
-                        q_id = triplet_res['tail']
-                        q_values[q_id] = [r.get('tail', '') for r in query_result]
-                        logger.info(f"更新q_values[{q_id}]: {q_values[q_id]}")
-
+            kg_results, q_values = self._resolve_triplets(triplets, prefetched, deadline)
             logger.info(f"知识图谱查询结果: {json.dumps(kg_results, ensure_ascii=False)}")
 
-            # 4. 构建最终答案
-            answer = self._construct_answer(llm_result, kg_results)
+            # 3. 构建最终答案
+            answer = self._construct_answer(llm_result, kg_results, deadline)
             logger.info(f"构建的答案: {answer}")
 
-            # 5. 构建重写后的查询
-            rewritten_query = []
-            if triplets:
-                # 收集所有相关的实体和Q值
-                entities = set()
-                for triplet in triplets:
-                    head = triplet.get('head', '')
-                    tail = triplet.get('tail', '')
-                    if head and not head.startswith('Q'):
-                        entities.add(head)
-                    if tail and not tail.startswith('Q'):
-                        entities.add(tail)
-                
-                # 添加所有Q值对应的实际值
-                for q_id, values in q_values.items():
-                    entities.update(values)
-                
-                # 构建重写后的查询
-                if entities:
-                    rewritten_query = json.dumps(list(entities), ensure_ascii=False)
-                    logger.info(f"重写后的查询: {rewritten_query}")
+            return self._build_response(question, llm_result, kg_results, q_values, answer, deadline)
 
+        except Exception as e:
+            logger.error(f"处理问题时发生错误: {str(e)}")
+            logger.error(traceback.format_exc())
             return {
-                'status': 'success',
+                'status': 'error',
+                'message': f'处理问题时发生错误: {str(e)}'
+            }
+
+    def process_question_stream(self, question: str, user_id: str = None, deadline: Deadline = None):
+        """
+        流式处理用户问题，各阶段结果一经得到立即产出；相同问题的并发请求共享解析阶段（见 _parse_coalesced）
+
+        Yields:
+            tuple: (事件名, 数据)，依次为
+                analysis: 问题解析结果 {question, analysis, knowledge_graph}
+                kg_results: 知识图谱查询结果 {kg_results}
+                answer_delta: 答案文本增量 {text}，可能多次
+                done: 与 process_question 返回值相同的完整结果（解析超时时为partial结果）
+            出错时产出 error 事件后结束
+        """
+        deadline = deadline or Deadline(DEADLINE_SECONDS)
+        try:
+            parse_deadline = deadline.reserve(LOOKUP_RESERVE_SECONDS)
+            llm_result, prefetched = self._parse_coalesced(question, parse_deadline)
+            if llm_result is None:
+                if parse_deadline.expired():
+                    yield 'done', self._partial_response(question, deadline)
+                else:
+                    yield 'error', self._parse_error()
+                return
+
+            triplets = llm_result.get('knowledge_graph', [])
+            yield 'analysis', {
                 'question': question,
                 'analysis': llm_result.get('analysis', {}),
-                'knowledge_graph': triplets,
-                'kg_results': kg_results,
-                'answer': answer,
-                'rewritten_query': rewritten_query
+                'knowledge_graph': triplets
             }
 
+            kg_results, q_values = self._resolve_triplets(triplets, prefetched, deadline)
+            yield 'kg_results', {'kg_results': kg_results}
+
+            answer = ''
+            for delta in self._stream_answer(llm_result, kg_results, deadline):
+                answer += delta
+                yield 'answer_delta', {'text': delta}
+            logger.info(f"构建的答案: {answer}")
+
+            yield 'done', self._build_response(question, llm_result, kg_results, q_values, answer, deadline)
+
         except Exception as e:
-            logger.error(f"处理问题时发生错误: {str(e)}")
+            logger.error(f"流式处理问题时发生错误: {str(e)}")
             logger.error(traceback.format_exc())
-            return {
+            yield 'error', {
                 'status': 'error',
                 'message': f'处理问题时发生错误: {str(e)}'
             }
 
-    def _construct_answer(self, llm_result: Dict[str, Any], kg_results: List[Dict[str, Any]]) -> str:
+    def _parse_coalesced(self, question: str, deadline: Deadline):
+        """
+        合并相同问题（规范化后相同）的并发解析，流式与普通请求之间同样合并；
+        共享的预取查询是普通Future，可以被多个请求读取。等待超过deadline时视为解析失败
+        """
+        if self.parse_flight is None:
+            return self._parse_question(question, deadline)
+        try:
+            (llm_result, prefetched), shared = self.parse_flight.do(
+                normalize_question(question), lambda: self._parse_question(question, deadline),
+                timeout=deadline.remaining())
+        except FutureTimeoutError:
+            logger.warning(f"等待相同问题的解析结果超时: {question[:50]}")
+            return None, {}
+        return (copy.deepcopy(llm_result), prefetched) if shared else (llm_result, prefetched)
+
+    def _parse_question(self, question: str, deadline: Deadline = None):
+        """
+        解析问题：本地解析器能高置信解析时直接使用其结果，否则调用智谱AI
+
+        启用增量解析时以流式方式接收解析结果，每个完整且头实体确定的三元组立即提交预取查询（见 _prefetch），
+        知识图谱查询与模型剩余的输出并行进行。超过deadline时智谱AI调用中止，视为解析失败
+
+        Returns:
+            tuple: (解析结果, 预取查询)，预取查询为 {三元组下标: Future}；
+                   结果中没有知识图谱三元组时解析结果为None
+        """
+        if self.local_parser is not None:
+            local_result = self.local_parser.parse(question)
+            if local_result is not None:
+                return local_result, {}
+
+        prefetched, streamed = {}, []
+        if not INCREMENTAL_PARSE_ENABLED:
+            llm_result = self.zhipu_client.chat_completion(question, deadline=deadline)
+        else:
+            llm_result = None
+            for event, payload in self.zhipu_client.stream_parse(question, deadline=deadline):
+                if event == 'result':
+                    llm_result = payload
+                    continue
+                streamed.append(payload)
+                head = payload.get('head', '') if isinstance(payload, dict) else ''
+                if head and not head.startswith('Q'):
+                    logger.info(f"预取三元组: {json.dumps(payload, ensure_ascii=False)}")
+                    prefetched[len(streamed) - 1] = self._prefetch(payload, deadline)
+
+        logger.info(f"智谱AI返回结果: {json.dumps(llm_result, ensure_ascii=False)}")
+        if not llm_result or 'knowledge_graph' not in llm_result:
+            return None, {}
+        triplets = llm_result.get('knowledge_graph', [])
+        logger.info(f"提取的三元组: {json.dumps(triplets, ensure_ascii=False)}")
+
+        # 只保留与最终解析结果一致的预取
+        prefetched = {index: future for index, future in prefetched.items()
+                      if index < len(triplets) and triplets[index] == streamed[index]}
+        return llm_result, prefetched
+
+    def _prefetch(self, triplet: Dict[str, str], deadline: Deadline) -> Future:
+        """
+        提交一个三元组的预取查询：启用异步驱动时作为协程在后台事件循环中与其他预取并发执行，否则提交到线程池
+
+        Returns:
+            Future: query_kg_triplets_batch 的结果
+        """
+        if self.graph_loop is not None:
+            return self.graph_loop.submit(self.async_neo4j_client.query_kg_triplets_batch([triplet], deadline))
+        return self.prefetch_executor.submit(self.neo4j_client.query_kg_triplets_batch, [triplet], deadline)
+
+    @staticmethod
+    def _partial_response(question: str, deadline: Deadline, stage: str = 'parse') -> Dict[str, Any]:
+        """
+        解析阶段超时，或等待相同问题的处理结果超时（stage为coalesced_wait）时快速返回的部分结果
+        """
+        deadline.degrade(stage)
+        message = '问题解析超时，请稍后重试' if stage == 'parse' else '相同问题正在处理中，等待超时，请稍后重试'
+        logger.warning(f"{message}: {question[:50]}")
+        return {
+            'status': 'partial',
+            'question': question,
+            'message': message,
+            'answer': message,
+            'degraded_stages': deadline.degraded_stages
+        }
+
+    @staticmethod
+    def _parse_error() -> Dict[str, Any]:
+        return {
+            'status': 'error',
+            'message': '处理问题时出错，无法识别问题结构'
+        }
+
+    def _build_response(self, question: str, llm_result: Dict[str, Any], kg_results: List[Dict[str, Any]],
+                        q_values: Dict[str, List[str]], answer: str, deadline: Deadline) -> Dict[str, Any]:
+        """组装最终返回结果"""
+        triplets = llm_result.get('knowledge_graph', [])
+        return {
+            'status': 'success',
+            'question': question,
+            'analysis': llm_result.get('analysis', {}),
+            'knowledge_graph': triplets,
+            'kg_results': kg_results,
+            'answer': answer,
+            'rewritten_query': self._rewrite_query(triplets, q_values),
+            'degraded_stages': deadline.degraded_stages
+        }
+
+    @staticmethod
+    def _rewrite_query(triplets: List[Dict[str, str]], q_values: Dict[str, List[str]]):
+        """构建重写后的查询：三元组中的确定实体及所有Q值对应的实际值"""
+        rewritten_query = []
+        if triplets:
+            # 收集所有相关的实体和Q值
+            entities = set()
+            for triplet in triplets:
+                head = triplet.get('head', '')
+                tail = triplet.get('tail', '')
+                if head and not head.startswith('Q'):
+                    entities.add(head)
+                if tail and not tail.startswith('Q'):
+                    entities.add(tail)
+
+            # 添加所有Q值对应的实际值
+            for q_id, values in q_values.items():
+                entities.update(values)
+
+            if entities:
+                rewritten_query = json.dumps(list(entities), ensure_ascii=False)
+                logger.info(f"重写后的查询: {rewritten_query}")
+        return rewritten_query
+
+    def _resolve_triplets(self, triplets: List[Dict[str, str]], prefetched: Dict[int, Any] = None,
+                          deadline: Deadline = None):
+        """
+        解析三元组：线性Qn依赖链编译为单条查询，其余三元组各为一个查询单元；
+        单元之间按Q值的产生与使用关系构成依赖图，依赖全部完成的单元立即并行查询，
+        Q值展开出的三元组合并为一次批量查询
+
+        Args:
+            triplets: 三元组列表
+            prefetched: 解析过程中已提交的查询 {三元组下标: Future}，直接使用其结果；
+                        以预取三元组开头的依赖链不再编译为单条查询，后续各跳逐个解析
+            deadline: 请求截止时间，各查询以剩余时间作为事务超时，到期后由数据库终止，
+                      不会继续占用线程池和连接；只返回已得到的结果
+
+        Returns:
+            tuple: (kg_results, q_values)，kg_results按原三元组顺序排列，与查询完成的先后无关
+        """
+        prefetched = prefetched or {}
+
+        # 查询单元：以首个三元组下标为键
+        units = {}
+        chained = set()
+        for chain in self._find_dependency_chains(triplets):
+            if chain[0] in prefetched:
+                continue
+            units[chain[0]] = chain
+            chained.update(chain)
+        for index in range(len(triplets)):
+            if index not in chained:
+                units[index] = [index]
+
+        # 依赖：单元的头实体为Q值时，依赖产生该Q值的全部单元
+        producers = {}
+        for key, indices in units.items():
+            for index in indices:
+                tail = triplets[index].get('tail', '')
+                if tail.startswith('Q'):
+                    producers.setdefault(tail, []).append(key)
+        dependencies = {}
+        for key, indices in sorted(units.items()):
+            head = triplets[indices[0]].get('head', '')
+            dependencies[key] = producers.get(head, []) if head.startswith('Q') else []
+
+        results_by_index = {}
+        produced = {}
+        q_values = {}
+
+        def start(key):
+            indices = units[key]
+            if len(indices) > 1:
+                # 线性Qn依赖链编译为单条Cypher，一次往返完成整条链的查询
+                chain_triplets = [triplets[index] for index in indices]
+                logger.info(f"编译查询依赖链: {json.dumps(chain_triplets, ensure_ascii=False)}")
+                return lambda: self.neo4j_client.query_dependency_chain(chain_triplets, deadline=deadline)
+
+            index = indices[0]
+            if index in prefetched:
+                return prefetched[index]
+            batch = self._expand_triplet(triplets[index], q_values)
+            logger.info(f"查询三元组: {json.dumps(batch, ensure_ascii=False)}")
+            return lambda: self.neo4j_client.query_kg_triplets_batch(batch, deadline)
+
+        def finish(key, result):
+            indices = units[key]
+            values = {}
+            if len(indices) > 1:
+                chain_results, values = result or ([], {})
+                index_by_tail = {triplets[index].get('tail', ''): index for index in indices}
+                for res in chain_results:
+                    results_by_index.setdefault(index_by_tail[res['triplet'].get('tail', '')], []).append(res)
+            else:
+                for res in result or []:
+                    if res is None:
+                        continue
+                    results_by_index.setdefault(indices[0], []).append(res)
+                    # 同一Q值的多个展开结果合并去重
+                    q_id = res['triplet'].get('tail', '')
+                    if q_id.startswith('Q') and res['result']:
+                        merged = values.setdefault(q_id, [])
+                        for r in res['result']:
+                            value = r.get('tail', '')
+                            if value not in merged:
+                                merged.append(value)
+            produced[key] = values
+
+            # 按单元顺序重新合并受影响的Q值，结果与各单元完成的先后无关
+            for q_id in values:
+                merged = []
+                for producer in sorted(producers.get(q_id, [])):
+                    for value in produced.get(producer, {}).get(q_id, []):
+                        if value not in merged:
+                            merged.append(value)
+                q_values[q_id] = merged
+                logger.info(f"更新q_values[{q_id}]: {merged}")
+
+        skipped = self.scheduler.run(dependencies, start, finish, deadline)
+        if skipped and deadline is not None and deadline.expired():
+            deadline.degrade('graph_lookup')
+        elif skipped:
+            logger.warning(f"三元组存在循环依赖，跳过: "
+                           f"{json.dumps([triplets[i] for key in skipped for i in units[key]], ensure_ascii=False)}")
+
+        kg_results = [res for index in sorted(results_by_index) for res in results_by_index[index]]
+        return kg_results, q_values
+
+    @staticmethod
+    def _expand_triplet(triplet: Dict[str, str], q_values: Dict[str, List[str]]) -> List[Dict[str, str]]:
+        """头实体为已解析的Q值时，为Q值的每个结果（限前Q_VALUE_LIMIT个）生成新三元组"""
+        head = triplet.get('head', '')
+        if not (head.startswith('Q') and head in q_values):
+            return [triplet]
+        limited_values = q_values[head][:Q_VALUE_LIMIT]
+        logger.info(f"限制为前{Q_VALUE_LIMIT}个Q值: {limited_values}")
+        return [{'head': value, 'relation': triplet.get('relation', ''), 'tail': triplet.get('tail', '')}
+                for value in limited_values]
+
+    @staticmethod
+    def _find_dependency_chains(triplets: List[Dict[str, str]]) -> List[List[int]]:
+        """
+        找出可整体编译的线性依赖链：头实体为确定实体，之后每跳的头实体是上一跳唯一产生、
+        且只被这一跳使用的Q值
+
+        Returns:
+            list: 每条依赖链对应的三元组下标列表（至少两跳）
+        """
+        producers, consumers = {}, {}
+        for index, triplet in enumerate(triplets):
+            head = triplet.get('head', '')
+            tail = triplet.get('tail', '')
+            if tail.startswith('Q'):
+                producers.setdefault(tail, []).append(index)
+            if head.startswith('Q'):
+                consumers.setdefault(head, []).append(index)
+
+        chains = []
+        for index, triplet in enumerate(triplets):
+            head = triplet.get('head', '')
+            if not head or head.startswith('Q'):
+                continue
+            chain = [index]
+            tail = triplet.get('tail', '')
+            while (tail.startswith('Q') and len(producers.get(tail, [])) == 1
+                   and len(consumers.get(tail, [])) == 1 and consumers[tail][0] not in chain):
+                chain.append(consumers[tail][0])
+                tail = triplets[chain[-1]].get('tail', '')
+            if len(chain) > 1:
+                chains.append(chain)
+        return chains
+
+    def _construct_answer(self, llm_result: Dict[str, Any], kg_results: List[Dict[str, Any]],
+                          deadline: Deadline = None) -> str:
         """
         根据LLM分析结果和知识图谱查询结果构建最终答案
+
+        剩余时间不足或大模型整合超时时，退回逐条格式化的查询结果，并记录synthesis降级
         """
         try:
-            analysis = llm_result.get('analysis', {})
-            question_type = analysis.get('question_type', '')
-            query_intent = analysis.get('query_intent', '')
-
-            answer_parts = []
-            q_values = {}  # 存储Q值对应的实际内容
-
-            # 处理查询结果，只保留完整三元组
-            for result in kg_results:
-                triplet = result.get('triplet', {})
-                query_result = result.get('result', [])
-
-                # 处理Q值替换
-                if triplet.get('tail', '').startswith('Q'):
-                    q_id = triplet['tail']
-                    if query_result:
-                        q_values[q_id] = [res.get('tail', '') for res in query_result]
-
-                # 格式化当前三元组的结果
-                answer_part = self._format_triplet_result(triplet, query_result, q_values, question_type)
-                # 只保留非空且非"未找到"结果
-                if answer_part and not answer_part.startswith("未找到"):
-                    answer_parts.append(answer_part)
+            answer_parts = self._collect_answer_parts(llm_result, kg_results)
 
             # 如果没有找到任何结果
             if not answer_parts:
                 return "抱歉，未能找到与您问题相关的信息。"
 
-            # 如果是多跳推理、实体推理或有多个结果，调用智谱AI整合
-            if question_type in ['多跳推理', '实体推理'] or len(answer_parts) > 1:
+            # 如果是多跳推理、实体推理或有多个结果，先用模板合成，超过复杂度阈值时调用智谱AI整合
+            if self._needs_synthesis(llm_result, answer_parts):
+                template_answer = self._template_answer(llm_result, kg_results, answer_parts)
+                if template_answer:
+                    return template_answer
+
+                cache_key = answer_cache_key(answer_parts)
+                cached = self.answer_cache.get(cache_key)
+                if cached:
+                    return cached
+                if self._synthesis_expired(deadline):
+                    return "\n".join(answer_parts)
                 try:
-                    # 构建提示信息
-                    prompt = (
-                            f"查询结果：\n" + "\n".join(answer_parts) + ""
-                    )
-                    logger.info(f"整合答案提示: {prompt}")
-                    # 调用智谱AI处理
-                    processed_result = self.zhipu_client.process_multiple_results(prompt)
+                    prompt = self._synthesis_prompt(answer_parts)
+                    processed_result = self.zhipu_client.process_multiple_results(prompt, deadline=deadline)
                     if processed_result:
+                        LLM_ANSWERS.inc()
+                        self.answer_cache.set(cache_key, processed_result)
                         return processed_result
+                    self._synthesis_expired(deadline, 0)
                 except Exception as e:
                     logger.error(f"调用智谱AI处理多个结果时发生错误: {str(e)}")
                     logger.error(traceback.format_exc())
@@ -176,6 +515,105 @@ class QAService:
             logger.error(traceback.format_exc())
             return "抱歉，处理答案时发生错误。"
 
+    def _stream_answer(self, llm_result: Dict[str, Any], kg_results: List[Dict[str, Any]],
+                       deadline: Deadline = None):
+        """
+        流式版本的 _construct_answer，需要整合时逐块产出智谱AI的输出，整合失败时退回拼接的查询结果；
+        整合因超时中断时在已输出的内容后补充逐条格式化的查询结果
+        """
+        try:
+            answer_parts = self._collect_answer_parts(llm_result, kg_results)
+            if not answer_parts:
+                yield "抱歉，未能找到与您问题相关的信息。"
+                return
+
+            if self._needs_synthesis(llm_result, answer_parts):
+                template_answer = self._template_answer(llm_result, kg_results, answer_parts)
+                if template_answer:
+                    yield template_answer
+                    return
+
+                cache_key = answer_cache_key(answer_parts)
+                cached = self.answer_cache.get(cache_key)
+                if cached:
+                    yield cached
+                    return
+
+                if not self._synthesis_expired(deadline):
+                    streamed = ''
+                    prompt = self._synthesis_prompt(answer_parts)
+                    for delta in self.zhipu_client.stream_multiple_results(prompt, deadline=deadline):
+                        streamed += delta
+                        yield delta
+                    if self._synthesis_expired(deadline, 0):
+                        if streamed:
+                            yield "\n\n"
+                    elif streamed:
+                        LLM_ANSWERS.inc()
+                        self.answer_cache.set(cache_key, streamed.strip())
+                        return
+
+            yield "\n".join(answer_parts)
+        except Exception as e:
+            logger.error(f"构建答案时发生错误: {str(e)}")
+            logger.error(traceback.format_exc())
+            yield "抱歉，处理答案时发生错误。"
+
+    def _collect_answer_parts(self, llm_result: Dict[str, Any], kg_results: List[Dict[str, Any]]) -> List[str]:
+        """将每个三元组的查询结果格式化为一段文本，只保留非空且非"未找到"的结果"""
+        question_type = llm_result.get('analysis', {}).get('question_type', '')
+
+        answer_parts = []
+        q_values = {}  # 存储Q值对应的实际内容
+
+        for result in kg_results:
+            triplet = result.get('triplet', {})
+            query_result = result.get('result', [])
+
+            # 处理Q值替换
+            if triplet.get('tail', '').startswith('Q'):
+                q_id = triplet['tail']
+                if query_result:
+                    q_values[q_id] = [res.get('tail', '') for res in query_result]
+
+            # 格式化当前三元组的结果
+            answer_part = self._format_triplet_result(triplet, query_result, q_values, question_type)
+            if answer_part and not answer_part.startswith("未找到"):
+                answer_parts.append(answer_part)
+        return answer_parts
+
+    @staticmethod
+    def _needs_synthesis(llm_result: Dict[str, Any], answer_parts: List[str]) -> bool:
+        """多跳推理、实体推理或有多个结果时需要调用智谱AI整合答案"""
+        question_type = llm_result.get('analysis', {}).get('question_type', '')
+        return question_type in ['多跳推理', '实体推理'] or len(answer_parts) > 1
+
+    @staticmethod
+    def _synthesis_expired(deadline: Deadline, margin: float = None) -> bool:
+        """剩余时间不超过margin秒（默认 SYNTHESIS_MIN_SECONDS）时记录synthesis降级并返回True"""
+        if deadline is None or not deadline.expired(SYNTHESIS_MIN_SECONDS if margin is None else margin):
+            return False
+        logger.warning("剩余时间不足，使用逐条格式化的查询结果作为答案")
+        deadline.degrade('synthesis')
+        return True
+
+    def _template_answer(self, llm_result: Dict[str, Any], kg_results: List[Dict[str, Any]],
+                         answer_parts: List[str]):
+        """模板合成答案，复杂度超过阈值或出错时返回None"""
+        question_type = llm_result.get('analysis', {}).get('question_type', '')
+        try:
+            return self.synthesizer.synthesize(question_type, kg_results, answer_parts)
+        except Exception as e:
+            logger.error(f"模板合成答案时发生错误: {str(e)}")
+            logger.error(traceback.format_exc())
+            return None
+
+    @staticmethod
+    def _synthesis_prompt(answer_parts: List[str]) -> str:
+        prompt = "查询结果：\n" + "\n".join(answer_parts)
+        logger.info(f"整合答案提示: {prompt}")
+        return prompt
+
     def _format_triplet_result(self, triplet: Dict[str, str], results: List[Dict[str, str]],
                                q_values: Dict[str, Any] = None, question_type: str = '') -> str:
         """
@@ -0,0 +1,146 @@
+import logging
+import os
+import queue
+import threading
+from typing import Dict, Any, Optional
+
+from AGKG.services.graph_statistics import GraphStatistics
+from AGKG.utils.metrics import gauge
+from AGKG.utils.sse import format_event
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('statistics_broadcaster')
+
+# 创建统计推送的单例实例
+_statistics_broadcaster_instance = None
+
+# 心跳间隔（秒），防止代理因空闲断开长连接
+HEARTBEAT_SECONDS = float(os.getenv("KG_STATISTICS_HEARTBEAT_SECONDS", "15"))
+# 每个订阅者未消费事件的上限，超出时丢弃该订阅者，由浏览器EventSource自动重连并重新获取全量快照
+SUBSCRIBER_QUEUE_SIZE = 16
+
+STREAM_SUBSCRIBERS = gauge("kg_statistics_stream_subscribers", "统计推送的SSE连接数")
+
+
+def diff_statistics(previous: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    计算两份统计快照之间的增量：标量字段给出新值，分布字段只给出变化的条目，已消失的条目值为None
+    """
+    delta = {}
+    for key, value in current.items():
+        old = previous.get(key)
+        if isinstance(value, dict) and isinstance(old, dict):
+            changed = {name: count for name, count in value.items() if old.get(name) != count}
+            changed.update({name: None for name in old if name not in value})
+            if changed:
+                delta[key] = changed
+        elif old != value:
+            delta[key] = value
+    return delta
+
+
+class StatisticsBroadcaster:
+    """
+    将同一份物化统计快照扇出给所有已连接的仪表盘
+
+    统计快照只由 GraphStatistics 的后台线程计算一次，计数发生变化时计算一次增量。增量和心跳都由同一个
+    分发线程写入所有订阅者的队列，连接本身不做任何计时，空闲时只阻塞在自己的队列上，
+    连接数增加不会给数据库带来额外查询。
+
+    空闲连接不占用线程需要以协程worker运行（见仓库根目录 gunicorn.conf.py，gevent worker），
+    此时每个连接只是一个阻塞在队列上的greenlet
+    """
+
+    def __new__(cls, statistics: Optional[GraphStatistics] = None):
+        global _statistics_broadcaster_instance
+        if _statistics_broadcaster_instance is None:
+            _statistics_broadcaster_instance = super(StatisticsBroadcaster, cls).__new__(cls)
+            _statistics_broadcaster_instance._initialized = False
+        return _statistics_broadcaster_instance
+
+    def __init__(self, statistics: Optional[GraphStatistics] = None):
+        if self._initialized:
+            return
+
+        self.statistics = statistics or GraphStatistics()
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._last = self.statistics.snapshot
+        # 待分发的消息，由分发线程取出后写入所有订阅者
+        self._outbox = queue.Queue()
+        self._dispatcher = None
+        self.statistics.add_listener(self._on_snapshot)
+        self._initialized = True
+
+    def subscribe(self) -> queue.Queue:
+        """注册订阅者，首个订阅者到来时启动分发线程"""
+        subscriber = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.add(subscriber)
+            STREAM_SUBSCRIBERS.set(len(self._subscribers))
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch_loop, name='statistics-dispatcher',
+                                                    daemon=True)
+                self._dispatcher.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber: queue.Queue):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+            STREAM_SUBSCRIBERS.set(len(self._subscribers))
+
+    def _on_snapshot(self, snapshot: Dict[str, Any], snapshot_at: float):
+        """快照刷新回调：计数未变化时不推送"""
+        previous, self._last = self._last, snapshot
+        delta = diff_statistics(previous, snapshot) if previous else dict(snapshot)
+        if not delta:
+            return
+        self._outbox.put(format_event('delta', {**delta, 'snapshot_time': snapshot_at}))
+
+    def _dispatch_loop(self):
+        """分发线程：有增量时写入所有订阅者，空闲满 HEARTBEAT_SECONDS 时写入心跳"""
+        while True:
+            try:
+                message = self._outbox.get(timeout=HEARTBEAT_SECONDS)
+            except queue.Empty:
+                message = ": heartbeat\n\n"
+            self.broadcast(message)
+
+    def broadcast(self, message: str):
+        """将一条消息写入所有订阅者的队列，队列已满的订阅者被断开"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                logger.warning("统计推送订阅者消费过慢，断开连接")
+                self.unsubscribe(subscriber)
+                # 唤醒阻塞中的生成器使其退出
+                try:
+                    subscriber.get_nowait()
+                    subscriber.put_nowait(None)
+                except (queue.Empty, queue.Full):
+                    pass
+
+    def stream(self):
+        """
+        SSE事件流：连接建立后先发送全量快照（snapshot），之后只在计数变化时发送增量（delta），
+        空闲时由分发线程定期写入注释行作为心跳
+
+        Returns:
+            generator: SSE消息文本
+        """
+        subscriber = self.subscribe()
+        try:
+            snapshot = self.statistics.get()
+            if snapshot is not None:
+                yield format_event('snapshot', snapshot)
+            while True:
+                message = subscriber.get()
+                if message is None:
+                    return
+                yield message
+        finally:
+            self.unsubscribe(subscriber)
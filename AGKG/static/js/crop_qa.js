@@ -14,6 +14,8 @@ document.addEventListener('DOMContentLoaded', () => {
     const queryIntent = document.getElementById('query-intent');
     const kgTriplets = document.getElementById('kg-triplets');
     const exampleLinks = document.querySelectorAll('.example-link');
+    // 当前问题解析出的三元组，查询结果到达时与之一并渲染
+    let currentTriplets = [];
     
     // 初始化折叠面板
     initCollapsible();
@@ -59,36 +61,27 @@ document.addEventListener('DOMContentLoaded', () => {
 
             console.log("搜索请求，user_id:", user_id, "类型:", typeof user_id);
 
-            // 发送请求到后端API
-            const response = await fetch('qa', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify({
-                    question,
-                    user_id: user_id || null  // 明确处理undefined情况
-                })
-            });
-            // 检查响应的内容类型
-            const contentType = response.headers.get('content-type');
-            
-            if (!contentType || !contentType.includes('application/json')) {
-                // 如果响应不是JSON，直接显示文本内容
-                const textContent = await response.text();
-                throw new Error(`服务器返回了非JSON格式的响应: ${textContent.substring(0, 150)}...`);
+            const payload = {
+                question,
+                user_id: user_id || null  // 明确处理undefined情况
+            };
+
+            // 优先使用流式接口，分阶段展示结果；只有在收到第一个事件之前失败才回退到普通接口，
+            // 否则服务端已在处理该问题，回退会重复解析和调用大模型
+            const stream = { received: false };
+            let streamed = false;
+            try {
+                streamed = await streamAnswer(payload, stream);
+            } catch (streamError) {
+                if (stream.received) {
+                    throw new Error('回答过程中连接中断，请稍后重试');
+                }
+                console.warn('流式问答失败，回退到普通接口:', streamError);
             }
-            
-            // 解析JSON响应
-            const data = await response.json();
-            
-            if (!response.ok) {
-                throw new Error(data.message || '服务器错误，请稍后再试');
+            if (!streamed) {
+                displayResult(await requestAnswer(payload));
             }
             
-            // 处理成功响应
-            displayResult(data);
-            
         } catch (error) {
             console.error('Error:', error);
             showError(error.message || '请求失败，请检查网络连接');
@@ -98,6 +91,121 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
     
+    // 普通问答请求，一次返回完整结果
+    async function requestAnswer(payload) {
+        // 发送请求到后端API
+        const response = await fetch('qa', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify(payload)
+        });
+        // 检查响应的内容类型
+        const contentType = response.headers.get('content-type');
+        
+        if (!contentType || !contentType.includes('application/json')) {
+            // 如果响应不是JSON，直接显示文本内容
+            const textContent = await response.text();
+            throw new Error(`服务器返回了非JSON格式的响应: ${textContent.substring(0, 150)}...`);
+        }
+        
+        // 解析JSON响应
+        const data = await response.json();
+        
+        if (!response.ok) {
+            throw new Error(data.message || '服务器错误，请稍后再试');
+        }
+        return data;
+    }
+    
+    // 流式问答请求：读取SSE事件流，解析结果、查询结果和答案增量到达时立即渲染
+    // 返回false表示尚未收到任何事件（可安全回退到普通接口）；收到事件后 stream.received 置为true
+    async function streamAnswer(payload, stream) {
+        const response = await fetch('qa/stream', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify(payload)
+        });
+        const contentType = response.headers.get('content-type');
+        if (!response.ok || !response.body || !contentType || !contentType.includes('text/event-stream')) {
+            return false;
+        }
+        
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder('utf-8');
+        let buffer = '';
+        let finished = false;
+        
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) {
+                break;
+            }
+            buffer += decoder.decode(value, { stream: true });
+            
+            // SSE消息以空行分隔
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const message = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                const event = parseEvent(message);
+                if (!event) {
+                    continue;
+                }
+                stream.received = true;
+                finished = finished || event.name === 'done' || event.name === 'error';
+                handleStreamEvent(event.name, event.data);
+            }
+        }
+        if (stream.received && !finished) {
+            throw new Error('事件流在结束前断开');
+        }
+        return stream.received;
+    }
+    
+    // 解析一条SSE消息，注释行（心跳）返回null
+    function parseEvent(message) {
+        let name = 'message';
+        const dataLines = [];
+        message.split('\n').forEach(line => {
+            if (line.startsWith('event:')) {
+                name = line.slice(6).trim();
+            } else if (line.startsWith('data:')) {
+                dataLines.push(line.slice(5).trim());
+            }
+        });
+        if (dataLines.length === 0) {
+            return null;
+        }
+        return { name, data: JSON.parse(dataLines.join('\n')) };
+    }
+    
+    // 按事件类型渲染流式结果
+    function handleStreamEvent(name, data) {
+        switch (name) {
+            case 'analysis':
+                displayResult({ ...data, answer: '' });
+                loadingElement.style.display = 'none';
+                break;
+            case 'kg_results':
+                renderKnowledge(currentTriplets, data.kg_results);
+                break;
+            case 'answer_delta':
+                answerText.textContent += data.text || '';
+                break;
+            case 'done':
+                displayResult(data);
+                break;
+            case 'error':
+                // 服务端已处理过该问题，直接展示错误，不再回退重复请求
+                showError(data.message || '服务器错误，请稍后再试');
+                break;
+        }
+    }
+    
     // 显示结果
     function displayResult(data) {
         // 显示问题
@@ -117,26 +225,38 @@ document.addEventListener('DOMContentLoaded', () => {
         // 查询意图
         queryIntent.textContent = analysis.query_intent || '未识别';
         
-        // 知识图谱三元组
-        const triplets = data.knowledge_graph || [];
-        if (triplets.length > 0) {
-            kgTriplets.innerHTML = formatTriplets(triplets);
-        } else {
-            kgTriplets.textContent = '无三元组信息';
-        }
+        // 知识图谱三元组及查询结果
+        currentTriplets = data.knowledge_graph || [];
+        renderKnowledge(currentTriplets, data.kg_results);
         
         // 显示结果内容
         resultContent.style.display = 'block';
     }
     
+    // 渲染解析出的三元组，以及（已返回时）知识图谱中查到的事实
+    function renderKnowledge(triplets, kgResults) {
+        if (triplets.length === 0) {
+            kgTriplets.textContent = '无三元组信息';
+            return;
+        }
+        let html = formatTriplets(triplets);
+        if (kgResults) {
+            const facts = [];
+            kgResults.forEach(item => (item.result || []).forEach(fact => facts.push(fact)));
+            html += '<h6 class="mt-3">知识图谱查询结果</h6>';
+            html += facts.length > 0 ? formatTriplets(facts) : '<div>未查询到相关知识</div>';
+        }
+        kgTriplets.innerHTML = html;
+    }
+    
     // 格式化三元组显示
     function formatTriplets(triplets) {
         let html = '';
         
         triplets.forEach((triplet, index) => {
-            const head = triplet.head || '未知';
-            const relation = triplet.relation || '未知';
-            const tail = triplet.tail || '未知';
+            const head = escapeHtml(triplet.head || '未知');
+            const relation = escapeHtml(triplet.relation || '未知');
+            const tail = escapeHtml(triplet.tail || '未知');
             
             html += `<div class="triplet">
                 <span class="triplet-index">${index + 1}.</span>
@@ -149,6 +269,13 @@ document.addEventListener('DOMContentLoaded', () => {
         return html;
     }
     
+    // 转义知识图谱中的文本，避免实体名称被当作HTML解析
+    function escapeHtml(text) {
+        const div = document.createElement('div');
+        div.textContent = String(text);
+        return div.innerHTML;
+    }
+    
     // 显示错误信息
     function showError(message) {
         resultSection.style.display = 'block';
@@ -1,6 +1,7 @@
 // 页面加载完成后自动加载统计数据
 document.addEventListener('DOMContentLoaded', function() {
     loadStatistics();
+    loadAnalytics();
     setupFullscreenButtons();
 });
 
@@ -18,6 +19,9 @@ const colors = [
     '#ffb300', '#43a047', '#00897b', '#c62828', '#ad1457'
 ];
 
+// 当前统计数据，SSE增量在此基础上合并
+let currentStatistics = null;
+
 // 加载统计数据
 function loadStatistics() {
     // 显示加载中状态
@@ -28,28 +32,27 @@ function loadStatistics() {
     entityChart = echarts.init(document.getElementById('entity-stats'));
     relationChart = echarts.init(document.getElementById('relation-stats'));
     
-    // 获取数据
+    // 窗口大小改变时重绘图表
+    window.addEventListener('resize', function() {
+        if (entityChart) entityChart.resize();
+        if (relationChart) relationChart.resize();
+    });
+    
+    // 优先通过SSE订阅统计推送，浏览器不支持时退回一次性请求
+    if (window.EventSource) {
+        subscribeStatistics();
+    } else {
+        fetchStatistics();
+    }
+}
+
+// 一次性获取统计数据
+function fetchStatistics() {
     fetch('/api/knowledge_graph/statistics')
         .then(response => response.json())
         .then(data => {
-            // 更新总数统计
-            updateOverviewStats(data);
-            
-            // 更新实体图表和表格
-            updateEntityStats(data.entities || data['实体类型分布']);
-            
-            // 更新关系图表和表格
-            updateRelationStats(data.relations || data['关系类型分布']);
-            
-            // 隐藏加载中状态
-            document.getElementById('loading-entity').style.display = 'none';
-            document.getElementById('loading-relation').style.display = 'none';
-            
-            // 窗口大小改变时重绘图表
-            window.addEventListener('resize', function() {
-                if (entityChart) entityChart.resize();
-                if (relationChart) relationChart.resize();
-            });
+            currentStatistics = data;
+            renderStatistics(data);
         })
         .catch(error => {
             console.error('获取统计数据失败:', error);
@@ -58,6 +61,69 @@ function loadStatistics() {
         });
 }
 
+// 订阅统计推送：连接时收到全量快照，之后只在计数变化时收到增量
+function subscribeStatistics() {
+    const source = new EventSource('/api/knowledge_graph/statistics/stream');
+    let received = false;
+    
+    source.addEventListener('snapshot', function(event) {
+        received = true;
+        currentStatistics = JSON.parse(event.data);
+        renderStatistics(currentStatistics);
+    });
+    
+    source.addEventListener('delta', function(event) {
+        received = true;
+        currentStatistics = mergeStatistics(currentStatistics || {}, JSON.parse(event.data));
+        renderStatistics(currentStatistics);
+    });
+    
+    source.onerror = function() {
+        // 已收到过数据时由EventSource自动重连；从未连通（如代理不支持长连接）则退回一次性请求
+        if (!received) {
+            source.close();
+            fetchStatistics();
+        }
+    };
+}
+
+// 合并统计增量，分布中值为null的条目表示已删除
+function mergeStatistics(base, delta) {
+    const merged = Object.assign({}, base);
+    Object.entries(delta).forEach(([key, value]) => {
+        if (value && typeof value === 'object' && !Array.isArray(value)) {
+            const distribution = Object.assign({}, merged[key] || {});
+            Object.entries(value).forEach(([name, count]) => {
+                if (count === null) {
+                    delete distribution[name];
+                } else {
+                    distribution[name] = count;
+                }
+            });
+            merged[key] = distribution;
+        } else {
+            merged[key] = value;
+        }
+    });
+    return merged;
+}
+
+// 渲染统计数据
+function renderStatistics(data) {
+    // 更新总数统计
+    updateOverviewStats(data);
+    
+    // 更新实体图表和表格
+    updateEntityStats(data.entities || data['实体类型分布']);
+    
+    // 更新关系图表和表格
+    updateRelationStats(data.relations || data['关系类型分布']);
+    
+    // 隐藏加载中状态
+    document.getElementById('loading-entity').style.display = 'none';
+    document.getElementById('loading-relation').style.display = 'none';
+}
+
 // 更新概览统计数据
 function updateOverviewStats(data) {
     document.getElementById('total-nodes').textContent = formatNumber(data.total_nodes || data['总实体数'] || 0);
@@ -339,6 +405,52 @@ function updateRelationStats(relations) {
     });
 }
 
+// 加载扩展分析数据（后台任务计算，结果可能尚未就绪）
+function loadAnalytics() {
+    fetch('/api/knowledge_graph/statistics/analytics')
+        .then(response => response.json())
+        .then(result => {
+            if (result.status !== 'success') {
+                return;
+            }
+            updateAnalytics(result.data);
+        })
+        .catch(error => {
+            console.error('获取分析数据失败:', error);
+        });
+}
+
+// 更新枢纽实体和类别连接度表格
+function updateAnalytics(data) {
+    const distribution = data.degree_distribution || {};
+    document.getElementById('degree-summary').textContent =
+        `平均连接度 ${distribution.mean} · 中位数 ${distribution.p50} · P99 ${distribution.p99} · 最大 ${formatNumber(distribution.max || 0)}`;
+
+    const hubBody = document.getElementById('hub-table-body');
+    hubBody.innerHTML = '';
+    (data.top_hubs || []).forEach(hub => {
+        const row = document.createElement('tr');
+        row.innerHTML = `
+            <td>${escapeHtml(hub.name)}</td>
+            <td>${escapeHtml(hub.category || '')}</td>
+            <td class="text-end">${formatNumber(hub.degree)}</td>
+        `;
+        hubBody.appendChild(row);
+    });
+
+    const labelBody = document.getElementById('label-degree-table-body');
+    labelBody.innerHTML = '';
+    Object.entries(data.labels || {}).forEach(([name, stats]) => {
+        const row = document.createElement('tr');
+        row.innerHTML = `
+            <td>${escapeHtml(name)}</td>
+            <td class="text-end">${stats.average_degree}</td>
+            <td class="text-end">${formatNumber(stats.distinct_neighbors)}</td>
+        `;
+        labelBody.appendChild(row);
+    });
+}
+
 // 设置全屏按钮
 function setupFullscreenButtons() {
     // 实体统计全屏
@@ -407,6 +519,13 @@ function toggleFullscreen(chartId, title) {
     }
 }
 
+// 转义HTML特殊字符，实体名称、类别等来自图数据，插入innerHTML前必须转义
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = String(text);
+    return div.innerHTML;
+}
+
 // 格式化数字（添加千位分隔符）
 function formatNumber(num) {
     return num.toString().replace(/(\d)(?=(\d{3})+(?!\d))/g, '$1,');
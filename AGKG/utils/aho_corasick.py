@@ -0,0 +1,164 @@
+import threading
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class AhoCorasick:
+    """
+    Aho–Corasick 多模式匹配自动机，一次扫描找出文本中出现的全部词条
+
+    词条可增量增删：新增词条直接插入字典树，删除只清除结尾标记，修改后下次匹配前（或调用compile时）重算失败指针；
+    已删除的节点超过存活词条数时整体重建以回收空间。
+    写操作由内部锁保护，匹配不加锁：多线程共享的实例应当只读，需要修改时用copy得到副本，
+    在副本上update并compile后再整体替换引用
+    """
+
+    def __init__(self, words: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            words: 初始词条 {词条: 附带数据}
+        """
+        self._lock = threading.Lock()
+        self._words: Dict[str, Any] = {}
+        self._reset()
+        if words:
+            self.update(added=words)
+
+    def _reset(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # 以该节点结尾的词条，None表示不是词条结尾
+        self._terminal: List[Optional[str]] = [None]
+        # 沿失败指针可达的最近一个词条结尾节点
+        self._output: List[int] = [-1]
+        self._removed = 0
+        self._dirty = False
+
+    def __len__(self):
+        return len(self._words)
+
+    def __contains__(self, word: str):
+        return word in self._words
+
+    def words(self) -> Iterable[str]:
+        return list(self._words)
+
+    def get(self, word: str, default: Any = None) -> Any:
+        """词条的附带数据"""
+        return self._words.get(word, default)
+
+    def copy(self) -> "AhoCorasick":
+        """复制词条和字典树，副本的修改不影响本实例"""
+        clone = AhoCorasick()
+        with self._lock:
+            clone._words = dict(self._words)
+            clone._goto = [dict(edges) for edges in self._goto]
+            clone._fail = list(self._fail)
+            clone._terminal = list(self._terminal)
+            clone._output = list(self._output)
+            clone._removed = self._removed
+            clone._dirty = self._dirty
+        return clone
+
+    def update(self, added: Optional[Dict[str, Any]] = None, removed: Iterable[str] = ()):
+        """增量更新词条：added 中的词条新增或替换附带数据，removed 中的词条删除"""
+        with self._lock:
+            for word in removed:
+                if word not in self._words:
+                    continue
+                del self._words[word]
+                self._terminal[self._find(word)] = None
+                self._removed += 1
+                self._dirty = True
+            for word, payload in (added or {}).items():
+                if not word:
+                    continue
+                if word not in self._words:
+                    self._insert(word)
+                self._words[word] = payload
+
+            if self._removed > len(self._words):
+                self._reset()
+                for word in self._words:
+                    self._insert(word)
+
+    def compile(self):
+        """立即重算失败指针，之后的匹配不再需要重建"""
+        with self._lock:
+            if self._dirty:
+                self._build()
+
+    def _find(self, word: str) -> Optional[int]:
+        node = 0
+        for char in word:
+            node = self._goto[node].get(char)
+            if node is None:
+                return None
+        return node
+
+    def _insert(self, word: str):
+        node = 0
+        for char in word:
+            child = self._goto[node].get(char)
+            if child is None:
+                child = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._terminal.append(None)
+                self._output.append(-1)
+                self._goto[node][char] = child
+            node = child
+        self._terminal[node] = word
+        self._dirty = True
+
+    def _build(self):
+        """按层遍历重算失败指针和输出链接"""
+        queue = deque()
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            self._output[child] = -1
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                fallback = self._fail[child]
+                self._output[child] = fallback if self._terminal[fallback] is not None else self._output[fallback]
+                queue.append(child)
+        self._dirty = False
+
+    def search(self, text: str) -> List[Tuple[int, int, str, Any]]:
+        """
+        找出文本中出现的全部词条（含相互重叠的）
+
+        Returns:
+            list: [(起始位置, 结束位置(不含), 词条, 附带数据)]，按结束位置排列
+        """
+        if self._dirty:
+            self.compile()
+        matches = []
+        node = 0
+        for position, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            hit = node if self._terminal[node] is not None else self._output[node]
+            while hit > 0:
+                word = self._terminal[hit]
+                matches.append((position + 1 - len(word), position + 1, word, self._words[word]))
+                hit = self._output[hit]
+        return matches
+
+    def longest_matches(self, text: str) -> List[Tuple[int, int, str, Any]]:
+        """找出互不重叠的词条，重叠时优先取起始位置靠前、其次长度更长的词条"""
+        selected = []
+        end = 0
+        for match in sorted(self.search(text), key=lambda m: (m[0], m[0] - m[1])):
+            if match[0] >= end:
+                selected.append(match)
+                end = match[1]
+        return selected
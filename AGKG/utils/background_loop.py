@@ -0,0 +1,45 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Coroutine, Optional
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('background_loop')
+
+
+class BackgroundLoop:
+    """
+    在守护线程中常驻运行的事件循环，供同步代码提交协程：
+    提交的协程在同一个循环中并发执行，不为每个调用占用线程，返回的Future可在任意线程中等待。
+    循环在首次提交时启动，绑定在循环上的异步驱动、连接池因此在进程内只创建一份
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+
+                def run():
+                    asyncio.set_event_loop(loop)
+                    loop.run_forever()
+
+                threading.Thread(target=run, name=self.name, daemon=True).start()
+                self._loop = loop
+                logger.info(f"后台事件循环 {self.name} 已启动")
+            return self._loop
+
+    def submit(self, coroutine: Coroutine[Any, Any, Any]) -> Future:
+        """
+        将协程提交到后台事件循环
+
+        Returns:
+            concurrent.futures.Future: 协程的结果（或异常）
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self._ensure_loop())
@@ -0,0 +1,179 @@
+import copy
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from AGKG.utils.metrics import counter, gauge
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('cache')
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    LRU + TTL 缓存，内存层按最近使用淘汰，可选的SQLite磁盘层在进程重启后依然有效
+
+    值需可JSON序列化（磁盘层以JSON保存）；读取时返回深拷贝，调用方修改结果不会污染缓存。
+    命中/未命中次数以 {name}_hits_total / {name}_misses_total 等指标导出
+    """
+
+    def __init__(self, name: str, max_size: int = 1024, ttl: Optional[float] = None,
+                 sqlite_path: Optional[str] = None, disk_max_size: int = 100000):
+        """
+        Args:
+            name: 缓存名称，用于指标命名和磁盘层表名
+            max_size: 内存层最大条目数
+            ttl: 过期时间（秒），None表示不过期
+            sqlite_path: 磁盘层SQLite文件路径，None表示只使用内存层
+            disk_max_size: 磁盘层最大条目数，超出时淘汰最久未访问的条目
+        """
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self.disk_max_size = disk_max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = counter(f"{name}_hits_total", f"{name} 内存层命中次数")
+        self._disk_hits = counter(f"{name}_disk_hits_total", f"{name} 磁盘层命中次数")
+        self._misses = counter(f"{name}_misses_total", f"{name} 未命中次数")
+        self._size = gauge(f"{name}_entries", f"{name} 内存层条目数")
+
+        self._db = None
+        self._table = ''.join(c if c.isalnum() else '_' for c in name)
+        if sqlite_path:
+            try:
+                self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+                self._db.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {self._table} (
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL,
+                        expires_at REAL,
+                        accessed_at REAL NOT NULL
+                    )""")
+                self._db.execute(f"CREATE INDEX IF NOT EXISTS {self._table}_accessed "
+                                 f"ON {self._table} (accessed_at)")
+                self._db.commit()
+            except Exception as e:
+                logger.error(f"打开缓存文件 {sqlite_path} 失败，只使用内存缓存: {e}")
+                self._db = None
+
+    def _expires_at(self) -> Optional[float]:
+        return time.time() + self.ttl if self.ttl else None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """读取缓存值（深拷贝），不存在或已过期时返回default"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._hits.inc()
+                    return copy.deepcopy(value)
+                del self._entries[key]
+
+            value = self._disk_get(key, now)
+            if value is _MISSING:
+                self._misses.inc()
+                return default
+            # 磁盘层命中后回填内存层
+            self._store(key, value, self._expires_at())
+            self._disk_hits.inc()
+            return copy.deepcopy(value)
+
+    def set(self, key: str, value: Any):
+        """写入缓存值（保存深拷贝）"""
+        value = copy.deepcopy(value)
+        expires_at = self._expires_at()
+        with self._lock:
+            self._store(key, value, expires_at)
+            self._disk_set(key, value, expires_at)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._size.set(len(self._entries))
+            if self._db is not None:
+                try:
+                    self._db.execute(f"DELETE FROM {self._table} WHERE key = ?", (key,))
+                    self._db.commit()
+                except Exception as e:
+                    logger.error(f"删除磁盘缓存条目失败: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size.set(0)
+            if self._db is not None:
+                try:
+                    self._db.execute(f"DELETE FROM {self._table}")
+                    self._db.commit()
+                except Exception as e:
+                    logger.error(f"清空磁盘缓存失败: {e}")
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "hits": self._hits.value,
+            "disk_hits": self._disk_hits.value,
+            "misses": self._misses.value,
+        }
+
+    def _store(self, key, value, expires_at):
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        self._size.set(len(self._entries))
+
+    def _disk_get(self, key, now):
+        if self._db is None:
+            return _MISSING
+        try:
+            row = self._db.execute(f"SELECT value, expires_at FROM {self._table} WHERE key = ?",
+                                   (key,)).fetchone()
+            if row is None:
+                return _MISSING
+            value, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self._db.execute(f"DELETE FROM {self._table} WHERE key = ?", (key,))
+                self._db.commit()
+                return _MISSING
+            self._db.execute(f"UPDATE {self._table} SET accessed_at = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            return json.loads(value)
+        except Exception as e:
+            logger.error(f"读取磁盘缓存失败: {e}")
+            return _MISSING
+
+    def _disk_set(self, key, value, expires_at):
+        if self._db is None:
+            return
+        try:
+            self._db.execute(f"INSERT OR REPLACE INTO {self._table} (key, value, expires_at, accessed_at) "
+                             f"VALUES (?, ?, ?, ?)",
+                             (key, json.dumps(value, ensure_ascii=False), expires_at, time.time()))
+            # 超出容量时先清理过期条目，再淘汰最久未访问的条目
+            count = self._db.execute(f"SELECT COUNT(*) FROM {self._table}").fetchone()[0]
+            if count > self.disk_max_size:
+                self._db.execute(f"DELETE FROM {self._table} WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                                 (time.time(),))
+                self._db.execute(f"""
+                    DELETE FROM {self._table} WHERE key IN (
+                        SELECT key FROM {self._table} ORDER BY accessed_at ASC
+                        LIMIT MAX(0, (SELECT COUNT(*) FROM {self._table}) - ?)
+                    )""", (self.disk_max_size,))
+            self._db.commit()
+        except Exception as e:
+            logger.error(f"写入磁盘缓存失败: {e}")
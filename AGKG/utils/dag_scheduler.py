@@ -0,0 +1,106 @@
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set
+
+from AGKG.utils.deadline import Deadline
+from AGKG.utils.metrics import gauge
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('dag_scheduler')
+
+SCHEDULER_TASKS_IN_FLIGHT = gauge("dag_scheduler_tasks_in_flight", "DAG调度器正在执行的任务数")
+
+
+class DagScheduler:
+    """
+    依赖图调度器：任务的全部依赖完成后立即提交到共享的有界线程池，不必等待同层其他任务
+
+    每次 run 调用最多同时执行 request_concurrency 个任务，单个请求不会占满线程池（及其背后的数据库连接池）。
+    start / finish 回调都在调用 run 的线程中执行，调用方无需为共享状态加锁；
+    同时就绪的任务按键排序后提交，结果的使用顺序由调用方按键确定，与完成先后无关。
+    传入截止时间时，到期后不再提交新任务，也不再等待执行中的任务；执行中的任务无法取消，
+    需要自行以截止时间约束执行时长（如图查询的事务超时），否则会继续占用线程池
+    """
+
+    def __init__(self, max_workers: int, request_concurrency: int, thread_name_prefix: str = 'dag-scheduler'):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self.request_concurrency = max(1, request_concurrency)
+
+    def run(self, dependencies: Dict[Hashable, Iterable[Hashable]],
+            start: Callable[[Hashable], Optional[Any]],
+            finish: Callable[[Hashable, Any], None], deadline: Optional[Deadline] = None) -> List[Hashable]:
+        """
+        执行依赖图
+
+        Args:
+            dependencies: {任务键: 依赖的任务键}，不在图中的依赖视为已完成
+            start: 任务就绪时调用，返回在线程池中执行的无参函数、已在执行的Future，或None表示无需执行
+            finish: 任务完成时以 (任务键, 结果) 调用；任务抛出异常时结果为None
+            deadline: 截止时间
+
+        Returns:
+            list: 因循环依赖或截止时间到期而未完成的任务键
+        """
+        waiting: Dict[Hashable, Set[Hashable]] = {
+            key: {dep for dep in deps if dep in dependencies and dep != key}
+            for key, deps in dependencies.items()
+        }
+        dependents: Dict[Hashable, List[Hashable]] = {}
+        for key, deps in waiting.items():
+            for dep in deps:
+                dependents.setdefault(dep, []).append(key)
+
+        ready = sorted(key for key, deps in waiting.items() if not deps)
+        for key in ready:
+            del waiting[key]
+        running: Dict[Future, Hashable] = {}
+
+        def complete(key, result):
+            finish(key, result)
+            newly_ready = []
+            for dependent in dependents.get(key, []):
+                deps = waiting.get(dependent)
+                if deps is None:
+                    continue
+                deps.discard(key)
+                if not deps:
+                    del waiting[dependent]
+                    newly_ready.append(dependent)
+            ready.extend(newly_ready)
+            ready.sort()
+
+        while ready or running:
+            if deadline is not None and deadline.expired():
+                logger.warning(f"调度超过截止时间，放弃{len(ready) + len(running) + len(waiting)}个未完成的任务")
+                for future in running:
+                    future.cancel()
+                SCHEDULER_TASKS_IN_FLIGHT.dec(len(running))
+                return sorted(list(waiting) + ready + list(running.values()))
+
+            while ready and len(running) < self.request_concurrency:
+                key = ready.pop(0)
+                work = start(key)
+                if work is None:
+                    complete(key, None)
+                    continue
+                future = work if isinstance(work, Future) else self.executor.submit(work)
+                running[future] = key
+                SCHEDULER_TASKS_IN_FLIGHT.inc()
+
+            if not running:
+                continue
+            done, _ = wait(list(running), timeout=deadline.remaining() if deadline is not None else None,
+                           return_when=FIRST_COMPLETED)
+            for future in sorted(done, key=lambda f: running[f]):
+                key = running.pop(future)
+                SCHEDULER_TASKS_IN_FLIGHT.dec()
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"任务 {key} 执行出错: {str(e)}")
+                    result = None
+                complete(key, result)
+
+        return sorted(waiting)
+
@@ -0,0 +1,68 @@
+import threading
+import time
+from typing import List, Optional
+
+
+class DeadlineExceeded(Exception):
+    """请求的时间预算已用尽"""
+
+
+class Deadline:
+    """
+    单个请求的截止时间，沿 解析 -> 图查询 -> 答案整合 逐级传递，各阶段以剩余时间作为超时；
+    同时记录因时间不足而降级的阶段，随响应一起返回。budget为None表示不限时
+    """
+
+    def __init__(self, budget: Optional[float] = None):
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget if budget is not None else None
+        self._degraded: List[str] = []
+        self._lock = threading.Lock()
+
+    def remaining(self) -> Optional[float]:
+        """剩余秒数（不小于0），不限时时返回None"""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self, margin: float = 0.0) -> bool:
+        """剩余时间不超过margin秒时视为已到期"""
+        remaining = self.remaining()
+        return remaining is not None and remaining <= margin
+
+    def timeout(self, cap: Optional[float] = None) -> Optional[float]:
+        """
+        本阶段可用的超时时间：剩余时间，不超过cap
+
+        Returns:
+            float: 超时秒数，不限时且没有上限时返回None
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return cap
+        return min(remaining, cap) if cap is not None else remaining
+
+    def reserve(self, seconds: float) -> "Deadline":
+        """
+        为后续阶段预留seconds秒，返回提前到期的子截止时间；子截止时间与本对象共用降级记录
+        """
+        child = Deadline()
+        child.budget = self.budget
+        child.expires_at = self.expires_at - seconds if self.expires_at is not None else None
+        child._degraded = self._degraded
+        child._lock = self._lock
+        return child
+
+    def check(self):
+        if self.expired():
+            raise DeadlineExceeded(f"超过请求时间预算 {self.budget} 秒")
+
+    def degrade(self, stage: str):
+        """记录一个降级阶段"""
+        with self._lock:
+            if stage not in self._degraded:
+                self._degraded.append(stage)
+
+    @property
+    def degraded_stages(self) -> List[str]:
+        return list(self._degraded)
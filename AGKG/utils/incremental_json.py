@@ -0,0 +1,87 @@
+import json
+import logging
+from typing import Any, Dict, List
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('incremental_json')
+
+
+class ArrayItemParser:
+    """
+    增量解析流式输出的JSON文本，顶层对象中指定键对应的数组每出现一个完整元素对象就立即产出
+
+    只跟踪字符串、转义和括号嵌套状态，不做完整语法校验；元素对象闭合后才用 json.loads 解析，
+    解析失败的元素跳过，最终结果仍以完整文本的解析为准。模型输出前后的说明文字和代码块标记会被忽略
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self._buffer = []
+        self._position = 0
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_string = None
+        self._array_depth = None
+        self._item_start = None
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """
+        追加一段文本
+
+        Returns:
+            list: 本段文本中新完成的数组元素
+        """
+        items = []
+        for char in text:
+            self._buffer.append(char)
+            self._consume(char, items)
+            self._position += 1
+        return items
+
+    def _consume(self, char: str, items: List[Dict[str, Any]]):
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif char == '\\':
+                self._escape = True
+            elif char == '"':
+                self._in_string = False
+                self._last_string = ''.join(self._buffer[self._string_start + 1:self._position])
+            return
+
+        if char == '"':
+            # 第一个 { 之前的引号属于说明文字
+            if self._stack:
+                self._in_string = True
+                self._string_start = self._position
+        elif char in '{[':
+            if char == '[' and self._array_depth is None and self._stack == ['{'] \
+                    and self._last_string == self.key:
+                self._array_depth = len(self._stack) + 1
+            self._stack.append(char)
+            if char == '{' and self._array_depth is not None and len(self._stack) == self._array_depth + 1:
+                self._item_start = self._position
+        elif char in '}]':
+            if not self._stack:
+                return
+            self._stack.pop()
+            if self._array_depth is None:
+                return
+            if char == '}' and self._item_start is not None and len(self._stack) == self._array_depth:
+                raw = ''.join(self._buffer[self._item_start:self._position + 1])
+                self._item_start = None
+                try:
+                    items.append(json.loads(raw))
+                except ValueError:
+                    logger.warning(f"跳过无法解析的数组元素: {raw[:100]}")
+            elif char == ']' and len(self._stack) < self._array_depth:
+                # 目标数组已结束，之后的同名键不再处理
+                self._array_depth = -1
+
+    @property
+    def text(self) -> str:
+        """目前为止收到的完整文本"""
+        return ''.join(self._buffer)
@@ -0,0 +1,164 @@
+import bisect
+import threading
+from typing import Dict, Any, Optional, Sequence
+
+# 直方图默认分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Counter:
+    """单调递增计数器"""
+
+    def __init__(self, name: str, description: str = ""):
+        self.name = name
+        self.description = description
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self):
+        return self._value
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"type": "counter", "value": self._value}
+
+
+class Gauge:
+    """可增可减的瞬时值"""
+
+    def __init__(self, name: str, description: str = ""):
+        self.name = name
+        self.description = description
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def set(self, value: float):
+        with self._lock:
+            self._value = value
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1):
+        with self._lock:
+            self._value -= amount
+
+    @property
+    def value(self):
+        return self._value
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"type": "gauge", "value": self._value}
+
+
+class Histogram:
+    """固定分桶直方图，记录观测次数、总和，并按分桶估算分位数"""
+
+    def __init__(self, name: str, description: str = "", buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """取包含第q分位观测值的分桶上界，超出最大分桶时返回最大分桶上界"""
+        if not self._count:
+            return None
+        target = q * self._count
+        cumulative = 0
+        for index, count in enumerate(self._counts):
+            cumulative += count
+            if cumulative >= target:
+                return self.buckets[min(index, len(self.buckets) - 1)]
+        return self.buckets[-1]
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets, self._counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        buckets["+Inf"] = self._count
+        return {
+            "type": "histogram",
+            "count": self._count,
+            "sum": round(self._sum, 6),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": buckets,
+        }
+
+
+class MetricsRegistry:
+    """进程内指标注册表，同名指标只创建一次"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, *args, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"指标 {name} 已注册为 {type(metric).__name__}")
+            return metric
+
+    def counter(self, name: str, description: str = "") -> Counter:
+        return self._get_or_create(Counter, name, description)
+
+    def gauge(self, name: str, description: str = "") -> Gauge:
+        return self._get_or_create(Gauge, name, description)
+
+    def histogram(self, name: str, description: str = "", buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, description, buckets)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+    def render_text(self) -> str:
+        """以Prometheus文本格式导出全部指标"""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            if metric.description:
+                lines.append(f"# HELP {metric.name} {metric.description}")
+            if isinstance(metric, Histogram):
+                lines.append(f"# TYPE {metric.name} histogram")
+                snapshot = metric.snapshot()
+                for bound, count in snapshot["buckets"].items():
+                    lines.append(f'{metric.name}_bucket{{le="{bound}"}} {count}')
+                lines.append(f"{metric.name}_sum {snapshot['sum']}")
+                lines.append(f"{metric.name}_count {snapshot['count']}")
+            else:
+                lines.append(f"# TYPE {metric.name} {metric.snapshot()['type']}")
+                lines.append(f"{metric.name} {metric.value}")
+        return "\n".join(lines) + "\n"
+
+
+# 全局指标注册表
+registry = MetricsRegistry()
+counter = registry.counter
+gauge = registry.gauge
+histogram = registry.histogram
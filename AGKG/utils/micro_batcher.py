@@ -0,0 +1,83 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, List, Optional
+
+from AGKG.utils.metrics import histogram
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('micro_batcher')
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+class MicroBatcher:
+    """
+    微批处理：收集window秒内到达的请求（最多max_size个）合并为一批交给handler，再把结果分发回各请求
+
+    第一个请求到达时开始计时，窗口结束或凑满max_size时立即发出；批次在线程池中执行，
+    上一批执行期间仍可继续收集下一批。等待超时的请求会被取消，不再计入尚未发出的批次
+    """
+
+    def __init__(self, name: str, handler: Callable[[List[Any]], List[Any]], window: float, max_size: int,
+                 max_workers: int = 4):
+        self.name = name
+        self.handler = handler
+        self.window = window
+        self.max_size = max(1, max_size)
+        self._queue = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f'{name}-batch')
+        self._batch_size = histogram(f"{name}_batch_size", f"{name} 每批请求数", BATCH_SIZE_BUCKETS)
+        self._thread = threading.Thread(target=self._collect_loop, name=f'{name}-collector', daemon=True)
+        self._thread.start()
+
+    def submit(self, item: Any, timeout: Optional[float] = None) -> Any:
+        """
+        提交一个请求并等待所在批次的结果
+
+        Raises:
+            concurrent.futures.TimeoutError: 超过timeout秒仍未得到结果
+            Exception: handler抛出的异常
+        """
+        future = Future()
+        self._queue.put((item, future))
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    def _collect_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            closes_at = time.monotonic() + self.window
+            while len(batch) < self.max_size:
+                remaining = closes_at - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._executor.submit(self._flush, batch)
+
+    def _flush(self, batch):
+        # 跳过等待超时、已取消的请求
+        batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        self._batch_size.observe(len(batch))
+        try:
+            results = self.handler([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"{self.name} 批处理返回{len(results)}个结果，期望{len(batch)}个")
+        except Exception as e:
+            logger.error(f"{self.name} 批处理出错: {str(e)}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
@@ -0,0 +1,278 @@
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Optional
+
+from AGKG.utils.deadline import Deadline, DeadlineExceeded
+from AGKG.utils.metrics import counter, gauge, histogram
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('resilience')
+
+# 大模型调用的耗时分桶（秒）
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 8.0, 13.0, 20.0, 30.0, 60.0)
+
+# 可重试的HTTP状态码：超时、限流和服务端错误
+RETRYABLE_STATUS = frozenset((408, 429, 500, 502, 503, 504))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+_STATE_VALUES = {CLOSED: 0, OPEN: 1, HALF_OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态，调用被直接拒绝"""
+
+
+def is_retryable(error: Exception) -> bool:
+    """超时、连接错误、限流和5xx可以重试；参数错误、鉴权失败等4xx重试也不会成功"""
+    if isinstance(error, (DeadlineExceeded, CircuitOpenError)):
+        return False
+    status = getattr(error, "status_code", None)
+    if status is None:
+        response = getattr(error, "response", None)
+        status = getattr(response, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    name = type(error).__name__
+    return "Timeout" in name or "Connection" in name
+
+
+class CircuitBreaker:
+    """
+    基于滑动窗口的熔断器
+
+    closed: 正常放行，记录最近window次调用；达到min_calls后错误率或慢调用率超过阈值时打开
+    open: 直接拒绝，open_seconds后进入half_open
+    half_open: 只放行half_open_calls个探测调用，全部成功则关闭，任一失败则重新打开
+    """
+
+    def __init__(self, name: str, failure_rate: float = 0.5, slow_call_seconds: float = 20.0,
+                 slow_call_rate: float = 0.8, window: int = 20, min_calls: int = 10,
+                 open_seconds: float = 30.0, half_open_calls: int = 1):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.state = CLOSED
+        self._calls = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+        self._state_gauge = gauge(f"{name}_circuit_state", f"{name} 熔断器状态（0关闭，1打开，2半开）")
+        self._rejected = counter(f"{name}_circuit_rejected_total", f"{name} 熔断器拒绝的调用数")
+
+    def _transition(self, state: str):
+        if state != self.state:
+            logger.warning(f"熔断器 {self.name}: {self.state} -> {state}")
+        self.state = state
+        self._state_gauge.set(_STATE_VALUES[state])
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        elif state == HALF_OPEN:
+            self._probes = 0
+            self._probe_successes = 0
+        elif state == CLOSED:
+            self._calls.clear()
+
+    def allow(self) -> bool:
+        """是否放行本次调用，拒绝时计数"""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                self._transition(HALF_OPEN)
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and self._probes < self.half_open_calls:
+                self._probes += 1
+                return True
+        self._rejected.inc()
+        return False
+
+    def release(self):
+        """放弃一次已放行的调用（结果不反映上游健康状况，如参数错误）：半开状态下归还探测名额"""
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def record(self, success: bool, duration: float):
+        """记录一次调用结果，慢调用即使成功也计入慢调用率"""
+        slow = duration >= self.slow_call_seconds
+        with self._lock:
+            if self.state == HALF_OPEN:
+                if not success or slow:
+                    self._transition(OPEN)
+                else:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.half_open_calls:
+                        self._transition(CLOSED)
+                return
+            if self.state != CLOSED:
+                return
+
+            self._calls.append((success, slow))
+            if len(self._calls) < self.min_calls:
+                return
+            failures = sum(1 for ok, _ in self._calls if not ok)
+            slow_calls = sum(1 for _, is_slow in self._calls if is_slow)
+            if failures / len(self._calls) >= self.failure_rate or \
+                    slow_calls / len(self._calls) >= self.slow_call_rate:
+                self._transition(OPEN)
+
+
+class RetryBudget:
+    """
+    重试预算：每次调用存入ratio个令牌，每次重试取出一个（初始有min_retries个，最多积累max_tokens个），
+    上游大面积故障时重试量被限制在正常流量的ratio倍左右，不会放大故障
+    """
+
+    def __init__(self, name: str, ratio: float = 0.2, min_retries: int = 3, max_tokens: float = 100.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = float(min_retries)
+        self._lock = threading.Lock()
+        self._exhausted = counter(f"{name}_retry_budget_exhausted_total", f"{name} 因重试预算耗尽而放弃的重试数")
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+        self._exhausted.inc()
+        return False
+
+
+class ResilientCaller:
+    """
+    为外部调用组合熔断、有界重试（指数退避加抖动）与对冲请求，并按方法记录耗时直方图
+
+    对冲：历史样本足够时原请求在独立线程中执行，超过该方法历史耗时的hedge_quantile分位仍未返回时，
+    在线程池中再发出一个相同的请求，两者中先成功的结果被采用，另一个的结果丢弃；两者都失败时才进入退避重试。
+    线程池只承载对冲请求，不限制原请求的并发。对冲只用于幂等、可丢弃结果的调用（如temperature接近0的解析和整合）
+    """
+
+    def __init__(self, name: str, breaker: CircuitBreaker, budget: RetryBudget, max_attempts: int = 3,
+                 backoff: float = 0.2, max_backoff: float = 2.0, hedge: bool = False,
+                 hedge_quantile: float = 0.95, hedge_min_samples: int = 20, hedge_workers: int = 8):
+        self.name = name
+        self.breaker = breaker
+        self.budget = budget
+        self.max_attempts = max(1, max_attempts)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self._executor = ThreadPoolExecutor(max_workers=hedge_workers, thread_name_prefix=f'{name}-hedge') \
+            if hedge else None
+        self._retries = counter(f"{name}_retries_total", f"{name} 重试次数")
+        self._hedges = counter(f"{name}_hedged_requests_total", f"{name} 发出的对冲请求数")
+        self._hedge_wins = counter(f"{name}_hedge_wins_total", f"{name} 对冲请求先于原请求成功返回的次数")
+
+    def latency(self, method: str):
+        return histogram(f"{self.name}_{method}_seconds", f"{self.name}.{method} 调用耗时", LATENCY_BUCKETS)
+
+    def call(self, method: str, fn: Callable[[], Any], deadline: Optional[Deadline] = None,
+             hedge: bool = True) -> Any:
+        """
+        执行调用
+
+        Args:
+            method: 方法名，用于耗时直方图命名
+            fn: 无参调用，每次尝试都会重新执行（可在其中按剩余时间计算超时）
+            deadline: 请求截止时间，退避等待不会超过剩余时间
+            hedge: 本次调用是否允许对冲（流式调用应传False）
+
+        Raises:
+            CircuitOpenError: 熔断器打开
+            Exception: 最后一次尝试的错误
+        """
+        self.budget.deposit()
+        latency = self.latency(method)
+        attempt = 0
+        while True:
+            attempt += 1
+            # 先检查截止时间再申请放行，避免占用半开探测名额后直接放弃
+            if deadline is not None:
+                deadline.check()
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"{self.name} 熔断中，拒绝调用 {method}")
+
+            started = time.monotonic()
+            error = None
+            # True/False 计入熔断；None 表示结果不反映上游健康状况（4xx等调用方错误），只归还探测名额
+            outcome = None
+            try:
+                if hedge and self._executor is not None:
+                    result = self._hedged(fn, latency, deadline)
+                else:
+                    result = fn()
+                outcome = True
+            except Exception as e:
+                error = e
+                outcome = False if is_retryable(e) else None
+            finally:
+                duration = time.monotonic() - started
+                latency.observe(duration)
+                if outcome is None:
+                    self.breaker.release()
+                else:
+                    self.breaker.record(outcome, duration)
+
+            if error is None:
+                return result
+            if outcome is None or attempt >= self.max_attempts or not self.budget.withdraw():
+                raise error
+            delay = min(self.max_backoff, self.backoff * (2 ** (attempt - 1))) * random.uniform(0.5, 1.0)
+            if deadline is not None and deadline.expired(delay):
+                raise error
+            logger.warning(f"{self.name}.{method} 第{attempt}次调用失败，{delay:.2f}秒后重试: {error}")
+            self._retries.inc()
+            time.sleep(delay)
+
+    def _hedged(self, fn: Callable[[], Any], latency, deadline: Optional[Deadline]):
+        """
+        原请求在独立线程中执行，超过历史耗时分位仍未返回时向线程池发出对冲请求，返回最先成功的结果；
+        两者都失败时抛出原请求的错误。fn需自行按deadline的剩余时间限定超时
+        """
+        delay = latency.quantile(self.hedge_quantile) if latency.snapshot()["count"] >= self.hedge_min_samples \
+            else None
+        if delay is None:
+            return fn()
+
+        primary = Future()
+
+        def run_primary():
+            try:
+                primary.set_result(fn())
+            except BaseException as e:
+                primary.set_exception(e)
+
+        threading.Thread(target=run_primary, name=f"{self.name}-primary", daemon=True).start()
+        if wait([primary], timeout=delay).done or (deadline is not None and deadline.expired()):
+            return primary.result()
+
+        hedge = self._executor.submit(fn)
+        self._hedges.inc()
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            # 同时完成时优先使用原请求
+            for future in (primary, hedge):
+                if future in done and future.exception() is None:
+                    if future is hedge:
+                        self._hedge_wins.inc()
+                    return future.result()
+        return primary.result()
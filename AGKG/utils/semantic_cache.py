@@ -0,0 +1,212 @@
+import copy
+import logging
+import re
+import threading
+import unicodedata
+import zlib
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from AGKG.utils.metrics import counter, gauge
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('semantic_cache')
+
+# 疑问词与语气词不区分问题含义，向量化前去掉，使"小麦有什么病"与"小麦病害有哪些"更接近
+_FILLER_PATTERN = re.compile(r"有什么|有哪些|是什么|是哪些|是谁|什么|哪些|怎么|如何|请问|一下|吗|呢|呀|啊|的")
+_PUNCTUATION_PATTERN = re.compile(r"[\s\W_]+")
+
+
+def normalize_text(text: str) -> str:
+    """向量化与实体校验共用的规范化：全角转半角、小写、去掉空白和标点"""
+    return _PUNCTUATION_PATTERN.sub("", unicodedata.normalize("NFKC", text or "").lower())
+
+
+class HashingVectorizer:
+    """
+    离线的字符n-gram哈希向量化：不需要词表和模型文件，
+    每个n-gram经crc32哈希到固定维度并带符号累加，结果做L2归一化，内积即余弦相似度
+    """
+
+    def __init__(self, dim: int = 4096, ngram_range: Tuple[int, int] = (1, 3)):
+        self.dim = dim
+        self.ngram_range = ngram_range
+
+    def _ngrams(self, text: str) -> Iterable[str]:
+        low, high = self.ngram_range
+        for n in range(low, high + 1):
+            for i in range(len(text) - n + 1):
+                yield text[i:i + n]
+
+    def transform(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            stripped = _FILLER_PATTERN.sub("", normalize_text(text)) or normalize_text(text)
+            for gram in self._ngrams(stripped):
+                hashed = zlib.crc32(gram.encode("utf-8"))
+                # 用最高位作为符号，降低哈希冲突带来的偏差
+                vectors[row, hashed % self.dim] += 1.0 if hashed & 0x80000000 else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+class VectorStore:
+    """
+    基于NumPy矩阵的向量库：向量按行保存在预分配的矩阵中，容量满后循环覆盖最早写入的条目；
+    查询时一次矩阵乘法完成批量余弦相似度计算
+    """
+
+    def __init__(self, dim: int, capacity: int):
+        self.dim = dim
+        self.capacity = capacity
+        self._matrix = np.zeros((capacity, dim), dtype=np.float32)
+        self._payloads: List[Any] = [None] * capacity
+        self._count = 0
+        self._cursor = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def add(self, vector: np.ndarray, payload: Any):
+        with self._lock:
+            self._matrix[self._cursor] = vector
+            self._payloads[self._cursor] = payload
+            self._cursor = (self._cursor + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+
+    def search(self, queries: np.ndarray, k: int = 1) -> List[List[Tuple[float, Any]]]:
+        """
+        批量查询每个向量最相似的k个条目
+
+        Args:
+            queries: (n, dim) 已归一化的查询向量
+
+        Returns:
+            list: 每个查询对应的 [(相似度, payload)]，按相似度降序
+        """
+        with self._lock:
+            count = self._count
+            if not count:
+                return [[] for _ in range(len(queries))]
+            scores = queries @ self._matrix[:count].T
+            payloads = self._payloads[:count]
+        k = min(k, count)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, indices in enumerate(top):
+            ordered = sorted(indices, key=lambda index: -scores[row, index])
+            results.append([(float(scores[row, index]), payloads[index]) for index in ordered])
+        return results
+
+
+class SemanticCache:
+    """
+    近似问题缓存：以向量相似度查找改写过的相同问题，
+    命中后还需通过校验函数（如实体和意图都与缓存问题一致）才会复用
+    """
+
+    def __init__(self, name: str, threshold: float = 0.75, capacity: int = 5000, dim: int = 4096,
+                 verify: Optional[Callable[[str, str, Any], bool]] = None, candidates: int = 3):
+        """
+        Args:
+            name: 缓存名称，用于指标命名
+            threshold: 余弦相似度阈值
+            capacity: 最多保存的问题数
+            dim: 哈希向量维度
+            verify: 校验函数 (新问题, 缓存问题, 缓存值) -> bool
+            candidates: 每次查询参与校验的候选数量
+        """
+        self.threshold = threshold
+        self.candidates = candidates
+        self.verify = verify
+        self.vectorizer = HashingVectorizer(dim)
+        self.store = VectorStore(dim, capacity)
+        self._hits = counter(f"{name}_hits_total", f"{name} 命中次数")
+        self._misses = counter(f"{name}_misses_total", f"{name} 未命中次数")
+        self._rejected = counter(f"{name}_rejected_total", f"{name} 相似度达标但未通过校验的次数")
+        self._size = gauge(f"{name}_entries", f"{name} 条目数")
+
+    def get(self, question: str) -> Optional[Any]:
+        return self.get_many([question])[0]
+
+    def get_many(self, questions: Sequence[str]) -> List[Optional[Any]]:
+        """批量查询，返回与输入一一对应的缓存值（深拷贝），未命中为None"""
+        if not questions:
+            return []
+        matches = self.store.search(self.vectorizer.transform(questions), self.candidates)
+        results = []
+        for question, candidates in zip(questions, matches):
+            value = None
+            for score, (cached_question, payload) in candidates:
+                if score < self.threshold:
+                    break
+                if self.verify is None or self.verify(question, cached_question, payload):
+                    logger.info(f"近似问题命中缓存: '{question[:50]}' ≈ '{cached_question[:50]}' ({score:.3f})")
+                    value = copy.deepcopy(payload)
+                    break
+                self._rejected.inc()
+            (self._hits if value is not None else self._misses).inc()
+            results.append(value)
+        return results
+
+    def set(self, question: str, value: Any):
+        self.store.add(self.vectorizer.transform([question])[0], (question, copy.deepcopy(value)))
+        self._size.set(len(self.store))
+
+
+def entities_present(question: str, parse: Dict[str, Any]) -> bool:
+    """校验缓存解析结果中的全部核心实体都出现在新问题中"""
+    entities = (parse.get("analysis") or {}).get("core_entities") or []
+    if not entities:
+        return False
+    text = normalize_text(question)
+    return all(normalize_text(str(entity)) in text for entity in entities)
+
+
+def intent_verifier(intent_keywords: Dict[str, List[str]]) -> Callable[[str, str, Any], bool]:
+    """
+    构造解析结果的校验函数：核心实体都出现在新问题中，且去掉实体后两个问题提及的意图完全相同，
+    并都在缓存解析的关系中；都没有提及意图时，去掉实体和疑问词后的剩余文本必须相同。
+    实体名称较长时 "X的作者是谁" 与 "X的期刊是什么" 的相似度也会超过阈值，只校验实体会误用解析结果
+
+    Args:
+        intent_keywords: {意图: 触发关键词列表}
+    """
+    keywords = sorted(((normalize_text(keyword), intent)
+                       for intent, words in intent_keywords.items() for keyword in [intent, *words]),
+                      key=lambda item: -len(item[0]))
+
+    def strip_entities(text: str, entities: List[str]) -> str:
+        text = normalize_text(text)
+        for entity in sorted(entities, key=len, reverse=True):
+            text = text.replace(entity, "")
+        return text
+
+    def mentioned_intents(text: str) -> set:
+        intents = set()
+        for keyword, intent in keywords:
+            if keyword and keyword in text:
+                intents.add(intent)
+                text = text.replace(keyword, "")
+        return intents
+
+    def verify(question: str, cached_question: str, parse: Dict[str, Any]) -> bool:
+        if not entities_present(question, parse):
+            return False
+        entities = [normalize_text(str(entity)) for entity in (parse.get("analysis") or {}).get("core_entities")]
+        residual, cached_residual = strip_entities(question, entities), strip_entities(cached_question, entities)
+        intents = mentioned_intents(residual)
+        if intents != mentioned_intents(cached_residual):
+            return False
+        if intents:
+            relations = {(parse.get("analysis") or {}).get("query_intent")}
+            relations.update(triplet.get("relation") for triplet in parse.get("knowledge_graph") or []
+                             if isinstance(triplet, dict))
+            return intents <= relations
+        return _FILLER_PATTERN.sub("", residual) == _FILLER_PATTERN.sub("", cached_residual)
+
+    return verify
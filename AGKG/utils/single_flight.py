@@ -0,0 +1,66 @@
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from AGKG.utils.metrics import counter, gauge
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('single_flight')
+
+
+class SingleFlight:
+    """
+    合并相同键的并发调用：同一时刻每个键只有一个调用真正执行，
+    执行期间到达的相同调用等待其完成并共享结果（或异常），执行结束后键即释放，不缓存结果
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self._executed = counter(f"{name}_executed_total", f"{name} 实际执行的调用数")
+        self._coalesced = counter(f"{name}_coalesced_total", f"{name} 被合并、共享结果的调用数")
+        self._in_flight = gauge(f"{name}_in_flight", f"{name} 正在执行的调用数")
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Tuple[Any, bool]:
+        """
+        执行或加入键为key的调用
+
+        Args:
+            key: 调用键
+            fn: 无参调用，只在没有相同键的调用正在执行时执行
+            timeout: 等待正在执行的调用的最长秒数，None为一直等待
+
+        Returns:
+            tuple: (结果, 是否共享了其他调用的结果)
+
+        Raises:
+            concurrent.futures.TimeoutError: 等待超时，正在执行的调用不受影响
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = Future()
+                self._calls[key] = call
+
+        if not leader:
+            self._coalesced.inc()
+            return call.result(timeout=timeout), True
+
+        self._executed.inc()
+        self._in_flight.inc()
+        try:
+            result = fn()
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            self._in_flight.dec()
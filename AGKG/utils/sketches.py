@@ -0,0 +1,101 @@
+import hashlib
+import heapq
+import math
+import random
+from typing import Any, List, Optional, Tuple
+
+
+def _hash64(value: Any) -> int:
+    """稳定的64位哈希（不受PYTHONHASHSEED影响，多进程结果一致）"""
+    return int.from_bytes(hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class ReservoirSample:
+    """
+    蓄水池抽样（Algorithm R）：在只遍历一次、总数未知的数据流中保留等概率的固定大小样本
+    """
+
+    def __init__(self, capacity: int, seed: Optional[int] = None):
+        self.capacity = capacity
+        self.seen = 0
+        self.items: List[Any] = []
+        self._random = random.Random(seed)
+
+    def add(self, item: Any):
+        self.seen += 1
+        if len(self.items) < self.capacity:
+            self.items.append(item)
+            return
+        index = self._random.randrange(self.seen)
+        if index < self.capacity:
+            self.items[index] = item
+
+    def quantile(self, q: float) -> Optional[float]:
+        """样本的q分位数（最近秩）"""
+        if not self.items:
+            return None
+        ordered = sorted(self.items)
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+class TopK:
+    """用大小为k的最小堆维护数据流中得分最高的k项"""
+
+    def __init__(self, k: int):
+        self.k = k
+        self._heap: List[Tuple[float, int, Any]] = []
+        self._sequence = 0
+
+    def add(self, score: float, item: Any):
+        # 序号用于得分相同时避免比较item本身
+        self._sequence += 1
+        entry = (score, -self._sequence, item)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif score > self._heap[0][0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def items(self) -> List[Tuple[float, Any]]:
+        """按得分降序返回 (score, item)，得分相同时先出现的在前"""
+        return [(score, item) for score, _, item in sorted(self._heap, reverse=True)]
+
+
+class HyperLogLog:
+    """
+    HyperLogLog基数估计：以 2^precision 个寄存器估计数据流中不同元素的个数，
+    precision=12 时占用4096字节，标准误差约 1.04/sqrt(4096) ≈ 1.6%
+    """
+
+    def __init__(self, precision: int = 12):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision 必须在4到16之间")
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(self.size)
+
+    def add(self, value: Any):
+        hashed = _hash64(value)
+        index = hashed >> (64 - self.precision)
+        remaining = hashed & ((1 << (64 - self.precision)) - 1)
+        # 剩余位中第一个1出现的位置
+        rank = (64 - self.precision) - remaining.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog"):
+        if other.precision != self.precision:
+            raise ValueError("只能合并精度相同的HyperLogLog")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def count(self) -> int:
+        m = self.size
+        if m >= 128:
+            alpha = 0.7213 / (1 + 1.079 / m)
+        else:
+            alpha = {16: 0.673, 32: 0.697, 64: 0.709}[m]
+        estimate = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        # 小基数时使用线性计数修正
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
@@ -0,0 +1,7 @@
+import json
+from typing import Any, Dict
+
+
+def format_event(event: str, data: Dict[str, Any]) -> str:
+    """编码为一条SSE消息"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
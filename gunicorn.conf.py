@@ -0,0 +1,15 @@
+# gunicorn 部署配置：gunicorn -c gunicorn.conf.py
+#
+# 使用gevent协程worker：统计推送（/api/knowledge_graph/statistics/stream）等SSE长连接空闲时只是
+# 阻塞在队列上的greenlet，不会为每个连接占用一个线程；gunicorn在加载应用前完成monkey patch，
+# 标准库的threading/queue/socket均为协程版本
+import os
+
+wsgi_app = "AGKG.app:app"
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+worker_class = "gevent"
+workers = int(os.getenv("GUNICORN_WORKERS", "2"))
+# 每个worker可同时保持的连接数（含空闲的SSE连接）
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "1000"))
+# SSE连接由心跳保持活跃，超时只针对卡死的worker
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
@@ -0,0 +1,38 @@
+from AGKG.utils.aho_corasick import AhoCorasick
+
+
+def test_search_finds_overlapping_words():
+    automaton = AhoCorasick({"稻瘟病": 1, "瘟病": 2, "水稻": 3})
+    assert [(start, end, word) for start, end, word, _ in automaton.search("水稻稻瘟病")] == [
+        (0, 2, "水稻"), (2, 5, "稻瘟病"), (3, 5, "瘟病"),
+    ]
+
+
+def test_longest_matches_prefers_earlier_then_longer():
+    automaton = AhoCorasick({"小麦": "a", "小麦锈病": "b", "锈病": "c"})
+    assert [word for _, _, word, _ in automaton.longest_matches("小麦锈病怎么防治")] == ["小麦锈病"]
+
+
+def test_incremental_update_and_compile():
+    automaton = AhoCorasick({"蚜虫": 1, "红蜘蛛": 2})
+    automaton.update(added={"白粉虱": 3}, removed=["蚜虫"])
+    automaton.compile()
+    assert "蚜虫" not in automaton and len(automaton) == 2
+    assert [word for _, _, word, _ in automaton.search("蚜虫和白粉虱")] == ["白粉虱"]
+
+
+def test_rebuilds_after_many_removals():
+    automaton = AhoCorasick({f"词{i}": i for i in range(10)})
+    automaton.update(removed=[f"词{i}" for i in range(8)])
+    assert sorted(automaton.words()) == ["词8", "词9"]
+    assert [payload for _, _, _, payload in automaton.search("词9")] == [9]
+
+
+def test_copy_is_independent_of_the_original():
+    automaton = AhoCorasick({"蚜虫": 1})
+    automaton.compile()
+    clone = automaton.copy()
+    clone.update(added={"白粉虱": 2}, removed=["蚜虫"])
+    clone.compile()
+    assert [word for _, _, word, _ in automaton.search("蚜虫和白粉虱")] == ["蚜虫"]
+    assert [word for _, _, word, _ in clone.search("蚜虫和白粉虱")] == ["白粉虱"]
@@ -0,0 +1,38 @@
+from AGKG.services.answer_synthesizer import OVER_THRESHOLD, TEMPLATE_ANSWERS, AnswerSynthesizer
+
+
+def result(*rows):
+    return {"result": [{"head": head, "relation": relation, "tail": tail} for head, relation, tail in rows]}
+
+
+def test_group_merges_heads_with_identical_results_and_dedupes_tails():
+    kg_results = [
+        result(("小麦", "病害", "锈病"), ("小麦", "病害", "锈病"), ("小麦", "病害", "白粉病")),
+        result(("大麦", "病害", "锈病"), ("大麦", "病害", "白粉病")),
+    ]
+    assert AnswerSynthesizer.group(kg_results) == [
+        {"heads": ["小麦", "大麦"], "relation": "病害", "tails": ["锈病", "白粉病"]},
+    ]
+
+
+def test_synthesize_uses_relation_templates():
+    synthesizer = AnswerSynthesizer(complexity_threshold=3)
+    before = TEMPLATE_ANSWERS.value
+    answer = synthesizer.synthesize("实体推理", [result(("小麦", "病害", "锈病"), ("小麦", "别称", "麦子"))], [])
+    assert answer == "小麦的常见病害有锈病。\n小麦又称麦子。"
+    assert TEMPLATE_ANSWERS.value == before + 1
+
+
+def test_synthesize_returns_none_over_threshold():
+    synthesizer = AnswerSynthesizer(complexity_threshold=1)
+    before = OVER_THRESHOLD.value
+    kg_results = [result(("小麦", "病害", "锈病"), ("小麦", "虫害", "蚜虫"))]
+    assert synthesizer.synthesize("实体推理", kg_results, []) is None
+    assert OVER_THRESHOLD.value == before + 1
+
+
+def test_long_tails_are_listed_line_by_line():
+    long_text = "叶片出现黄色条状孢子堆，后期表皮破裂散出大量锈色粉末，严重时叶片枯死"
+    answer = AnswerSynthesizer().synthesize("实体推理", [result(("锈病", "症状", long_text),
+                                                                ("锈病", "症状", long_text + "。"))], [])
+    assert answer.startswith("锈病的主要症状：\n1. ")
@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+
+from AGKG.client.async_neo4j_client import AsyncNeo4jClient
+from AGKG.utils.deadline import Deadline
+
+
+class FakeResult:
+    def __init__(self, records):
+        self.records = records
+
+    async def single(self):
+        return self.records[0] if self.records else None
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for record in self.records:
+            yield record
+
+
+class FakeTx:
+    def __init__(self, driver):
+        self.driver = driver
+
+    async def run(self, query, **params):
+        self.driver.active += 1
+        self.driver.peak = max(self.driver.peak, self.driver.active)
+        # 让出事件循环，使并发的查询有机会交错执行
+        await asyncio.sleep(0.01)
+        self.driver.active -= 1
+        return FakeResult(self.driver.handler(query, params))
+
+
+class FakeSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute_read(self, work):
+        self.driver.timeouts.append(getattr(work, "timeout", None))
+        return await work(FakeTx(self.driver))
+
+
+class FakeDriver:
+    def __init__(self, handler):
+        self.handler = handler
+        self.timeouts = []
+        self.active = 0
+        self.peak = 0
+
+    def session(self, **config):
+        return FakeSession(self)
+
+
+class FakeSyncClient:
+    name_key_ready = True
+    fulltext_ready = True
+
+    def name_key_check_due(self):
+        return False
+
+    def fulltext_check_due(self):
+        return False
+
+
+def handler(query, params):
+    if "$rows" in query:
+        return [{"idx": 0, "head": "稻瘟病", "relation": "症状", "tail": "病斑"}]
+    if "db.index.fulltext.queryNodes" in query:
+        return [{"id": 1, "name": "稻瘟病", "category": "病害", "score": 2.0}]
+    if "db.labels()" in query:
+        return [{"labels": ["病害", "Entity"]}]
+    if "db.relationshipTypes()" in query:
+        return [{"types": ["症状"]}]
+    return [{"total_nodes": 3, "total_relations": 2, "label_0": 3, "type_0": 2}]
+
+
+@pytest.fixture
+def client():
+    # 绕过单例与驱动创建
+    client = object.__new__(AsyncNeo4jClient)
+    client.neo4j_client = FakeSyncClient()
+    client.replica = None
+    driver = FakeDriver(handler)
+    client._get_driver = lambda: driver
+    return client
+
+
+def test_gather_fans_out_queries_concurrently(client):
+    async def fan_out():
+        return await asyncio.gather(
+            client.query_kg_triplets_batch([{"head": "稻瘟病", "relation": "症状", "tail": "Q1"}],
+                                           Deadline(5)),
+            client.search_entities("稻瘟病"),
+            client.get_count_statistics())
+
+    batch, entities, counts = asyncio.run(fan_out())
+
+    assert batch == [{"triplet": {"head": "稻瘟病", "relation": "症状", "tail": "Q1"},
+                      "result": [{"head": "稻瘟病", "relation": "症状", "tail": "病斑"}]}]
+    assert entities == [{"id": 1, "name": "稻瘟病", "category": "病害", "score": 2.0}]
+    assert counts == {"total_nodes": 3, "total_relations": 2, "labels": {"病害": 3}, "relation_types": {"症状": 2}}
+    assert client._get_driver().peak > 1
+
+
+def test_remaining_deadline_becomes_transaction_timeout(client):
+    asyncio.run(client.query_kg_triplets_batch([{"head": "稻瘟病", "relation": "症状", "tail": ""}], Deadline(5)))
+    assert 4 < client._get_driver().timeouts[0] <= 5
+
+
+def test_expired_deadline_skips_the_query(client):
+    result = asyncio.run(client.query_kg_triplets_batch([{"head": "稻瘟病", "relation": "症状", "tail": ""}],
+                                                        Deadline(0)))
+    assert result == [{"triplet": {"head": "稻瘟病", "relation": "症状", "tail": ""}, "result": []}]
+    assert client._get_driver().timeouts == []
@@ -0,0 +1,30 @@
+import asyncio
+import threading
+
+import pytest
+
+from AGKG.utils.background_loop import BackgroundLoop
+
+
+def test_submitted_coroutines_share_one_loop_thread():
+    loop = BackgroundLoop("t_background_loop")
+    names = []
+
+    async def record():
+        await asyncio.sleep(0)
+        names.append(threading.current_thread().name)
+        return len(names)
+
+    futures = [loop.submit(record()) for _ in range(3)]
+    assert sorted(future.result(timeout=1) for future in futures) == [1, 2, 3]
+    assert names == ["t_background_loop"] * 3
+
+
+def test_exceptions_are_delivered_through_the_future():
+    loop = BackgroundLoop("t_background_loop_error")
+
+    async def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        loop.submit(fail()).result(timeout=1)
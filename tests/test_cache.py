@@ -0,0 +1,41 @@
+import time
+
+from AGKG.utils.cache import TTLCache
+
+
+def test_lru_eviction_and_defensive_copies():
+    cache = TTLCache("test_cache_lru", max_size=2)
+    cache.set("a", {"v": [1]})
+    cache.set("b", 2)
+    cache.get("a")["v"].append(99)
+    cache.set("c", 3)
+
+    assert cache.get("a") == {"v": [1]}
+    assert cache.get("b") is None
+    assert len(cache) == 2
+
+
+def test_entries_expire_after_ttl():
+    cache = TTLCache("test_cache_ttl", ttl=0.02)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    time.sleep(0.03)
+    assert cache.get("a", "missing") == "missing"
+
+
+def test_disk_layer_survives_a_new_instance(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    TTLCache("test_cache_disk", sqlite_path=path).set("问题", {"answer": "锈病"})
+
+    reopened = TTLCache("test_cache_disk", sqlite_path=path)
+    assert reopened.get("问题") == {"answer": "锈病"}
+    assert reopened.stats()["disk_hits"] >= 1
+
+
+def test_disk_layer_is_bounded(tmp_path):
+    cache = TTLCache("test_cache_disk_bound", max_size=1, sqlite_path=str(tmp_path / "c.sqlite3"), disk_max_size=3)
+    for index in range(6):
+        cache.set(f"k{index}", index)
+    count = cache._db.execute(f"SELECT COUNT(*) FROM {cache._table}").fetchone()[0]
+    assert count == 3
+    assert cache.get("k5") == 5
@@ -0,0 +1,64 @@
+from AGKG.client.cypher_builder import (build_batch_triplet_query, build_entity_neighbors_query,
+                                        build_entity_triplets_query, build_head_relation_query, build_triplet_query,
+                                        compile_dependency_chain, compile_subgraph_query, is_valid_relation)
+
+
+def test_keyed_queries_use_name_key_index():
+    assert "(h:Entity {name_key: $name_key})" in build_entity_triplets_query(True)
+    assert "(center:Entity {name_key: $name_key})" in build_entity_neighbors_query(True)
+    query = build_triplet_query("病害", "作物", True)
+    assert "(h:Entity:`作物` {name_key: $head_key})" in query
+    assert "(t:Entity {name_key: $tail_key})" in query
+
+
+def test_legacy_queries_match_on_name_expression():
+    queries = [
+        build_entity_triplets_query(False),
+        build_entity_neighbors_query(False),
+        build_head_relation_query("病害", None, False),
+        build_triplet_query("病害", None, False),
+        build_batch_triplet_query(("病害", "症状"), True, False),
+        compile_dependency_chain(("症状", "作者"), True, False),
+    ]
+    for query in queries:
+        assert ".name_key" not in query and "{name_key" not in query and ":Entity" not in query
+        assert "toLower(trim(COALESCE(" in query
+
+
+def test_legacy_head_relation_query_keeps_label_hint():
+    query = build_head_relation_query("病害", "作物", False)
+    assert "MATCH (h:`作物`)-[r:`病害`]->(t)" in query
+    assert "WHERE toLower(trim(COALESCE(h.name, h.title, ''))) = $head_key" in query
+
+
+def test_batch_query_has_one_branch_per_relation():
+    query = build_batch_triplet_query(("病害", "症状"), True, True)
+    assert query.count("UNION ALL") == 3
+    assert "row.relation = '病害'" in query and "row.relation = '症状'" in query
+
+
+def test_dependency_chain_binds_tail_on_last_hop_only():
+    query = compile_dependency_chain(("症状", "作者"), True, True)
+    assert query.count("$tail_key") == 1
+    assert "UNWIND frontier0 AS name" in query
+
+
+def test_is_valid_relation():
+    assert is_valid_relation("防治方法")
+    assert not is_valid_relation("DELETE")
+
+
+def test_subgraph_query_expands_one_bounded_hop_at_a_time():
+    query = compile_subgraph_query(3)
+    assert "*1.." not in query
+    assert query.count("WITH DISTINCT m LIMIT $neighbor_limit") == 3
+    assert "RETURN collect(m) AS hop3" in query
+    # 内部边按成员对匹配（Expand(Into)），不从成员展开全部关系后再过滤
+    assert "UNWIND members AS b" in query and "WHERE b IN members" not in query
+
+
+def test_subgraph_degree_form_follows_server_version():
+    # COUNT {} 子查询仅5.x支持，size() 模式表达式已在5.x移除；两者都读取度数存储
+    assert "degree: COUNT { (n)--() }" in compile_subgraph_query(1, True)
+    assert "degree: size((n)--())" in compile_subgraph_query(1, False)
+    assert "[(n)--() | 1]" not in compile_subgraph_query(1, True)
@@ -0,0 +1,70 @@
+import threading
+import time
+from concurrent.futures import Future
+
+from AGKG.utils.dag_scheduler import DagScheduler
+from AGKG.utils.deadline import Deadline
+
+
+def test_dependents_start_after_dependencies_finish():
+    scheduler = DagScheduler(max_workers=4, request_concurrency=4)
+    finished = []
+    results = {}
+
+    def start(key):
+        # 依赖的结果在start时已可用
+        inputs = [results[dep] for dep in {"c": ["a", "b"]}.get(key, [])]
+        return lambda: key + "".join(inputs)
+
+    def finish(key, result):
+        finished.append(key)
+        results[key] = result
+
+    skipped = scheduler.run({"a": [], "b": [], "c": ["a", "b"]}, start, finish)
+    assert skipped == []
+    assert finished[-1] == "c" and results["c"] == "cab"
+
+
+def test_request_concurrency_is_bounded():
+    scheduler = DagScheduler(max_workers=8, request_concurrency=2)
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def work():
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+
+    scheduler.run({key: [] for key in range(6)}, lambda key: work, lambda key, result: None)
+    assert peak[0] == 2
+
+
+def test_cycles_are_reported_and_failures_finish_with_none():
+    scheduler = DagScheduler(max_workers=2, request_concurrency=2)
+    finished = {}
+
+    def start(key):
+        if key == "none":
+            return None
+        if key == "future":
+            future = Future()
+            future.set_result("prefetched")
+            return future
+        return lambda: 1 / 0
+
+    skipped = scheduler.run({"x": ["y"], "y": ["x"], "fail": [], "none": [], "future": []},
+                            start, lambda key, result: finished.__setitem__(key, result))
+    assert skipped == ["x", "y"]
+    assert finished == {"fail": None, "none": None, "future": "prefetched"}
+
+
+def test_deadline_abandons_remaining_tasks():
+    scheduler = DagScheduler(max_workers=2, request_concurrency=1)
+    release = threading.Event()
+    skipped = scheduler.run({"slow": [], "next": ["slow"]}, lambda key: lambda: release.wait(1),
+                            lambda key, result: None, Deadline(0.05))
+    release.set()
+    assert skipped == ["next", "slow"]
@@ -0,0 +1,40 @@
+import time
+
+import pytest
+
+from AGKG.utils.deadline import Deadline, DeadlineExceeded
+
+
+def test_unbounded_deadline_never_expires():
+    deadline = Deadline()
+    assert deadline.remaining() is None
+    assert not deadline.expired(100)
+    assert deadline.timeout() is None
+    assert deadline.timeout(cap=5) == 5
+    deadline.check()
+
+
+def test_timeout_is_capped_by_remaining_time():
+    deadline = Deadline(10)
+    assert 9 < deadline.timeout() <= 10
+    assert deadline.timeout(cap=2) == 2
+    assert deadline.expired(margin=11)
+
+
+def test_check_raises_after_expiry():
+    deadline = Deadline(0.01)
+    time.sleep(0.02)
+    assert deadline.remaining() == 0.0
+    with pytest.raises(DeadlineExceeded):
+        deadline.check()
+
+
+def test_reserve_expires_earlier_and_shares_degraded_stages():
+    deadline = Deadline(10)
+    child = deadline.reserve(3)
+    assert 6 < child.remaining() <= 7
+    child.degrade("parse")
+    child.degrade("parse")
+    deadline.degrade("synthesis")
+    assert deadline.degraded_stages == ["parse", "synthesis"]
+    assert child.degraded_stages == ["parse", "synthesis"]
@@ -0,0 +1,82 @@
+import pytest
+
+from AGKG.services import graph_analytics
+from AGKG.services.graph_analytics import GraphAnalytics, _degree_histogram
+from AGKG.utils.sketches import ReservoirSample
+
+
+class FakeClient:
+    """节点ID不连续（中间有大段已删除的ID），节点总数来自计数存储"""
+
+    def __init__(self, nodes, total_nodes=None):
+        self.nodes = nodes
+        self.total_nodes = len(nodes) if total_nodes is None else total_nodes
+        self.pages = []
+
+    def get_count_statistics(self):
+        return {"total_nodes": self.total_nodes}
+
+    def fetch_degree_page(self, start_id, end_id):
+        self.pages.append((start_id, end_id))
+        return [node for node in self.nodes if start_id <= node["id"] < end_id]
+
+
+def node(node_id, degree, category="作物"):
+    return {"id": node_id, "name": f"n{node_id}", "category": category, "degree": degree,
+            "neighbors": list(range(degree))}
+
+
+@pytest.fixture
+def make_analytics(monkeypatch):
+    def make(client):
+        monkeypatch.setattr(graph_analytics, "_graph_analytics_instance", None)
+        analytics = GraphAnalytics(client, refresh_interval=0)
+        analytics.page_size = 10
+        analytics.page_pause = 0
+        return analytics
+    return make
+
+
+def test_degree_histogram_scales_sample_to_population():
+    sample = ReservoirSample(10, seed=1)
+    for degree in (0, 1, 1, 3, 8):
+        sample.add(degree)
+    assert sample.quantile(0.5) == 1
+    assert _degree_histogram(sample, 10) == [
+        {"range": "0", "count": 2}, {"range": "1", "count": 4},
+        {"range": "2-3", "count": 2}, {"range": "8-15", "count": 2},
+    ]
+
+
+def test_scan_stops_at_count_store_total_and_widens_over_id_gaps(make_analytics):
+    nodes = [node(1, 2), node(5, 4, "病害"), node(3005, 1)]
+    client = FakeClient(nodes)
+    analytics = make_analytics(client)
+
+    assert analytics.refresh()
+    payload = analytics.get()
+    assert payload["nodes_scanned"] == 3
+    # 页数随节点数而不是ID空洞增长：ID区间在空洞处扩大，读到全部节点后立即停止
+    assert len(client.pages) < 20
+    assert client.pages[-1][0] <= 3005 < client.pages[-1][1]
+    assert payload["degree_distribution"]["max"] == 4
+    assert payload["labels"]["病害"] == {"nodes": 1, "average_degree": 4.0, "distinct_neighbors": 4}
+
+
+def test_scan_ends_after_empty_pages_when_nodes_were_deleted(make_analytics):
+    client = FakeClient([node(1, 1)], total_nodes=5)
+    analytics = make_analytics(client)
+    analytics.max_empty_pages = 3
+
+    assert analytics.refresh()
+    assert analytics.get()["nodes_scanned"] == 1
+    assert len(client.pages) == 4
+
+
+def test_empty_graph_produces_empty_payload(make_analytics):
+    client = FakeClient([])
+    analytics = make_analytics(client)
+
+    assert analytics.refresh()
+    assert analytics.get()["nodes_scanned"] == 0
+    assert client.pages == []
@@ -0,0 +1,75 @@
+import time
+
+from AGKG.client import graph_replica
+from AGKG.client.graph_replica import CSRGraph, GraphReplica
+from AGKG.client.graph_snapshot import GraphSnapshot, write_snapshot
+
+# 节点ID不连续，便于检查端点缺失时不会挂到相邻ID上
+NODES = [(10, "小麦", "作物"), (20, "条锈病", "病害"), (40, "三唑酮", None), (30, "白粉病", "病害")]
+EDGES = [(1, 10, 20, "病害"), (2, 10, 30, "病害"), (3, 20, 40, "防治方法")]
+
+
+def build(edges=EDGES):
+    ids, names, labels = zip(*NODES)
+    edge_ids, sources, targets, types = zip(*edges)
+    return CSRGraph.build(list(ids), list(names), list(labels), list(edge_ids), list(sources), list(targets),
+                          list(types))
+
+
+def neighborhood(graph, name):
+    center = graph.find_by_name(name)
+    return sorted(int(node_id) for node_id in graph.neighbor_ids(center))
+
+
+def test_build_csr():
+    graph = build()
+    assert graph.node_count == 4 and graph.edge_count == 3
+    assert list(graph.node_ids) == [10, 20, 30, 40]
+    assert neighborhood(graph, "小麦") == [20, 30]
+    assert neighborhood(graph, "条锈病") == [10, 40]
+    assert graph.label(graph.find_by_name("三唑酮")) is None
+    assert graph.degree(graph.find_by_id(10)) == 2
+    assert graph.find_by_id(25) is None
+
+
+def test_edges_with_missing_endpoints_are_dropped():
+    # 25 落在已有ID之间，35/50 超出范围，都不应挂到其他节点上
+    graph = build(EDGES + [(4, 10, 25, "病害"), (5, 50, 10, "病害"), (6, 5, 40, "病害")])
+    assert graph.edge_count == 3
+    assert neighborhood(graph, "小麦") == [20, 30]
+    assert sorted(int(edge_id) for edge_id in graph.edge_ids) == [1, 2, 3]
+
+
+def test_replica_neighborhood_matches_client_shape():
+    replica = GraphReplica(neo4j_client=None, refresh_interval=0)
+    replica.graph = build()
+    nodes, edges = replica.get_entity_and_neighbors("小麦")
+    assert {node["name"] for node in nodes} == {"小麦", "条锈病", "白粉病"}
+    assert {(edge["source"], edge["target"], edge["name"]) for edge in edges} == {(10, 20, "病害"), (10, 30, "病害")}
+
+    subgraph = replica.fetch_subgraph([10], depth=2, node_budget=3)
+    assert len(subgraph["nodes"]) == 3 and subgraph["truncated"]
+
+
+
+def test_snapshot_refresh_remaps_only_changed_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(graph_replica, "SNAPSHOT_RETIRE_SECONDS", 0)
+    path = str(tmp_path / "graph.snapshot")
+    write_snapshot(build(), path)
+    replica = GraphReplica(neo4j_client=None, refresh_interval=0, snapshot_path=path)
+
+    assert replica.refresh()
+    first = replica.graph
+    assert replica.refresh()
+    assert replica.graph is first
+
+    write_snapshot(build(EDGES[:1]), path)
+    assert replica.refresh()
+    assert replica.graph is not first and replica.graph.edge_count == 1
+    # 旧快照在宽限期后关闭映射
+    for _ in range(100):
+        if first._mmap.closed:
+            break
+        time.sleep(0.01)
+    assert first._mmap.closed
+    assert isinstance(replica.graph, GraphSnapshot)
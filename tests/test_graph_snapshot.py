@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from AGKG.client.graph_snapshot import GraphSnapshot, compile_snapshot
+
+NODES = [
+    {"id": 10, "name": "小麦", "label": "作物"},
+    {"id": 20, "name": "条锈病", "label": "病害"},
+    {"id": 30, "name": "Puccinia striiformis", "label": "病原"},
+    {"id": 40, "name": "三唑酮", "label": None},
+]
+EDGES = [
+    {"id": 1, "source": 10, "target": 20, "type": "病害"},
+    {"id": 2, "source": 20, "target": 30, "type": "学名"},
+    {"id": 3, "source": 20, "target": 40, "type": "防治方法"},
+]
+
+
+class FakeTx:
+    def __init__(self, nodes, edges):
+        self.nodes = nodes
+        self.edges = edges
+
+    def run(self, query, **params):
+        return self.edges if "MATCH (a)-[r]->(b)" in query else self.nodes
+
+
+class FakeSession:
+    def __init__(self, nodes, edges):
+        self.tx = FakeTx(nodes, edges)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute_read(self, work):
+        return work(self.tx)
+
+
+class FakeClient:
+    def __init__(self, nodes, edges):
+        self.nodes = nodes
+        self.edges = edges
+
+    def session(self, **config):
+        return FakeSession(self.nodes, self.edges)
+
+
+def compile_and_open(tmp_path, nodes=NODES, edges=EDGES):
+    path = str(tmp_path / "graph.snapshot")
+    compile_snapshot(FakeClient(nodes, edges), path)
+    return GraphSnapshot(path)
+
+
+def test_compiled_snapshot_resolves_names_and_neighbors(tmp_path):
+    snapshot = compile_and_open(tmp_path)
+
+    assert snapshot.node_count == 4 and snapshot.edge_count == 3
+    assert snapshot.names == ["小麦", "条锈病", "Puccinia striiformis", "三唑酮"]
+    assert snapshot.resolve_name("条锈病") == 20
+    # 查找键去首尾空白并转小写
+    assert snapshot.resolve_name("  puccinia STRIIFORMIS ") == 30
+    assert snapshot.find_by_name("白粉病") is None
+    assert sorted(int(node_id) for node_id in snapshot.neighbors_of(20)) == [10, 30, 40]
+    assert list(snapshot.neighbors_of(99)) == []
+    assert snapshot.label(snapshot.find_by_id(30)) == "病原"
+    assert snapshot.label(snapshot.find_by_id(40)) is None
+
+
+def test_compiled_snapshot_keeps_relation_dictionary(tmp_path):
+    snapshot = compile_and_open(tmp_path)
+
+    assert sorted(snapshot.type_table) == ["学名", "病害", "防治方法"]
+    center = snapshot.find_by_id(20)
+    edges = {snapshot.edge(slot, center)["id"]: snapshot.edge(slot, center)
+             for slot in range(snapshot.offsets[center], snapshot.offsets[center + 1])}
+    assert edges[1] == {"id": 1, "source": 10, "target": 20, "name": "病害"}
+    assert edges[3] == {"id": 3, "source": 20, "target": 40, "name": "防治方法"}
+
+
+def test_empty_graph_roundtrip(tmp_path):
+    snapshot = compile_and_open(tmp_path, nodes=[], edges=[])
+
+    assert snapshot.node_count == 0 and snapshot.edge_count == 0
+    assert snapshot.names == []
+    assert snapshot.find_by_name("小麦") is None
+    assert list(snapshot.neighbors_of(10)) == []
+    assert snapshot.type_table == [] and snapshot.label_table == []
+
+
+def test_close_releases_the_mapping(tmp_path):
+    snapshot = compile_and_open(tmp_path)
+    assert np.array_equal(snapshot.node_ids, [10, 20, 30, 40])
+    snapshot.close()
+    assert snapshot._mmap.closed and snapshot.node_ids is None
+
+
+def test_snapshot_rejects_invalid_file(tmp_path):
+    path = tmp_path / "bad.snapshot"
+    path.write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        GraphSnapshot(str(path))
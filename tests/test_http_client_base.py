@@ -0,0 +1,43 @@
+import asyncio
+import gc
+
+import pytest
+
+pytest.importorskip("requests")
+from AGKG.client.base import HttpClientBase  # noqa: E402
+
+
+async def open_session():
+    session = HttpClientBase._get_session()
+    assert HttpClientBase._get_session() is session
+    return session
+
+
+def test_session_closed_when_asyncio_run_returns():
+    sessions = [asyncio.run(open_session()) for _ in range(5)]
+    assert all(session.closed for session in sessions)
+    assert not HttpClientBase._sessions
+    assert not HttpClientBase._closers
+
+
+def test_explicit_close():
+    async def run():
+        session = await open_session()
+        await HttpClientBase.close()
+        assert session.closed
+        assert asyncio.get_running_loop() not in HttpClientBase._sessions
+        return session
+
+    assert asyncio.run(run()).closed
+    gc.collect()
+    assert not HttpClientBase._sessions
+
+
+def test_closed_loops_are_pruned():
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(open_session())
+    loop.run_until_complete(HttpClientBase.close())
+    loop.close()
+
+    asyncio.run(open_session())
+    assert loop not in HttpClientBase._sessions
@@ -0,0 +1,41 @@
+import json
+
+from AGKG.utils.incremental_json import ArrayItemParser
+
+
+def feed_in_chunks(parser, text, size):
+    items = []
+    for start in range(0, len(text), size):
+        items.extend(parser.feed(text[start:start + size]))
+    return items
+
+
+def test_items_are_emitted_as_soon_as_they_close():
+    parser = ArrayItemParser("knowledge_graph")
+    assert parser.feed('{"analysis": {"core_entities": ["小麦"]}, "knowledge_graph": [{"head": "小麦", ') == []
+    assert parser.feed('"relation": "病害", "tail": "Q1"}, {"head"') == [
+        {"head": "小麦", "relation": "病害", "tail": "Q1"}]
+    assert parser.feed(': "Q1", "relation": "症状", "tail": "Q2"}]}') == [
+        {"head": "Q1", "relation": "症状", "tail": "Q2"}]
+
+
+def test_chunk_boundaries_and_surrounding_text_do_not_matter():
+    payload = {"analysis": {"note": "含有 \"引号\" 和 {括号} 的[说明]"},
+               "knowledge_graph": [{"head": "稻瘟病", "relation": "防治方法", "tail": "Q1"},
+                                   {"head": "a\\\"}", "relation": "别称", "tail": "Q2"}]}
+    text = '好的，结果如下 "注意"：\n```json\n' + json.dumps(payload, ensure_ascii=False) + '\n```'
+    for size in (1, 3, 7, len(text)):
+        parser = ArrayItemParser("knowledge_graph")
+        assert feed_in_chunks(parser, text, size) == payload["knowledge_graph"]
+        assert parser.text == text
+
+
+def test_nested_key_with_same_name_is_ignored():
+    parser = ArrayItemParser("knowledge_graph")
+    text = '{"analysis": {"knowledge_graph": [{"head": "x"}]}, "knowledge_graph": [{"head": "y"}]}'
+    assert parser.feed(text) == [{"head": "y"}]
+
+
+def test_malformed_item_is_skipped():
+    parser = ArrayItemParser("knowledge_graph")
+    assert parser.feed('{"knowledge_graph": [{"head": 小麦}, {"head": "小麦"}]}') == [{"head": "小麦"}]
@@ -0,0 +1,55 @@
+import pytest
+
+from AGKG.services import local_parser
+from AGKG.services.local_parser import LocalQuestionParser
+
+
+class FakeClient:
+    def __init__(self, names):
+        self.names = names
+
+    def get_entity_names(self):
+        return list(self.names)
+
+
+@pytest.fixture
+def parser(monkeypatch):
+    monkeypatch.setattr(local_parser, "_local_question_parser_instance", None)
+    parser = LocalQuestionParser(FakeClient(["稻瘟病", "小麦", "小麦锈病"]))
+    assert parser.refresh()
+    return parser
+
+
+def test_parses_single_entity_single_intent(parser):
+    result = parser.parse("稻瘟病的防治方法是什么？")
+    assert result["analysis"]["core_entities"] == ["稻瘟病"]
+    assert result["knowledge_graph"] == [{"head": "稻瘟病", "relation": "防治方法", "tail": "Q1"}]
+
+
+def test_rejects_multiple_intents_or_entities(parser):
+    assert parser.parse("稻瘟病的症状和防治方法") is None
+    assert parser.parse("小麦和稻瘟病有什么关系") is None
+
+
+def test_refresh_applies_diff_to_a_copy_and_swaps_it_in(parser):
+    old = parser.entities
+    parser.neo4j_client.names = ["稻瘟病", "玉米螟"]
+    assert parser.refresh()
+    assert parser.entities is not old
+    assert "小麦" in old and "玉米螟" not in old
+    assert sorted(parser.entities.words()) == ["玉米螟", "稻瘟病"]
+    assert parser.parse("玉米螟的防治方法")["analysis"]["core_entities"] == ["玉米螟"]
+
+
+def test_entity_count_change_signals_refresh(parser):
+    parser._on_statistics({"总实体数": 3, "实体类型分布": {"病害": 3}}, 1.0)
+    parser._on_statistics({"总实体数": 3, "实体类型分布": {"病害": 3}}, 2.0)
+    assert not parser._changed.is_set()
+    parser._on_statistics({"总实体数": 4, "实体类型分布": {"病害": 4}}, 3.0)
+    assert parser._changed.is_set()
+
+
+def test_refresh_keeps_automaton_when_names_unchanged(parser):
+    old = parser.entities
+    assert parser.refresh()
+    assert parser.entities is old
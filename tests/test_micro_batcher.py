@@ -0,0 +1,64 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import pytest
+
+from AGKG.utils.micro_batcher import MicroBatcher
+
+
+def submit_all(batcher, items, timeout=2):
+    with ThreadPoolExecutor(max_workers=len(items)) as pool:
+        futures = [pool.submit(batcher.submit, item, timeout) for item in items]
+        return [future.result() if future.exception() is None else future.exception() for future in futures]
+
+
+def test_requests_in_window_are_batched_and_results_routed_back():
+    batches = []
+
+    def handler(items):
+        batches.append(list(items))
+        return [item * 10 for item in items]
+
+    batcher = MicroBatcher("test_mb_route", handler, window=0.1, max_size=4)
+    results = submit_all(batcher, [1, 2, 3, 4, 5, 6])
+
+    assert results == [10, 20, 30, 40, 50, 60]
+    assert sorted(len(batch) for batch in batches) == [2, 4]
+
+
+def test_handler_error_fails_every_request_in_batch():
+    def handler(items):
+        raise ConnectionError("upstream down")
+
+    batcher = MicroBatcher("test_mb_error", handler, window=0.05, max_size=4)
+    results = submit_all(batcher, [1, 2, 3])
+    assert all(isinstance(result, ConnectionError) for result in results)
+
+
+def test_wrong_result_count_is_an_error():
+    batcher = MicroBatcher("test_mb_count", lambda items: items[:1], window=0.05, max_size=4)
+    results = submit_all(batcher, [1, 2])
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_timed_out_request_is_dropped_from_pending_batch():
+    release = threading.Event()
+    seen = []
+
+    def handler(items):
+        seen.append(list(items))
+        release.wait(1)
+        return items
+
+    batcher = MicroBatcher("test_mb_cancel", handler, window=0.01, max_size=1, max_workers=1)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        first = pool.submit(batcher.submit, "first")
+        time.sleep(0.05)
+        # 唯一的执行线程被占用，第二个请求在等待执行时超时
+        with pytest.raises(FutureTimeoutError):
+            batcher.submit("second", timeout=0.05)
+        release.set()
+        assert first.result() == "first"
+    time.sleep(0.05)
+    assert seen == [["first"]]
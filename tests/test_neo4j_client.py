@@ -0,0 +1,253 @@
+import time
+
+import pytest
+from neo4j.exceptions import ClientError
+
+from AGKG.client.neo4j_client import SESSIONS_IN_USE, Neo4jClient
+from AGKG.utils.deadline import Deadline, DeadlineExceeded
+
+
+class FakeResult(list):
+    def single(self):
+        return self[0] if self else None
+
+    def consume(self):
+        return None
+
+
+class FakeTx:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def run(self, query, **params):
+        self.driver.queries.append((query, params))
+        return FakeResult(self.driver.handler(query, params))
+
+
+class FakeSession:
+    def __init__(self, driver):
+        self.driver = driver
+        self.calls = driver.calls
+        self.entered = driver.entered
+
+    def __enter__(self):
+        self.entered.append(SESSIONS_IN_USE.value)
+        return self
+
+    def run(self, query, **params):
+        return FakeTx(self.driver).run(query, **params)
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute_read(self, work):
+        self.calls.append(getattr(work, "timeout", None))
+        return work(FakeTx(self.driver))
+
+
+class FakeDriver:
+    def __init__(self, handler=lambda query, params: []):
+        self.handler = handler
+        self.calls = []
+        self.entered = []
+        self.queries = []
+
+    def session(self, **config):
+        return FakeSession(self)
+
+
+@pytest.fixture
+def client():
+    # 绕过单例与自动连接
+    client = object.__new__(Neo4jClient)
+    client.driver = FakeDriver()
+    client.name_key_ready = True
+    client._name_key_checked_at = time.time()
+    client.fulltext_ready = True
+    client._fulltext_checked_at = time.time()
+    return client
+
+
+def test_read_passes_remaining_deadline_as_transaction_timeout(client):
+    client._read("RETURN 1", deadline=Deadline(5))
+    client._read("RETURN 1")
+    timeout, unbounded = client.driver.calls
+    assert 4 < timeout <= 5
+    assert unbounded is None
+
+
+def test_read_refuses_to_start_after_deadline(client):
+    deadline = Deadline(0)
+    with pytest.raises(DeadlineExceeded):
+        client._read("RETURN 1", deadline=deadline)
+    assert client.driver.calls == []
+
+
+def test_index_maintenance_sessions_count_towards_pool_usage(client):
+    before = SESSIONS_IN_USE.value
+    client._read("RETURN 1")
+    assert client.ensure_name_key_index()
+    assert client.driver.entered == [before + 1, before + 1]
+    assert SESSIONS_IN_USE.value == before
+
+
+def test_batch_results_are_split_back_per_triplet(client):
+    def handler(query, params):
+        keys = {row["idx"]: row for row in params["rows"]}
+        assert sorted(keys) == [0, 3, 4]
+        return [
+            {"idx": 0, "head": "稻瘟病", "relation": "症状", "tail": "病斑"},
+            {"idx": 3, "head": "稻瘟病", "relation": "别称", "tail": "稻热病"},
+            {"idx": 0, "head": "稻瘟病", "relation": "症状", "tail": "叶枯"},
+        ]
+
+    client.driver.handler = handler
+    triplets = [
+        {"head": "稻瘟病", "relation": "症状", "tail": "Q1"},
+        {"head": "Q1", "relation": "作者", "tail": "Q2"},
+        {"head": "稻瘟病", "relation": "DELETE", "tail": "Q3"},
+        {"head": "稻瘟病", "relation": "", "tail": ""},
+        {"head": "稻曲病", "relation": "症状", "tail": "Q4"},
+    ]
+
+    results = client.query_kg_triplets_batch(triplets)
+
+    assert len(client.driver.queries) == 1
+    assert results == [
+        {"triplet": triplets[0], "result": [{"head": "稻瘟病", "relation": "症状", "tail": "病斑"},
+                                            {"head": "稻瘟病", "relation": "症状", "tail": "叶枯"}]},
+        None,
+        None,
+        {"triplet": triplets[3], "result": [{"head": "稻瘟病", "relation": "别称", "tail": "稻热病"}]},
+        None,
+    ]
+
+
+def test_batch_without_queryable_triplets_skips_the_database(client):
+    triplets = [{"head": "Q1", "relation": "作者", "tail": "Q2"}]
+    assert client.query_kg_triplets_batch(triplets) == [None]
+    assert client.driver.queries == []
+
+
+def test_dependency_chain_is_split_per_hop_and_head(client):
+    record = {
+        "hop0": [{"head": "稻瘟病", "relation": "症状", "tail": "病斑"},
+                 {"head": "稻瘟病", "relation": "症状", "tail": "叶枯"}],
+        "frontier0": ["病斑", "叶枯"],
+        "hop1": [{"head": "病斑", "relation": "作者", "tail": "张三"},
+                 {"head": None, "relation": None, "tail": None}],
+        "frontier1": ["张三"],
+    }
+    client.driver.handler = lambda query, params: [record]
+    triplets = [{"head": "稻瘟病", "relation": "症状", "tail": "Q1"},
+                {"head": "Q1", "relation": "作者", "tail": "Q2"}]
+
+    kg_results, q_values = client.query_dependency_chain(triplets, hop_limit=10)
+
+    (query, params), = client.driver.queries
+    assert params["limits"] == [10, 10]
+    assert kg_results == [
+        {"triplet": triplets[0], "result": record["hop0"]},
+        # 叶枯 没有作者，尾实体为Q值的空结果不记录
+        {"triplet": {"head": "病斑", "relation": "作者", "tail": "Q2"},
+         "result": [{"head": "病斑", "relation": "作者", "tail": "张三"}]},
+    ]
+    assert q_values == {"Q1": ["病斑", "叶枯"], "Q2": ["张三"]}
+
+
+def test_dependency_chain_stops_before_unknown_relation(client):
+    record = {"hop0": [{"head": "稻瘟病", "relation": "症状", "tail": "病斑"}], "frontier0": ["病斑"]}
+    client.driver.handler = lambda query, params: [record]
+    triplets = [{"head": "稻瘟病", "relation": "症状", "tail": "Q1"},
+                {"head": "Q1", "relation": "DELETE", "tail": "Q2"}]
+
+    kg_results, q_values = client.query_dependency_chain(triplets)
+
+    (query, params), = client.driver.queries
+    assert "hop1" not in query
+    assert kg_results == [{"triplet": triplets[0], "result": record["hop0"]}]
+    assert q_values == {"Q1": ["病斑"]}
+
+
+def test_search_uses_fulltext_index_with_escaped_term(client):
+    client.driver.handler = lambda query, params: [{"id": 1, "name": "稻瘟病", "category": "病害", "score": 2.5}]
+
+    assert client.search_entities("稻瘟病 (叶瘟)", limit=5) == [
+        {"id": 1, "name": "稻瘟病", "category": "病害", "score": 2.5}]
+
+    (query, params), = client.driver.queries
+    assert "db.index.fulltext.queryNodes" in query
+    assert params["search_term"] == "稻瘟病 \\(叶瘟\\)"
+    assert params["limit"] == 5
+
+
+def test_search_falls_back_to_scan_when_fulltext_index_fails(client):
+    def handler(query, params):
+        if "db.index.fulltext.queryNodes" in query:
+            raise ClientError("There is no such fulltext schema index")
+        return [{"id": 2, "name": "稻曲病", "category": "病害", "score": None}]
+
+    client.driver.handler = handler
+
+    assert client.search_entities("稻曲") == [{"id": 2, "name": "稻曲病", "category": "病害", "score": None}]
+    assert client.fulltext_ready is False
+    scan_query, scan_params = client.driver.queries[-1]
+    assert "CONTAINS" in scan_query
+    assert scan_params["search_term"] == "稻曲"
+
+    # 标记为不可用后，重新检查前直接走模糊匹配
+    client.driver.queries.clear()
+    client.search_entities("稻曲")
+    (query, params), = client.driver.queries
+    assert "db.index.fulltext.queryNodes" not in query
+
+
+def count_store_handler(query, params):
+    if "db.labels()" in query:
+        return [{"labels": ["病害", "Entity", "作物"]}]
+    if "db.relationshipTypes()" in query:
+        return [{"types": ["症状", "危害作物"]}]
+    # 标签与关系类型按名称排序：作物、病害；危害作物、症状
+    return [{"total_nodes": 5, "total_relations": 4,
+             "label_0": 2, "label_1": 3, "type_0": 0, "type_1": 4}]
+
+
+def test_count_statistics_are_read_from_the_count_store(client):
+    client.driver.handler = count_store_handler
+
+    assert client.get_count_statistics() == {
+        "total_nodes": 5, "total_relations": 4,
+        "labels": {"病害": 3, "作物": 2}, "relation_types": {"症状": 4}}
+
+    count_query, _ = client.driver.queries[-1]
+    assert "Entity" not in count_query
+    assert list(client.get_count_statistics()["labels"]) == ["病害", "作物"]
+
+
+def test_node_and_relation_statistics_follow_count_store(client):
+    client.driver.handler = count_store_handler
+
+    assert client.get_node_statistics() == [{"label": "病害", "count": 3}, {"label": "作物", "count": 2}]
+    assert client.get_relation_statistics() == [{"type": "症状", "count": 4}]
+
+
+def test_count_statistics_error_returns_none(client):
+    def handler(query, params):
+        raise ClientError("Procedure not found")
+
+    client.driver.handler = handler
+    assert client.get_count_statistics() is None
+    assert client.get_node_statistics() == []
+
+
+def test_name_key_coverage_drop_is_logged_with_missing_count(client, caplog):
+    def handler(query, params):
+        if "SHOW INDEXES" in query:
+            return [{"state": "ONLINE"}]
+        return [{"total": 10, "entities": 9, "keyed": 8}]
+
+    client.driver.handler = handler
+
+    assert client.check_name_keys() is False
+    assert client.name_key_ready is False
+    assert "2 个节点缺少 name_key" in caplog.text
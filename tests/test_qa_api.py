@@ -0,0 +1,70 @@
+import pytest
+from flask import Flask
+
+from AGKG.api import qa_api as qa_module
+from AGKG.utils.sse import format_event
+
+
+class FakeQAService:
+    def __init__(self, events):
+        self.events = events
+        self.calls = []
+
+    def process_question_stream(self, question, user_id=None):
+        self.calls.append((question, user_id))
+        yield from self.events
+
+
+@pytest.fixture
+def saved(monkeypatch):
+    # 不写搜索记录数据库，只记录调用
+    saved = []
+    monkeypatch.setattr(qa_module, "_save_history",
+                        lambda question, result, user_id: saved.append((question, result, user_id)))
+    return saved
+
+
+def post_stream(monkeypatch, events, body):
+    service = FakeQAService(events)
+    monkeypatch.setattr(qa_module, "qa_service", service)
+    app = Flask(__name__)
+    app.register_blueprint(qa_module.qa_api)
+    return service, app.test_client().post("/qa/stream", json=body)
+
+
+def test_stream_pushes_each_stage_as_server_sent_event(monkeypatch, saved):
+    done = {"status": "success", "question": "稻瘟病的症状", "answer": "叶片出现病斑"}
+    events = [
+        ("analysis", {"question": "稻瘟病的症状", "analysis": {}, "knowledge_graph": []}),
+        ("kg_results", {"kg_results": []}),
+        ("answer_delta", {"text": "叶片"}),
+        ("answer_delta", {"text": "出现病斑"}),
+        ("done", done),
+    ]
+
+    service, response = post_stream(monkeypatch, events, {"question": "稻瘟病的症状", "user_id": 7})
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    assert response.headers["Cache-Control"] == "no-cache"
+    assert response.get_data(as_text=True) == "".join(format_event(event, data) for event, data in events)
+    assert service.calls == [("稻瘟病的症状", 7)]
+    assert saved == [("稻瘟病的症状", done, 7)]
+
+
+def test_partial_or_failed_stream_is_not_saved(monkeypatch, saved):
+    events = [("done", {"status": "partial", "question": "稻瘟病的症状"})]
+    _, response = post_stream(monkeypatch, events, {"question": "稻瘟病的症状", "user_id": 7})
+    assert "event: done" in response.get_data(as_text=True)
+
+    events = [("error", {"status": "error", "message": "问题解析失败"})]
+    _, response = post_stream(monkeypatch, events, {"question": "稻瘟病的症状", "user_id": 7})
+    assert response.get_data(as_text=True) == format_event(*events[0])
+    assert saved == []
+
+
+def test_stream_requires_question(monkeypatch, saved):
+    service, response = post_stream(monkeypatch, [], {"user_id": 7})
+    assert response.status_code == 400
+    assert response.get_json()["status"] == "error"
+    assert service.calls == []
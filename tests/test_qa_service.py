@@ -0,0 +1,61 @@
+import threading
+
+from AGKG.services.qa_service import QAService
+from AGKG.utils.deadline import Deadline
+from AGKG.utils.single_flight import SingleFlight
+
+
+def make_service(process):
+    # 绕过客户端初始化，只保留单飞合并
+    service = object.__new__(QAService)
+    service.single_flight = SingleFlight("t_qa_single_flight")
+    service._process_question = process
+    return service
+
+
+def test_follower_gets_shared_result_with_its_own_question():
+    release = threading.Event()
+    started = threading.Event()
+    calls = []
+
+    def process(question, deadline):
+        calls.append(question)
+        started.set()
+        release.wait(1)
+        return {'status': 'success', 'question': question, 'answer': '喷施三环唑'}
+
+    service = make_service(process)
+    leader = threading.Thread(target=service.process_question, args=("稻瘟病怎么防治",))
+    leader.start()
+    started.wait(1)
+    results = []
+    follower = threading.Thread(target=lambda: results.append(service.process_question(" 稻瘟病怎么防治？ ")))
+    follower.start()
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert calls == ["稻瘟病怎么防治"]
+    assert results[0]['question'] == " 稻瘟病怎么防治？ "
+    assert results[0]['answer'] == '喷施三环唑'
+
+
+def test_follower_timeout_reports_coalesced_wait_not_parse():
+    release = threading.Event()
+    started = threading.Event()
+
+    def process(question, deadline):
+        started.set()
+        release.wait(1)
+        return {'status': 'success', 'question': question}
+
+    service = make_service(process)
+    leader = threading.Thread(target=service.process_question, args=("小麦锈病的症状",))
+    leader.start()
+    started.wait(1)
+    result = service.process_question("小麦锈病的症状", deadline=Deadline(0.05))
+    release.set()
+    leader.join()
+
+    assert result['status'] == 'partial'
+    assert result['degraded_stages'] == ['coalesced_wait']
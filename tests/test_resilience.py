@@ -0,0 +1,170 @@
+import threading
+import time
+
+import pytest
+
+from AGKG.utils.deadline import Deadline, DeadlineExceeded
+from AGKG.utils.resilience import (CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, ResilientCaller,
+                                   RetryBudget, is_retryable)
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+def make_caller(name, max_attempts=3, min_calls=2, open_seconds=0.05, min_retries=10):
+    breaker = CircuitBreaker(name, failure_rate=0.5, window=4, min_calls=min_calls, open_seconds=open_seconds)
+    return ResilientCaller(name, breaker, RetryBudget(name, min_retries=min_retries), max_attempts=max_attempts,
+                           backoff=0.001, max_backoff=0.002)
+
+
+def trip(caller):
+    for _ in range(caller.breaker.min_calls):
+        caller.breaker.record(False, 0.0)
+    assert caller.breaker.state == OPEN
+    time.sleep(caller.breaker.open_seconds + 0.01)
+
+
+def test_is_retryable():
+    assert is_retryable(StatusError(503))
+    assert is_retryable(StatusError(429))
+    assert is_retryable(TimeoutError())
+    assert not is_retryable(StatusError(400))
+    assert not is_retryable(DeadlineExceeded())
+    assert not is_retryable(CircuitOpenError())
+    assert not is_retryable(ValueError())
+
+
+def test_retries_transient_errors():
+    caller = make_caller("t_res_retry", min_calls=10)
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise StatusError(503)
+        return "ok"
+
+    assert caller.call("m", flaky, hedge=False) == "ok"
+    assert len(calls) == 3
+
+
+def test_does_not_retry_client_errors():
+    caller = make_caller("t_res_no_retry", min_calls=10)
+    calls = []
+
+    def bad():
+        calls.append(1)
+        raise StatusError(400)
+
+    with pytest.raises(StatusError):
+        caller.call("m", bad, hedge=False)
+    assert len(calls) == 1
+
+
+def test_retry_budget_limits_retries():
+    caller = make_caller("t_res_budget", max_attempts=5, min_calls=100, min_retries=1)
+    calls = []
+
+    def down():
+        calls.append(1)
+        raise StatusError(500)
+
+    with pytest.raises(StatusError):
+        caller.call("m", down, hedge=False)
+    # 一次调用 + 预算中唯一可用的一次重试
+    assert len(calls) == 2
+
+
+def test_breaker_opens_rejects_and_recovers():
+    caller = make_caller("t_res_breaker", max_attempts=1)
+    trip(caller)
+    assert caller.call("m", lambda: "ok", hedge=False) == "ok"
+    assert caller.breaker.state == CLOSED
+
+    trip(caller)
+    with pytest.raises(StatusError):
+        caller.call("m", lambda: (_ for _ in ()).throw(StatusError(503)), hedge=False)
+    assert caller.breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        caller.call("m", lambda: "ok", hedge=False)
+
+
+def test_half_open_probe_released_on_client_error():
+    caller = make_caller("t_res_probe_4xx", max_attempts=1)
+    trip(caller)
+
+    def bad():
+        raise StatusError(400)
+
+    with pytest.raises(StatusError):
+        caller.call("m", bad, hedge=False)
+    assert caller.breaker.state == HALF_OPEN
+    # 探测名额已归还，下一次调用仍可作为探测放行
+    assert caller.call("m", lambda: "ok", hedge=False) == "ok"
+    assert caller.breaker.state == CLOSED
+
+
+def test_expired_deadline_does_not_consume_probe():
+    caller = make_caller("t_res_probe_deadline", max_attempts=1)
+    trip(caller)
+    with pytest.raises(DeadlineExceeded):
+        caller.call("m", lambda: "ok", deadline=Deadline(0), hedge=False)
+    assert caller.call("m", lambda: "ok", hedge=False) == "ok"
+    assert caller.breaker.state == CLOSED
+
+
+def make_hedging_caller(name, samples=10):
+    breaker = CircuitBreaker(name, min_calls=100)
+    caller = ResilientCaller(name, breaker, RetryBudget(name), max_attempts=1, hedge=True, hedge_min_samples=5)
+    latency = caller.latency("m")
+    for _ in range(samples):
+        latency.observe(0.05)
+    return caller
+
+
+def test_fast_primary_is_not_hedged():
+    caller = make_hedging_caller("t_res_hedge_fast")
+    cold = make_hedging_caller("t_res_hedge_cold", samples=0)
+
+    assert caller.call("m", lambda: "ok") == "ok"
+    # 样本不足时不对冲，直接在调用方线程中执行
+    assert cold.call("m", threading.current_thread) is threading.current_thread()
+    assert caller._hedges.value == 0 and cold._hedges.value == 0
+
+
+def test_hedge_wins_over_slow_successful_primary():
+    caller = make_hedging_caller("t_res_hedge_race")
+    calls = []
+
+    def slow_then_fast():
+        calls.append(None)
+        if len(calls) == 1:
+            time.sleep(1)
+            return "primary"
+        return "hedged"
+
+    started = time.monotonic()
+    assert caller.call("m", slow_then_fast) == "hedged"
+    assert time.monotonic() - started < 0.5
+    assert caller._hedges.value == 1
+    assert caller._hedge_wins.value == 1
+
+
+def test_hedge_replaces_failed_slow_primary():
+    caller = make_hedging_caller("t_res_hedge")
+    calls = []
+
+    def slow_failure_then_fast():
+        calls.append(threading.current_thread())
+        if len(calls) == 1:
+            time.sleep(0.3)
+            raise StatusError(503)
+        return "hedged"
+
+    assert caller.call("m", slow_failure_then_fast) == "hedged"
+    assert calls[1] is not calls[0]
+    assert caller._hedges.value == 1
+    assert caller._hedge_wins.value == 1
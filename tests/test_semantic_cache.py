@@ -0,0 +1,53 @@
+from AGKG.client.cypher_builder import INTENT_KEYWORDS
+from AGKG.utils.semantic_cache import SemanticCache, entities_present, intent_verifier
+
+ENTITY = "基于深度学习的小麦条锈病遥感监测方法研究"
+
+
+def make_parse(question, entity, relation):
+    return {
+        "question": question,
+        "analysis": {"question_type": "实体推理", "core_entities": [entity], "query_intent": relation},
+        "knowledge_graph": [{"head": entity, "relation": relation, "tail": "Q1"}],
+    }
+
+
+def make_cache(name):
+    return SemanticCache(name, threshold=0.75, capacity=16, verify=intent_verifier(INTENT_KEYWORDS))
+
+
+def test_reworded_question_hits():
+    cache = make_cache("t_sem_hit")
+    cache.set("小麦有哪些病害", make_parse("小麦有哪些病害", "小麦", "病害"))
+    hit = cache.get("小麦的病害有什么？")
+    assert hit is not None and hit["analysis"]["query_intent"] == "病害"
+
+
+def test_different_intent_on_long_entity_is_rejected():
+    cache = make_cache("t_sem_intent")
+    cache.set(f"{ENTITY}的作者是谁", make_parse(f"{ENTITY}的作者是谁", ENTITY, "作者"))
+    # 相似度超过阈值，但意图不同
+    assert cache.vectorizer.transform([f"{ENTITY}的期刊是什么"])[0] @ \
+        cache.vectorizer.transform([f"{ENTITY}的作者是谁"])[0] >= cache.threshold
+    assert cache.get(f"{ENTITY}的期刊是什么") is None
+    assert cache.get(f"{ENTITY}的作者是谁？") is not None
+
+
+def test_missing_entity_is_rejected():
+    cache = make_cache("t_sem_entity")
+    cache.set("小麦有哪些病害", make_parse("小麦有哪些病害", "小麦", "病害"))
+    assert cache.get("大麦有哪些病害") is None
+
+
+def test_questions_without_intent_keywords_must_match_residual():
+    verify = intent_verifier(INTENT_KEYWORDS)
+    parse = make_parse(f"{ENTITY}是谁写的", ENTITY, "作者")
+    assert verify(f"{ENTITY}是谁写的？", f"{ENTITY}是谁写的", parse)
+    assert not verify(f"{ENTITY}在哪儿", f"{ENTITY}是谁写的", parse)
+
+
+def test_entities_present():
+    parse = make_parse("小麦有哪些病害", "小麦", "病害")
+    assert entities_present("小麦病害", parse)
+    assert not entities_present("水稻病害", parse)
+    assert not entities_present("小麦病害", {"analysis": {"core_entities": []}})
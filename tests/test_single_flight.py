@@ -0,0 +1,67 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import pytest
+
+from AGKG.utils.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test_sf_share")
+    calls = []
+    release = threading.Event()
+
+    def work():
+        calls.append(1)
+        release.wait(1)
+        return "result"
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        futures = [pool.submit(flight.do, "key", work) for _ in range(5)]
+        time.sleep(0.05)
+        release.set()
+        outcomes = [future.result() for future in futures]
+
+    assert len(calls) == 1
+    assert all(result == "result" for result, _ in outcomes)
+    assert sorted(shared for _, shared in outcomes) == [False, True, True, True, True]
+
+
+def test_exception_is_shared_and_key_released():
+    flight = SingleFlight("test_sf_error")
+    started = threading.Event()
+
+    def fail():
+        started.set()
+        time.sleep(0.05)
+        raise ValueError("boom")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flight.do, "key", fail)
+        started.wait(1)
+        follower = pool.submit(flight.do, "key", lambda: "unused")
+        with pytest.raises(ValueError):
+            leader.result()
+        with pytest.raises(ValueError):
+            follower.result()
+
+    # 执行结束后不缓存结果
+    assert flight.do("key", lambda: "fresh") == ("fresh", False)
+
+
+def test_follower_timeout_does_not_affect_leader():
+    flight = SingleFlight("test_sf_timeout")
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        time.sleep(0.2)
+        return "done"
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        leader = pool.submit(flight.do, "key", slow)
+        started.wait(1)
+        with pytest.raises(FutureTimeoutError):
+            flight.do("key", lambda: "unused", timeout=0.01)
+        assert leader.result() == ("done", False)
@@ -0,0 +1,5 @@
+from AGKG.utils.sse import format_event
+
+
+def test_format_event_keeps_non_ascii_text():
+    assert format_event("delta", {"答案": "稻瘟病"}) == 'event: delta\ndata: {"答案": "稻瘟病"}\n\n'
@@ -0,0 +1,63 @@
+import pytest
+
+from AGKG.services import statistics_broadcaster
+from AGKG.services.statistics_broadcaster import StatisticsBroadcaster, diff_statistics
+
+
+class FakeStatistics:
+    def __init__(self, snapshot=None):
+        self.snapshot = snapshot
+        self.listeners = []
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def get(self):
+        return self.snapshot
+
+
+@pytest.fixture
+def broadcaster(monkeypatch):
+    monkeypatch.setattr(statistics_broadcaster, "_statistics_broadcaster_instance", None)
+    return StatisticsBroadcaster(FakeStatistics({"node_count": 1}))
+
+
+def test_diff_statistics_reports_changed_and_removed_entries():
+    previous = {"node_count": 1, "labels": {"作物": 2, "病害": 1}}
+    current = {"node_count": 2, "labels": {"作物": 2, "虫害": 3}}
+    assert diff_statistics(previous, current) == {"node_count": 2, "labels": {"虫害": 3, "病害": None}}
+    assert diff_statistics(current, current) == {}
+
+
+def test_stream_accepts_subscribers_without_cap(broadcaster):
+    streams = [broadcaster.stream() for _ in range(100)]
+    for events in streams:
+        assert next(events).startswith("event: snapshot")
+    assert len(broadcaster._subscribers) == 100
+
+    for events in streams:
+        events.close()
+    assert not broadcaster._subscribers
+
+
+def test_broadcast_reaches_every_subscriber_and_drops_slow_ones(broadcaster, monkeypatch):
+    monkeypatch.setattr(statistics_broadcaster, "SUBSCRIBER_QUEUE_SIZE", 1)
+    fast, slow = broadcaster.stream(), broadcaster.stream()
+    next(fast), next(slow)
+
+    broadcaster.broadcast(": heartbeat\n\n")
+    assert next(fast) == ": heartbeat\n\n"
+    broadcaster.broadcast(": heartbeat\n\n")
+    # slow 未消费上一条，队列已满，被断开
+    assert len(broadcaster._subscribers) == 1
+    assert list(slow) == []
+    fast.close()
+
+
+def test_delta_is_pushed_to_subscribers(broadcaster):
+    events = broadcaster.stream()
+    next(events)
+    broadcaster.statistics.listeners[0]({"node_count": 3}, 100.0)
+    message = next(events)
+    assert message.startswith("event: delta") and '"node_count": 3' in message
+    events.close()